@@ -1,13 +1,29 @@
-from flask import Blueprint, request, jsonify, session
-from services.file_service import upload_image
+import json
+from flask import Blueprint, Response, request, jsonify, session, current_app, url_for, stream_with_context
+from services.file_service import OCR_ENGINES, OCR_MODES, is_allowed_file
+from services.job_service import (
+    QueueFullError,
+    buffer_upload,
+    get_job_queue,
+    process_receipt_upload,
+)
 from flask_cors import CORS
+from services.clients import registry
+from services.ocr_service import get_extraction_stats
+from domain.bulk_receipts import bulk_delete_receipts, bulk_insert_receipts, bulk_update_receipts
+from domain.exports import EXPORT_FORMATS, export_receipts
+from services.result_cache import get_ocr_cache
+from services.response_cache import get_response_cache
+from services.image_processing import get_preprocess_stats
 from domain.receipts import (
-    get_all_receipts,
-    insert_receipt,
+    list_receipts,
+    fulltext_search,
+    stream_receipts,
     update_receipt,
     delete_receipt,
     search_receipts,
     get_analytics,
+    SEARCH_FILTERS,
 )
 import os
 import requests
@@ -31,15 +47,79 @@ def upload_receipt_api():
     if image.filename == "":
         return jsonify({"error": "No image file provided"}), 400
 
-    response = insert_receipt(upload_image(image))
-    return jsonify(response)
+    if not is_allowed_file(image.filename):
+        return jsonify({"error": "Invalid file type. Only JPG, JPEG, PNG, and PDF are allowed."}), 400
+
+    # Optional per-request override of Config.OCR_MODE ("pdf" or "image")
+    ocr_mode = request.form.get("ocr_mode") or None
+    if ocr_mode and ocr_mode.lower() not in OCR_MODES:
+        return jsonify({"error": f"Invalid OCR mode. Use one of: {', '.join(sorted(OCR_MODES))}."}), 400
+
+    # Optional per-request override of Config.OCR_ENGINE ("vision" or "tesseract")
+    ocr_engine = request.form.get("ocr_engine") or None
+    if ocr_engine and ocr_engine.lower() not in OCR_ENGINES:
+        return jsonify({"error": f"Invalid OCR engine. Use one of: {', '.join(sorted(OCR_ENGINES))}."}), 400
+
+    # Hand the pipeline off to the worker pool so this request returns immediately
+    try:
+        job_id = get_job_queue().submit(
+            process_receipt_upload, current_app._get_current_object(), buffer_upload(image), ocr_mode, ocr_engine
+        )
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503
+
+    status_url = url_for("api.get_upload_job_api", job_id=job_id)
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": status_url}), 202, {"Location": status_url}
+
 
+# ✅ Poll the status of an upload job
+@api.route("/v1/receipt/jobs/<job_id>", methods=["GET"])
+def get_upload_job_api(job_id):
+    """Fetch the status and result of a receipt upload job."""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
 
-# ✅ Fetch all receipts
+
+# ✅ OCR and LLM cache statistics
+@api.route("/v1/ocr/stats", methods=["GET"])
+def get_ocr_stats_api():
+    """Report OCR/LLM cache hit rates, image pre-processing savings and Google client latency."""
+    ocr_cache = get_ocr_cache()
+    response_cache = get_response_cache()
+    return jsonify({
+        "ocr_cache": ocr_cache.stats() if ocr_cache else None,
+        "llm_extraction": get_extraction_stats(),
+        "preprocessing": get_preprocess_stats(),
+        "response_cache": response_cache.stats() if response_cache else None,
+        "clients": registry.stats(),
+    })
+
+
+# ✅ Fetch receipts: one keyset page with ?limit/?cursor, otherwise every receipt streamed
 @api.route("/v1/receipts", methods=["GET"])
 def get_all_receipts_api():
-    """Fetch all receipts."""
-    return jsonify(get_all_receipts())
+    """Fetch receipts, newest first.
+
+    With limit and/or cursor the response is {"receipts": [...], "next_cursor": ...};
+    pass next_cursor back to get the following page. Without them the full
+    list is streamed as a JSON array so memory stays flat however many rows there are.
+    """
+    if "limit" in request.args or "cursor" in request.args:
+        try:
+            return jsonify(list_receipts(request.args.get("limit"), request.args.get("cursor")))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    return Response(stream_with_context(stream_json_array(stream_receipts())), mimetype="application/json")
+
+
+def stream_json_array(items):
+    """Serializes items as a JSON array one element at a time."""
+    yield "["
+    for index, item in enumerate(items):
+        yield ("," if index else "") + json.dumps(item)
+    yield "]"
 
 
 # ✅ Update a receipt (Fixed naming to plural "receipts")
@@ -62,8 +142,79 @@ def delete_receipt_api(receipt_id):
 def search_receipts_api():
     """Search for receipts with multiple filter parameters."""
     search_params = request.args.to_dict(flat=True)  # Automatically extracts all query parameters
-    results = search_receipts(**search_params)
-    return jsonify(results)
+    return cached_json_response("search", search_params, lambda: search_receipts(**search_params))
+
+
+# ✅ Export receipts as CSV or Parquet (same filters as search), streamed
+@api.route("/v1/receipts/export", methods=["GET"])
+def export_receipts_api():
+    """Download matching receipts: ?format=csv|parquet plus any /v1/receipts/search filter."""
+    filters = request.args.to_dict(flat=True)
+    export_format = filters.pop("format", "csv")
+    unknown = sorted(set(filters) - set(SEARCH_FILTERS))
+    if unknown:
+        return jsonify({"error": f"Unknown filter {unknown[0]!r}. Use format or one of: {', '.join(SEARCH_FILTERS)}."}), 400
+    try:
+        chunks = export_receipts(export_format, **filters)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename=receipts.{export_format}"},
+    )
+
+
+# ✅ Bulk insert / update / delete: a JSON array or NDJSON body, applied in one transaction
+@api.route("/v1/receipts/bulk", methods=["POST", "PATCH", "DELETE"])
+def bulk_receipts_api():
+    """POST inserts receipts, PATCH applies {"id", fields...} updates, DELETE removes ids.
+
+    Returns one result per item, in order, with receipt_id or error.
+    """
+    try:
+        items = read_bulk_items()
+        if request.method == "POST":
+            result = bulk_insert_receipts(items)
+        elif request.method == "PATCH":
+            result = bulk_update_receipts(items)
+        else:
+            result = bulk_delete_receipts(items)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result), 500 if "error" in result else 200
+
+
+def read_bulk_items():
+    """Parses the request body as NDJSON (one item per line) or a JSON array; DELETE also takes {"ids": [...]}."""
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        items = []
+        for number, line in enumerate(request.get_data(as_text=True).splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                raise ValueError(f"Line {number} is not valid JSON.")
+    else:
+        items = request.get_json(silent=True)
+        if isinstance(items, dict) and request.method == "DELETE":
+            items = items.get("ids")
+    if not isinstance(items, list):
+        raise ValueError("Expected a JSON array or an NDJSON body.")
+    return items
+
+
+# ✅ Full-text search over the stored OCR text
+@api.route("/v1/receipts/fulltext", methods=["GET"])
+def fulltext_search_api():
+    """Rank receipts by their OCR text: ?q=<words>[&limit=][&cursor=]."""
+    try:
+        return jsonify(fulltext_search(
+            request.args.get("q"), request.args.get("limit"), request.args.get("cursor")
+        ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
 
 # ✅ Get receipt analytics (Optimized)
@@ -71,7 +222,20 @@ def search_receipts_api():
 def get_analytics_api():
     """Get analytics data for receipts."""
     analytics_params = request.args.to_dict(flat=True)  # Automatically extracts all query parameters
-    return jsonify(get_analytics(**analytics_params))
+    return cached_json_response("analytics", analytics_params, lambda: get_analytics(**analytics_params))
+
+
+def cached_json_response(name, params, compute):
+    """Serves compute()'s JSON from the response cache, with an ETag and 304 for a matching If-None-Match."""
+    cache = get_response_cache()
+    if cache is None:
+        return jsonify(compute())
+    entry = cache.get_or_compute(name, params, compute)
+    response = current_app.response_class(entry["body"], mimetype="application/json")
+    response.set_etag(entry["etag"])
+    # Clients may keep the body but must revalidate, since any write changes it
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @api.route("/v1/auth/google", methods=["GET"])
 def google_login():
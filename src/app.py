@@ -2,19 +2,42 @@ from flask import Flask
 from flask_cors import CORS
 from config.settings import Config
 from core.database import init_db
+from core.commands import register_commands
+from core.metrics import init_metrics
 from api.v1.routes import api
 import os
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app)
-app.config.from_object(Config)
-app.secret_key = os.getenv("FLASK_SECRET_KEY", "hello")
-# Initialize database
-init_db(app)
 
-# Register API routes
-app.register_blueprint(api, url_prefix="/api")
+def create_app(config=Config):
+    """Builds the Flask app.
+
+    OCR, LLM and image libraries are imported on first use, so starting a
+    worker and serving the read-only endpoints does not pay for them.
+    """
+    config.validate()
+
+    # Initialize Flask app
+    app = Flask(__name__)
+    CORS(app)
+    app.config.from_object(config)
+    app.secret_key = os.getenv("FLASK_SECRET_KEY", "hello")
+    # Initialize database
+    init_db(app)
+
+    # Register API routes
+    app.register_blueprint(api, url_prefix="/api")
+    register_commands(app)
+    if config.METRICS_ENABLED:
+        init_metrics(app)
+
+    # Open Google and database connections before serving the first request
+    if config.WARM_UP_CLIENTS:
+        from services.clients import warm_up
+
+        warm_up(app)
+
+    return app
+
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
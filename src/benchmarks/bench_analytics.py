@@ -0,0 +1,118 @@
+"""Compare get_analytics() on raw receipts and on rollups with the old load-every-row Python loop.
+
+Seeds the receipts table with synthetic rows, rebuilds the rollups and
+times each variant at every size.
+
+Uses a throwaway SQLite file unless --database-url points at PostgreSQL;
+the table is dropped and recreated there, so never aim it at real data.
+
+Usage (from src/):
+    python -m benchmarks.bench_analytics [--rows 10000 100000 1000000] [--database-url postgresql://...]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from app import create_app
+from config.settings import Config
+from core.database import db
+from domain.receipts import get_analytics
+from domain.rollups import rebuild_rollups
+from schemas.receipt_schema import Receipt
+
+VENDORS = [("Walmart", "retail"), ("Target", "retail"), ("Uber", "taxi"), ("Lyft", "taxi"),
+           ("Hilton", "hotel"), ("Starbucks", "cafe"), ("Shell", "gas")] + [
+    (f"Restaurant {i}", "restaurant") for i in range(50)
+]
+CITIES = [("Portland", "Oregon"), ("Seattle", "Washington"), ("Austin", "Texas"), ("Boston", "Massachusetts")]
+
+
+def python_analytics(**filters):
+    """The previous implementation: hydrate every Receipt and aggregate in Python."""
+    query = Receipt.query
+    if filters.get("year"):
+        query = query.filter(db.func.extract("year", Receipt.date_time) == int(filters["year"]))
+    receipts = query.all()
+    total_spent = sum(receipt.total_amount for receipt in receipts)
+    receipt_count = len(receipts)
+    vendor_summary = {}
+    for receipt in receipts:
+        summary = vendor_summary.setdefault(receipt.vendor_name, {"count": 0, "total": 0})
+        summary["count"] += 1
+        summary["total"] += receipt.total_amount
+    return {
+        "total_spent": total_spent,
+        "receipt_count": receipt_count,
+        "average_amount": total_spent / receipt_count if receipt_count else 0,
+        "vendor_summary": vendor_summary,
+    }
+
+
+def seed(rows, chunk_size=50_000):
+    db.drop_all()
+    db.create_all()
+    rng = random.Random(42)
+    start = datetime(2023, 1, 1)
+    for offset in range(0, rows, chunk_size):
+        batch = []
+        for _ in range(min(chunk_size, rows - offset)):
+            vendor_name, bill_type = rng.choice(VENDORS)
+            city, state = rng.choice(CITIES)
+            batch.append({
+                "vendor_name": vendor_name,
+                "bill_type": bill_type,
+                "total_amount": round(rng.uniform(1, 500), 2),
+                "date_time": start + timedelta(minutes=rng.randrange(2 * 365 * 24 * 60)),
+                "city": city,
+                "state": state,
+                "country": "USA",
+            })
+        db.session.execute(insert(Receipt), batch)
+        db.session.commit()
+    rebuild_rollups()
+
+
+def time_call(func, repeat, **kwargs):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(**kwargs)
+        timings.append(time.perf_counter() - started)
+        db.session.expunge_all()
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--skip-python", action="store_true", help="skip the old Python loop")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}"
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+
+    app = create_app(BenchConfig)
+    print(f"{'rows':>10}{'python loop':>14}{'sql':>10}{'rollups':>10}")
+    with app.app_context():
+        for rows in args.rows:
+            seed(rows)
+            Config.ANALYTICS_USE_ROLLUPS = False
+            sql = time_call(get_analytics, args.repeat, year=2024)
+            Config.ANALYTICS_USE_ROLLUPS = True
+            rollups = time_call(get_analytics, args.repeat, year=2024)
+            loop = None if args.skip_python else time_call(python_analytics, args.repeat, year=2024)
+            loop_text = f"{loop * 1000:>12.1f}ms" if loop is not None else f"{'-':>14}"
+            print(f"{rows:>10}{loop_text}{sql * 1000:>8.1f}ms{rollups * 1000:>8.1f}ms")
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Measure export_receipts() throughput and peak memory for CSV and Parquet.
+
+Seeds the receipts table (see bench_analytics.seed), then drains each export
+and reports rows/s, output size and the peak Python heap (tracemalloc,
+measured on a second run), which should stay flat as the row count grows.
+
+Uses a throwaway SQLite file unless --database-url points at PostgreSQL;
+the table is dropped and recreated there, so never aim it at real data.
+
+Usage (from src/):
+    python -m benchmarks.bench_export [--rows 100000 1000000] [--batch-size 10000] [--database-url postgresql://...]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from app import create_app
+from benchmarks.bench_analytics import seed
+from config.settings import Config
+from core.database import db
+from domain.exports import export_receipts
+
+
+def drain(export_format, batch_size):
+    """Times one export, then repeats it under tracemalloc (which slows it down) for the peak heap."""
+    started = time.perf_counter()
+    size = sum(len(chunk) for chunk in export_receipts(export_format, batch_size=batch_size))
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    for _ in export_receipts(export_format, batch_size=batch_size):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.expunge_all()
+    return elapsed, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--batch-size", type=int, default=Config.EXPORT_BATCH_SIZE)
+    parser.add_argument("--formats", nargs="+", default=["csv", "parquet"], choices=["csv", "parquet"])
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}"
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+
+    app = create_app(BenchConfig)
+    print(f"{'rows':>10}{'format':>9}{'seconds':>10}{'rows/s':>12}{'MB out':>9}{'peak MB':>9}")
+    with app.app_context():
+        for rows in args.rows:
+            seed(rows)
+            for export_format in args.formats:
+                elapsed, size, peak = drain(export_format, args.batch_size)
+                print(f"{rows:>10}{export_format:>9}{elapsed:>10.2f}{rows / elapsed:>12,.0f}"
+                      f"{size / 2**20:>9.1f}{peak / 2**20:>9.1f}")
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
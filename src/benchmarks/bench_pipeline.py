@@ -0,0 +1,200 @@
+"""Offline benchmark of the upload pipeline and the receipt queries, with fakes for every Google service.
+
+Cloud Storage, Vision and Gemini are replaced by the in-process fakes in
+benchmarks/fakes.py (with the latencies below), then:
+
+  * uploads: every JPG/PNG in src/receipts/ is pushed through
+    process_receipt_upload() --uploads times with --concurrency threads, in
+    each OCR mode, with the OCR and LLM caches and the fast parser off so
+    every stage runs;
+  * queries: search_receipts() and get_analytics() are timed on synthetic
+    tables of --rows receipts (see bench_analytics.seed).
+
+Reports throughput and p50/p95/p99 per pipeline stage (the stage_timer
+stages exposed on /metrics) and per query.
+
+Uses a throwaway SQLite file unless --database-url points at PostgreSQL;
+the table is dropped and recreated there, so never aim it at real data.
+
+Usage (from src/):
+    python -m benchmarks.bench_pipeline [--uploads 50] [--concurrency 4] [--rows 10000 100000 1000000]
+        [--vision-latency 0.8] [--llm-latency 1.2] [--storage-latency 0.05] [--storage gcs|local]
+        [--engine vision|tesseract]
+        [--skip-uploads] [--skip-queries]
+"""
+import argparse
+import io
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.datastructures import FileStorage
+from app import create_app
+from benchmarks.bench_analytics import seed
+from benchmarks.fakes import Latency, install_fakes
+from config.settings import Config
+from core import metrics
+from core.database import db
+from domain.receipts import get_analytics, search_receipts
+from services.file_service import IMAGE_EXTENSIONS
+from services.job_service import process_receipt_upload
+
+RECEIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "receipts")
+
+QUERIES = {
+    "search vendor": (search_receipts, {"vendor": "walmart"}),
+    "search city+amount": (search_receipts, {"city": "Portland", "min_amount": "100", "max_amount": "200"}),
+    "search date": (search_receipts, {"date": "2024-03-15"}),
+    "analytics year": (get_analytics, {"year": "2024"}),
+    "analytics vendor+month": (get_analytics, {"year": "2024", "month": "6", "vendor_name": "Uber"}),
+}
+
+
+class StageRecorder:
+    """Stands in for the stage histogram and keeps every observation, for exact percentiles."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def labels(self, stage):
+        return _StageSamples(self, stage)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+
+class _StageSamples:
+    def __init__(self, recorder, stage):
+        self._recorder = recorder
+        self._stage = stage
+
+    def observe(self, seconds):
+        self._recorder.observe(self._stage, seconds)
+
+
+def percentiles(samples):
+    """(p50, p95, p99) of samples in seconds."""
+    if len(samples) == 1:
+        return samples * 3
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    print(f"{'':<24}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, samples in rows:
+        p50, p95, p99 = percentiles(samples)
+        print(f"{name:<24}{len(samples):>8}{p50 * 1000:>10.1f}{p95 * 1000:>10.1f}{p99 * 1000:>10.1f}")
+
+
+def load_images():
+    images = []
+    for name in sorted(os.listdir(RECEIPTS_DIR)):
+        if name.rsplit(".", 1)[-1].lower() in IMAGE_EXTENSIONS:
+            with open(os.path.join(RECEIPTS_DIR, name), "rb") as f:
+                images.append((name, f.read()))
+    return images
+
+
+def bench_uploads(app, ocr_mode, ocr_engine, uploads, concurrency):
+    recorder = StageRecorder()
+    metrics.PIPELINE_STAGE_SECONDS = recorder
+    images = load_images()
+
+    def upload(number):
+        name, content = images[number % len(images)]
+        image = FileStorage(stream=io.BytesIO(content), filename=name)
+        result = process_receipt_upload(app, image, ocr_mode, ocr_engine)
+        if "error" in result:
+            raise RuntimeError(f"{name}: {result['error']}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(upload, range(uploads)))
+    elapsed = time.perf_counter() - started
+
+    order = {stage: index for index, stage in enumerate(metrics.PIPELINE_STAGES)}
+    print_table(
+        f"uploads, {ocr_engine} {ocr_mode} mode: {uploads} in {elapsed:.2f}s = {uploads / elapsed:.2f}/s "
+        f"with {concurrency} threads",
+        sorted(recorder.samples.items(), key=lambda item: order.get(item[0], len(order))),
+    )
+
+
+def bench_queries(rows, repeat):
+    seed(rows)
+    results = []
+    for name, (func, kwargs) in QUERIES.items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func(**kwargs)
+            timings.append(time.perf_counter() - started)
+            db.session.expunge_all()
+        results.append((name, timings))
+    total = sum(sum(timings) for _, timings in results)
+    print_table(
+        f"queries on {rows} receipts: {len(QUERIES) * repeat / total:.1f} queries/s",
+        results,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=Config.UPLOAD_WORKERS)
+    parser.add_argument("--modes", nargs="+", default=["image", "pdf"], choices=["image", "pdf"])
+    parser.add_argument("--storage", default="gcs", choices=["gcs", "local"],
+                        help="fake Cloud Storage, or LocalStorage in a temporary directory")
+    parser.add_argument("--engine", default="vision", choices=["vision", "tesseract"],
+                        help="tesseract runs the real engine (it must be installed), with Vision as fallback")
+    parser.add_argument("--storage-latency", type=float, default=0.05, help="seconds per Cloud Storage call")
+    parser.add_argument("--vision-latency", type=float, default=0.8, help="seconds per Vision request/operation")
+    parser.add_argument("--llm-latency", type=float, default=1.2, help="seconds per Gemini call")
+    parser.add_argument("--jitter", type=float, default=0.25, help="latency jitter, as a fraction of each mean")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20, help="timed calls per query")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--skip-uploads", action="store_true")
+    parser.add_argument("--skip-queries", action="store_true")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}"
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        WARM_UP_CLIENTS = False
+
+    # Measure the full pipeline rather than the caches and the rule-based shortcut
+    Config.OCR_CACHE_BACKEND = "none"
+    Config.LLM_CACHE_MAX_ENTRIES = 0
+    Config.FAST_PARSER_ENABLED = False
+    Config.STORAGE_BACKEND = args.storage
+    Config.LOCAL_STORAGE_DIR = tempfile.mkdtemp()
+
+    install_fakes(
+        Latency(args.storage_latency, args.storage_latency * args.jitter, seed=1),
+        Latency(args.vision_latency, args.vision_latency * args.jitter, seed=2),
+        Latency(args.llm_latency, args.llm_latency * args.jitter, seed=3),
+    )
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        if not args.skip_uploads:
+            for ocr_mode in args.modes:
+                bench_uploads(app, ocr_mode, args.engine, args.uploads, args.concurrency)
+        if not args.skip_queries:
+            for rows in args.rows:
+                bench_queries(rows, args.repeat)
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
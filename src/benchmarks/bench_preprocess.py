@@ -0,0 +1,42 @@
+"""Show what image pre-processing does to the bundled sample receipts.
+
+Prints bytes and pixels in/out and the time spent in each stage for every
+image in src/receipts/, rendered as the PDF that would be uploaded.
+
+Usage (from src/):
+    python -m benchmarks.bench_preprocess [--format PDF|JPEG] [--max-side 2400]
+"""
+import argparse
+import io
+import os
+from config.settings import Config
+from services.image_processing import STAGES, preprocess_image
+
+RECEIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "receipts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", default="PDF", choices=["PDF", "JPEG"])
+    parser.add_argument("--max-side", type=int, default=Config.PREPROCESS_MAX_SIDE)
+    args = parser.parse_args()
+    Config.PREPROCESS_MAX_SIDE = args.max_side
+
+    print(f"{'image':<16}{'pixels in':>12}{'pixels out':>12}{'KB in':>9}{'KB out':>9}"
+          + "".join(f"{stage:>11}" for stage in STAGES))
+    total_in = total_out = 0
+    for name in sorted(os.listdir(RECEIPTS_DIR)):
+        with open(os.path.join(RECEIPTS_DIR, name), "rb") as f:
+            _, report = preprocess_image(io.BytesIO(f.read()), args.format)
+        total_in += report["bytes_in"]
+        total_out += report["bytes_out"]
+        size_in = "x".join(map(str, report["size_in"]))
+        size_out = "x".join(map(str, report["size_out"]))
+        stages = "".join(f"{report['stages'].get(stage, 0) * 1000:>9.1f}ms" for stage in STAGES)
+        print(f"{name:<16}{size_in:>12}{size_out:>12}{report['bytes_in'] / 1024:>9.0f}"
+              f"{report['bytes_out'] / 1024:>9.0f}{stages}")
+    print(f"total {total_in / 1024:.0f} KB -> {total_out / 1024:.0f} KB ({total_out / total_in:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Measure worker cold start: create_app() alone versus also loading the OCR/LLM stack.
+
+Each sample runs in a fresh interpreter so nothing is cached in sys.modules.
+
+Usage (from src/):
+    python -m benchmarks.bench_startup [--runs 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "create_app()": "from app import create_app; create_app()",
+    "create_app() + OCR stack": (
+        "from app import create_app; create_app()\n"
+        "from google.cloud import storage, vision\n"
+        "import langchain_google_genai, PIL.Image"
+    ),
+}
+
+TIMER = """
+import time
+started = time.perf_counter()
+{body}
+print(time.perf_counter() - started)
+"""
+
+
+def sample(body):
+    output = subprocess.run(
+        [sys.executable, "-c", TIMER.format(body=body)],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<28}{'median':>10}{'min':>10}{'max':>10}")
+    for name, body in SCENARIOS.items():
+        timings = [sample(body) for _ in range(args.runs)]
+        print(
+            f"{name:<28}{statistics.median(timings) * 1000:>8.0f}ms"
+            f"{min(timings) * 1000:>8.0f}ms{max(timings) * 1000:>8.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
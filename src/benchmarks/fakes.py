@@ -0,0 +1,228 @@
+"""In-process stand-ins for Cloud Storage, Vision and Gemini, for offline benchmarks and tests.
+
+install_fakes() swaps them into services.clients.registry, so the real
+upload pipeline (file_service -> image_processing -> ocr_service) runs
+unchanged without credentials or network. Each fake sleeps for a
+configurable latency per call to model the remote service.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from benchmarks.bench_fast_parser import load_fixtures
+from services.clients import registry
+
+
+class Latency:
+    """Sleeps mean seconds +/- jitter (uniform) per call."""
+
+    def __init__(self, mean=0.0, jitter=0.0, seed=0):
+        self.mean = mean
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        if not self.mean and not self.jitter:
+            return 0.0
+        with self._lock:
+            return max(0.0, self.mean + self._rng.uniform(-self.jitter, self.jitter))
+
+    def wait(self):
+        delay = self.delay()
+        if delay:
+            time.sleep(delay)
+
+
+class FakeBlob:
+    def __init__(self, storage, bucket_name, name):
+        self._storage = storage
+        self.bucket_name = bucket_name
+        self.name = name
+
+    def upload_from_file(self, file_obj, content_type=None, rewind=False):
+        if rewind:
+            file_obj.seek(0)
+        self.upload_from_string(file_obj.read(), content_type)
+
+    def upload_from_string(self, data, content_type=None):
+        self._storage.latency.wait()
+        self._storage.put(self.bucket_name, self.name, data if isinstance(data, bytes) else data.encode("utf-8"))
+
+    def download_as_bytes(self):
+        self._storage.latency.wait()
+        return self._storage.objects[(self.bucket_name, self.name)]
+
+
+class FakeBucket:
+    def __init__(self, storage, name):
+        self._storage = storage
+        self.name = name
+
+    def blob(self, name):
+        return FakeBlob(self._storage, self.name, name)
+
+    def list_blobs(self, prefix=""):
+        self._storage.latency.wait()
+        with self._storage.lock:
+            names = sorted(name for bucket, name in self._storage.objects if bucket == self.name and name.startswith(prefix))
+        return [FakeBlob(self._storage, self.name, name) for name in names]
+
+
+class FakeStorageClient:
+    """Keeps objects in a dict keyed by (bucket, name)."""
+
+    def __init__(self, latency=None):
+        self.latency = latency or Latency()
+        self.objects = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, name):
+        return FakeBucket(self, name)
+
+    def lookup_bucket(self, name):
+        self.latency.wait()
+        return FakeBucket(self, name)
+
+    def put(self, bucket_name, name, data):
+        with self.lock:
+            self.objects[(bucket_name, name)] = data
+
+
+class FakeOperation:
+    """Becomes done once its latency has passed since it was started; then runs its writes once."""
+
+    def __init__(self, run, latency):
+        self._run = run
+        self._done_at = time.monotonic() + latency.delay()
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def done(self):
+        if time.monotonic() < self._done_at:
+            return False
+        with self._lock:
+            if not self._finished:
+                self._run()
+                self._finished = True
+        return True
+
+    def result(self, timeout=None):
+        remaining = self._done_at - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        self.done()
+
+
+class FakeVisionClient:
+    """Answers OCR requests with OCR text from benchmarks/fixtures, chosen by a hash of the input and page.
+
+    Batched PDF requests write Vision's output JSON to the fake storage, in
+    shards of output_config.batch_size pages, the way the real operation
+    writes it to Cloud Storage; inline file requests (used with local
+    storage) are answered directly, for up to 5 of the requested pages.
+    """
+
+    PDF_PAGE = re.compile(rb"/Type\s*/Page(?![a-z])")
+
+    def __init__(self, storage, latency=None, texts=None):
+        self._storage = storage
+        self.latency = latency or Latency()
+        self._texts = texts or [fixture["ocr_text"] for fixture in load_fixtures()]
+
+    def text_for(self, content, page=1):
+        digest = hashlib.sha256(content if page == 1 else content + b"#%d" % page).digest()
+        return self._texts[int.from_bytes(digest[:4], "big") % len(self._texts)]
+
+    def page_count(self, content):
+        return max(1, len(self.PDF_PAGE.findall(content)))
+
+    def document_text_detection(self, image):
+        self.latency.wait()
+        return SimpleNamespace(
+            error=SimpleNamespace(message=""),
+            full_text_annotation=SimpleNamespace(text=self.text_for(image.content)),
+        )
+
+    def batch_annotate_files(self, requests):
+        self.latency.wait()
+        responses = []
+        for request in requests:
+            content = request.input_config.content
+            total_pages = self.page_count(content)
+            pages = [page for page in (list(request.pages) or [1, 2, 3, 4, 5])[:5] if page <= total_pages]
+            responses.append(SimpleNamespace(
+                error=SimpleNamespace(message=""),
+                total_pages=total_pages,
+                responses=[
+                    SimpleNamespace(full_text_annotation=SimpleNamespace(text=self.text_for(content, page)))
+                    for page in pages
+                ],
+            ))
+        return SimpleNamespace(responses=responses)
+
+    def async_batch_annotate_files(self, requests):
+        def run():
+            for request in requests:
+                source_bucket, source_name = _split_uri(request.input_config.gcs_source.uri)
+                destination_bucket, prefix = _split_uri(request.output_config.gcs_destination.uri)
+                content = self._storage.objects[(source_bucket, source_name)]
+                total_pages = self.page_count(content)
+                shard_size = request.output_config.batch_size or 20
+                for first in range(1, total_pages + 1, shard_size):
+                    last = min(first + shard_size - 1, total_pages)
+                    output = {"responses": [
+                        {"fullTextAnnotation": {"text": self.text_for(content, page)}, "context": {"pageNumber": page}}
+                        for page in range(first, last + 1)
+                    ]}
+                    self._storage.put(
+                        destination_bucket, f"{prefix}output-{first}-to-{last}.json", json.dumps(output).encode("utf-8")
+                    )
+
+        return FakeOperation(run, self.latency)
+
+
+class FakeLLM:
+    """Returns a fixed extraction per receipt in the prompt (a JSON array for batched prompts)."""
+
+    RECEIPT_MARKER = re.compile(r"^### RECEIPT \d+ ###$", re.MULTILINE)
+
+    def __init__(self, latency=None):
+        self.latency = latency or Latency()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        self.latency.wait()
+        with self._lock:
+            self.calls += 1
+        item = {
+            "bill_type": "retail",
+            "vendor_name": "Fake Store",
+            "date_time": "2024-06-05T12:00:00",
+            "total_amount": 12.34,
+            "location": {"city": "Portland", "state": "Oregon", "country": "USA"},
+        }
+        count = len(self.RECEIPT_MARKER.findall(prompt))
+        return json.dumps([item] * count if count else item)
+
+
+def install_fakes(storage_latency=None, vision_latency=None, llm_latency=None):
+    """Replaces the registry's storage, vision and llm clients with fakes and returns them."""
+    storage = FakeStorageClient(storage_latency)
+    fakes = SimpleNamespace(
+        storage=storage,
+        vision=FakeVisionClient(storage, vision_latency),
+        llm=FakeLLM(llm_latency),
+    )
+    for name in ("storage", "vision", "llm"):
+        registry.set(name, getattr(fakes, name))
+    return fakes
+
+
+def _split_uri(uri):
+    bucket, _, name = uri[len("gs://"):].partition("/")
+    return bucket, name
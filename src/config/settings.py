@@ -14,32 +14,132 @@ class Config:
     DB_PORT = os.getenv('DB_PORT', '5432')
     DB_NAME = os.getenv('DB_NAME')
 
-    # Ensure critical database credentials are set
-    if not all([DB_USER, DB_PASSWORD, DB_NAME]):
-        raise ValueError("Missing required database environment variables.")
-
     SQLALCHEMY_DATABASE_URI = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     # ✅ File Storage Paths
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-    IMAGE_SAVE_PATH = os.getenv('IMAGE_SAVE_PATH', os.path.join(BASE_DIR, 'uploads/image.jpg'))
-    PDF_OUTPUT_PATH = os.getenv('PDF_OUTPUT_PATH', os.path.join(BASE_DIR, 'outputs/pdf_file.pdf'))
-    PDF_OUTPUT_FILE_NAME = os.getenv('PDF_OUTPUT_FILE_NAME', 'output.pdf')
+    PDF_OBJECT_PREFIX = os.getenv('PDF_OBJECT_PREFIX', 'uploads/')  # Each upload gets <prefix><uuid>.pdf
+    UPLOAD_SPOOL_MAX_BYTES = int(os.getenv('UPLOAD_SPOOL_MAX_BYTES', str(8 * 1024 * 1024)))  # Larger uploads spill to a temp file
 
     # ✅ Google Cloud Configuration
     GOOGLE_CLOUD_PROJECT = os.getenv("GOOGLE_CLOUD_PROJECT", "websec-gowda-vipulp")
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-    # 🔐 Ensure Google Credentials are Set
+    # 🔐 Google Credentials (checked in validate())
     GOOGLE_APPLICATION_CREDENTIALS = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-    if not GOOGLE_APPLICATION_CREDENTIALS:
-        raise ValueError("GOOGLE_APPLICATION_CREDENTIALS is missing. Set it in the .env file.")
 
     # ✅ Cloud Storage Buckets
     BUCKET_NAME = os.getenv('BUCKET_NAME', 'default_bucket')
     DEST_BUCKET_NAME = os.getenv('DEST_BUCKET_NAME', 'destination_bucket')
 
+    # ✅ Object Storage: "gcs" or "local" (files under LOCAL_STORAGE_DIR/<bucket>/, no Cloud Storage round-trips)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "gcs").lower()
+    LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", os.path.join(BASE_DIR, 'storage'))
+
+    # ✅ OCR Mode: "pdf" (async file OCR through GCS) or "image" (synchronous in-memory OCR)
+    OCR_MODE = os.getenv("OCR_MODE", "pdf").lower()
+
+    # ✅ OCR Engine: "vision" (Google Vision) or "tesseract" (local, needs the tesseract binary and pytesseract)
+    OCR_ENGINE = os.getenv("OCR_ENGINE", "vision").lower()
+    OCR_FALLBACK_ENGINE = os.getenv("OCR_FALLBACK_ENGINE", "vision").lower()  # "vision" or "none"
+    TESSERACT_MIN_CONFIDENCE = float(os.getenv("TESSERACT_MIN_CONFIDENCE", "60"))  # Mean word confidence, 0-100
+    TESSERACT_WORKERS = int(os.getenv("TESSERACT_WORKERS", str(os.cpu_count() or 1)))  # Pool processes
+    TESSERACT_LANG = os.getenv("TESSERACT_LANG", "eng")
+    TESSERACT_PSM = int(os.getenv("TESSERACT_PSM", "6"))  # Page segmentation mode 6: a single block of text
+    TESSERACT_TIMEOUT = float(os.getenv("TESSERACT_TIMEOUT", "60"))  # Seconds per image
+
+    # ✅ OCR Result Cache: "memory", "sqlite", "tiered" (memory in front of sqlite) or "none"
+    OCR_CACHE_BACKEND = os.getenv("OCR_CACHE_BACKEND", "memory").lower()
+    OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "1024"))
+    OCR_CACHE_TTL = int(os.getenv("OCR_CACHE_TTL", str(7 * 24 * 3600)))  # Seconds, 0 never expires
+    OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", os.path.join(BASE_DIR, 'cache/ocr_cache.sqlite3'))
+
+    # ✅ Rule-based Fast Path: skip the LLM when the parser's confidence reaches the threshold
+    FAST_PARSER_ENABLED = os.getenv("FAST_PARSER_ENABLED", "True").lower() == "true"
+    FAST_PARSER_THRESHOLD = float(os.getenv("FAST_PARSER_THRESHOLD", "0.8"))
+
+    # ✅ LLM Extraction Memoization (0 entries disables it)
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+    LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "0"))  # Seconds, 0 never expires
+
+    # ✅ Batched LLM Extraction for bulk jobs
+    LLM_BATCH_MAX_ITEMS = int(os.getenv("LLM_BATCH_MAX_ITEMS", "8"))  # Receipts per LLM request
+    LLM_BATCH_MAX_TOKENS = int(os.getenv("LLM_BATCH_MAX_TOKENS", "6000"))  # Estimated OCR text tokens per request
+
+    # ✅ Vision OCR Batching
+    OCR_BATCH_WINDOW = float(os.getenv("OCR_BATCH_WINDOW", "0.5"))  # Seconds to wait for more files before submitting
+    OCR_BATCH_MAX_FILES = int(os.getenv("OCR_BATCH_MAX_FILES", "16"))  # Files per Vision async operation
+    OCR_BATCH_CONCURRENCY = int(os.getenv("OCR_BATCH_CONCURRENCY", "4"))  # Vision operations in flight at once
+    OCR_OUTPUT_BATCH_SIZE = int(os.getenv("OCR_OUTPUT_BATCH_SIZE", "2"))  # Pages per output JSON shard
+    OCR_OPERATION_TIMEOUT = int(os.getenv("OCR_OPERATION_TIMEOUT", "420"))
+    OCR_POLL_INTERVAL = float(os.getenv("OCR_POLL_INTERVAL", "0.5"))  # First wait between Vision operation checks
+    OCR_POLL_MAX_INTERVAL = float(os.getenv("OCR_POLL_MAX_INTERVAL", "5"))  # Checks back off up to this many seconds
+    OCR_IO_WORKERS = int(os.getenv("OCR_IO_WORKERS", "16"))  # Shared threads for blocking storage/Vision/LLM calls
+    OCR_MAX_IN_FLIGHT = int(os.getenv("OCR_MAX_IN_FLIGHT", "64"))  # Documents in OCR at once; the rest queue
+
+    # ✅ Image Pre-processing before OCR (shrinks phone photos before they are uploaded to Vision)
+    PREPROCESS_ENABLED = os.getenv("PREPROCESS_ENABLED", "True").lower() == "true"
+    PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "4"))  # Images decoded/encoded concurrently
+    PREPROCESS_GRAYSCALE = os.getenv("PREPROCESS_GRAYSCALE", "True").lower() == "true"
+    PREPROCESS_AUTOCROP = os.getenv("PREPROCESS_AUTOCROP", "True").lower() == "true"  # Trim blank margins around the text
+    PREPROCESS_DESKEW = os.getenv("PREPROCESS_DESKEW", "True").lower() == "true"
+    PREPROCESS_MAX_SKEW = float(os.getenv("PREPROCESS_MAX_SKEW", "5"))  # Degrees searched either way when deskewing
+    PREPROCESS_MAX_SIDE = int(os.getenv("PREPROCESS_MAX_SIDE", "2400"))  # Pixels on the longest side
+    PREPROCESS_MAX_DPI = int(os.getenv("PREPROCESS_MAX_DPI", "300"))
+    PREPROCESS_JPEG_QUALITY = int(os.getenv("PREPROCESS_JPEG_QUALITY", "85"))
+    PREPROCESS_MAX_PIXELS = int(os.getenv("PREPROCESS_MAX_PIXELS", str(64 * 1000 * 1000)))  # Larger images are rejected (decompression bombs)
+
+    # ✅ Multi-Receipt Photos (each receipt in a photo is OCR'd and stored separately)
+    RECEIPT_SPLIT_ENABLED = os.getenv("RECEIPT_SPLIT_ENABLED", "True").lower() == "true"
+    RECEIPT_MIN_AREA = float(os.getenv("RECEIPT_MIN_AREA", "0.03"))  # Smallest receipt, as a fraction of the photo
+    RECEIPT_MAX_REGIONS = int(os.getenv("RECEIPT_MAX_REGIONS", "8"))  # More paper regions than this are not split
+    RECEIPT_MAX_PAGES = int(os.getenv("RECEIPT_MAX_PAGES", "20"))  # Longer PDF uploads are rejected
+    RECEIPT_EXTRACT_CONCURRENCY = int(os.getenv("RECEIPT_EXTRACT_CONCURRENCY", "4"))  # Extractions at once per upload
+
+    # ✅ Background Upload Jobs
+    UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))  # Receipts processed concurrently
+    UPLOAD_QUEUE_SIZE = int(os.getenv("UPLOAD_QUEUE_SIZE", "32"))  # Jobs allowed to wait for a worker
+    UPLOAD_JOB_RETENTION = int(os.getenv("UPLOAD_JOB_RETENTION", "1000"))  # Finished jobs kept for status lookups
+
+    # ✅ Receipt Listing: keyset pages for ?limit/?cursor, streamed in batches otherwise
+    RECEIPTS_PAGE_SIZE = int(os.getenv("RECEIPTS_PAGE_SIZE", "100"))
+    RECEIPTS_MAX_PAGE_SIZE = int(os.getenv("RECEIPTS_MAX_PAGE_SIZE", "1000"))
+    RECEIPTS_STREAM_BATCH = int(os.getenv("RECEIPTS_STREAM_BATCH", "500"))  # Rows fetched per server-side cursor round trip
+    FULLTEXT_PAGE_SIZE = int(os.getenv("FULLTEXT_PAGE_SIZE", "20"))  # Highlights are generated per returned row
+
+    # ✅ Bulk Receipt Endpoints: one transaction per request, written in batches
+    BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))  # Rows per multi-row INSERT / UPDATE / DELETE
+    BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "50000"))  # Larger requests are rejected
+
+    # ✅ Prometheus Metrics (GET /metrics)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+
+    # ✅ Response Cache for /v1/receipts/search and /v1/receipts/analytics (invalidated on every write)
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))  # 0 disables the cache
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "60"))  # Seconds; bounds staleness across workers
+
+    # ✅ Receipt Export (CSV / Parquet)
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))  # Rows per cursor fetch, CSV chunk and Parquet row group
+
+    # ✅ Analytics Rollups: answer /receipts/analytics from receipt_rollups instead of scanning receipts.
+    # Writes only maintain the rollups while this is on, so run `flask --app app:create_app rebuild-rollups`
+    # (after `flask db upgrade` creates the table) every time it is turned on.
+    ANALYTICS_USE_ROLLUPS = os.getenv("ANALYTICS_USE_ROLLUPS", "False").lower() == "true"
+
+    # ✅ Build Google clients and open connections at startup instead of on the first request
+    WARM_UP_CLIENTS = os.getenv("WARM_UP_CLIENTS", "False").lower() == "true"
+
     # ✅ General Settings
     DEBUG = os.getenv("DEBUG", "False").lower() == "true"  # Converts "true" string to boolean
-    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
\ No newline at end of file
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+    @classmethod
+    def validate(cls):
+        """Ensures critical settings are present; called once by create_app()."""
+        if not all([cls.DB_USER, cls.DB_PASSWORD, cls.DB_NAME]):
+            raise ValueError("Missing required database environment variables.")
+        if not cls.GOOGLE_APPLICATION_CREDENTIALS:
+            raise ValueError("GOOGLE_APPLICATION_CREDENTIALS is missing. Set it in the .env file.")
+        if cls.OCR_FALLBACK_ENGINE not in ("vision", "none"):
+            raise ValueError(f"Invalid OCR_FALLBACK_ENGINE {cls.OCR_FALLBACK_ENGINE!r}; use 'vision' or 'none'.")
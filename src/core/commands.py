@@ -0,0 +1,69 @@
+import click
+from flask.cli import with_appcontext
+
+
+def register_commands(app):
+    """Adds the maintenance commands to `flask --app app:create_app <command>`."""
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(create_search_indexes_command)
+    app.cli.add_command(export_receipts_command)
+
+
+@click.command("rebuild-rollups")
+@with_appcontext
+def rebuild_rollups_command():
+    """Recompute the analytics rollup table from the receipts table."""
+    from domain.rollups import rebuild_rollups
+
+    rows = rebuild_rollups()
+    click.echo(f"Rebuilt receipt_rollups: {rows} rows.")
+
+
+@click.command("create-search-indexes")
+@with_appcontext
+def create_search_indexes_command():
+    """Add pg_trgm, the OCR text search_vector and the receipts indexes to an existing PostgreSQL database.
+
+    Run after `flask db upgrade` has added the ocr_text column. Indexes are
+    built without locking writes; adding search_vector rewrites the table once.
+    """
+    from sqlalchemy import text
+    from sqlalchemy.schema import CreateIndex
+    from core.database import db
+    from schemas.receipt_schema import SEARCH_VECTOR_DDL, Receipt
+
+    if db.engine.dialect.name != "postgresql":
+        click.echo("Only needed on PostgreSQL; db.create_all() creates these indexes elsewhere.")
+        return
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for index in sorted(Receipt.__table__.indexes, key=lambda index: index.name):
+            ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=conn.dialect))
+            conn.execute(text(ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)))
+            click.echo(f"Created {index.name}")
+        add_column, create_index = SEARCH_VECTOR_DDL
+        conn.execute(text(add_column))
+        conn.execute(text(create_index.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)))
+        click.echo("Created search_vector and ix_receipts_search_vector")
+
+
+@click.command("export-receipts")
+@click.argument("output", type=click.File("wb"))
+@click.option("--format", "export_format", type=click.Choice(["csv", "parquet"]), default="csv")
+@click.option("--vendor")
+@click.option("--city")
+@click.option("--state")
+@click.option("--country")
+@click.option("--bill-type")
+@click.option("--date", help="YYYY-MM-DD")
+@click.option("--min-amount", type=float)
+@click.option("--max-amount", type=float)
+@with_appcontext
+def export_receipts_command(output, export_format, **filters):
+    """Write receipts matching the search filters to OUTPUT ("-" for stdout) as CSV or Parquet."""
+    from domain.exports import export_receipts
+
+    for chunk in export_receipts(export_format, **filters):
+        output.write(chunk)
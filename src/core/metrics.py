@@ -0,0 +1,130 @@
+import os
+import re
+import time
+from contextlib import contextmanager
+from flask import Response, has_app_context
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from core.database import db
+
+# Stage labels, in pipeline order: upload_image (all of OCR), preprocess (resize and PDF/JPEG
+# encode), storage_upload, vision (wait for the batched operation and its output), vision_operation,
+# ocr_output_list, ocr_output_download, vision_image (in-memory mode), tesseract, extraction, llm, db_insert
+PIPELINE_STAGES = (
+    "upload_image", "preprocess", "storage_upload", "vision", "vision_operation", "ocr_output_list",
+    "ocr_output_download", "vision_image", "tesseract", "extraction", "llm", "db_insert",
+)
+
+# Upload pipeline stages take from milliseconds (cache hits, DB insert) to a minute (Vision operation)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "receipt_pipeline_stage_seconds",
+    "Time spent in each stage of the receipt upload pipeline.",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+PIPELINE_STAGE_FAILURES = Counter(
+    "receipt_pipeline_stage_failures_total",
+    "Stages of the receipt upload pipeline that raised.",
+    ["stage"],
+)
+OCR_FALLBACKS = Counter(
+    "receipt_ocr_fallbacks_total",
+    "Uploads the local OCR engine handed to Vision, by reason (error or low_confidence).",
+    ["reason"],
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds",
+    "SQL statement execution time, by statement type.",
+    ["statement"],
+    buckets=QUERY_BUCKETS,
+)
+
+STATEMENT_TYPES = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+_FIRST_WORD = re.compile(r"\s*(\w+)")
+
+
+@contextmanager
+def stage_timer(stage):
+    """Records the duration of a pipeline stage, and a failure if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        PIPELINE_STAGE_FAILURES.labels(stage).inc()
+        raise
+    finally:
+        PIPELINE_STAGE_SECONDS.labels(stage).observe(time.perf_counter() - started)
+
+
+def statement_type(statement):
+    match = _FIRST_WORD.match(statement)
+    word = match.group(1).upper() if match else ""
+    return word if word in STATEMENT_TYPES else "OTHER"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    DB_QUERY_SECONDS.labels(statement_type(statement)).observe(time.perf_counter() - started)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # after_cursor_execute does not run for failed statements
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+class PoolCollector:
+    """Reports the connection pool of the current app's engine when /metrics is scraped."""
+
+    def collect(self):
+        if not has_app_context():
+            return
+        pool = db.engine.pool
+        for name, description, read in (
+            ("db_pool_size", "Connections the pool keeps open.", "size"),
+            ("db_pool_checked_out", "Connections currently in use.", "checkedout"),
+            ("db_pool_checked_in", "Idle connections in the pool.", "checkedin"),
+            ("db_pool_overflow", "Connections opened beyond the pool size.", "overflow"),
+        ):
+            # SQLite's default pools do not implement every counter
+            if hasattr(pool, read):
+                yield GaugeMetricFamily(name, description, value=getattr(pool, read)())
+
+
+REGISTRY.register(PoolCollector())
+
+
+def render_metrics():
+    """The Prometheus exposition of every metric.
+
+    Under gunicorn set PROMETHEUS_MULTIPROC_DIR so the histograms of all
+    workers are merged; the pool gauges then describe the scraped worker.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(PoolCollector())
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def init_metrics(app):
+    """Adds GET /metrics (outside the /api prefix, where Prometheus looks by default)."""
+    app.add_url_rule(
+        "/metrics", "metrics", lambda: Response(render_metrics(), content_type=CONTENT_TYPE_LATEST)
+    )
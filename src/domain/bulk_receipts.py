@@ -0,0 +1,161 @@
+from datetime import datetime
+from types import SimpleNamespace
+from sqlalchemy import delete, insert, select, update
+from core.database import db
+from config.settings import Config
+from domain.receipts import receipt_values
+from domain.rollups import apply_rollup_deltas, collect_rollup_delta
+from schemas.receipt_schema import Receipt
+from services.response_cache import bump_data_version
+
+# Fields a bulk update may set
+UPDATABLE_FIELDS = {
+    "total_amount", "bill_type", "vendor_name", "date_time", "city", "state", "country", "ocr_text",
+}
+# Columns read back before an update or delete so the rollups can be adjusted
+ROLLUP_COLUMNS = [Receipt.id, Receipt.date_time, Receipt.total_amount, Receipt.vendor_name,
+                  Receipt.bill_type, Receipt.city, Receipt.state, Receipt.country]
+
+
+def bulk_insert_receipts(items):
+    """Inserts many receipts in one transaction.
+
+    Each item has the same shape insert_receipt() accepts. Valid items are
+    written Config.BULK_BATCH_SIZE at a time with one multi-row INSERT ...
+    RETURNING per batch. Returns {"results": [...], "succeeded", "failed"},
+    one result per item in order with either receipt_id or error.
+    """
+    results, rows = _start(items)
+    for index, item in enumerate(items):
+        try:
+            rows.append((index, receipt_values(item)))
+        except Exception as e:
+            results[index] = {"index": index, "error": f"Invalid receipt: {e}"}
+
+    def write(batch):
+        deltas = {}
+        # insertmanyvalues keeps RETURNING rows in parameter order, so ids line up with items
+        inserted = db.session.execute(
+            insert(Receipt).returning(Receipt.id, sort_by_parameter_order=True),
+            [values for _, values in batch],
+        ).scalars().all()
+        for (index, values), receipt_id in zip(batch, inserted):
+            collect_rollup_delta(deltas, SimpleNamespace(**values), 1)
+            results[index] = {"index": index, "receipt_id": receipt_id}
+        apply_rollup_deltas(deltas)
+
+    return _run(rows, write, results, "insert")
+
+
+def bulk_update_receipts(items):
+    """Applies many partial updates ({"id": ..., field: value, ...}) in one transaction.
+
+    Per batch the current rows are read with one SELECT ... WHERE id IN, and
+    the changes are sent as executemany UPDATEs grouped by the set of fields
+    changed, instead of a fetch and commit per receipt.
+    """
+    results, rows = _start(items)
+    seen = set()
+    for index, item in enumerate(items):
+        try:
+            receipt_id, changes = _parse_update(item)
+            if receipt_id in seen:
+                raise ValueError(f"receipt {receipt_id} appears more than once")
+            seen.add(receipt_id)
+            rows.append((index, {"id": receipt_id, **changes}))
+        except (TypeError, ValueError) as e:
+            results[index] = {"index": index, "error": f"Invalid update: {e}"}
+
+    def write(batch):
+        current = _fetch_current([values["id"] for _, values in batch])
+        deltas, groups = {}, {}
+        for index, values in batch:
+            old = current.get(values["id"])
+            if old is None:
+                results[index] = {"index": index, "error": "Receipt not found"}
+                continue
+            collect_rollup_delta(deltas, old, -1)
+            collect_rollup_delta(deltas, SimpleNamespace(**{**old._asdict(), **values}), 1)
+            groups.setdefault(frozenset(values), []).append(values)
+            results[index] = {"index": index, "receipt_id": values["id"]}
+        for params in groups.values():
+            db.session.execute(update(Receipt), params)
+        apply_rollup_deltas(deltas)
+
+    return _run(rows, write, results, "update")
+
+
+def bulk_delete_receipts(ids):
+    """Deletes many receipts by id in one transaction, with one DELETE ... WHERE id IN per batch."""
+    results, rows = _start(ids)
+    seen = set()
+    for index, receipt_id in enumerate(ids):
+        if isinstance(receipt_id, bool) or not isinstance(receipt_id, int):
+            results[index] = {"index": index, "error": "Invalid id"}
+        elif receipt_id in seen:
+            results[index] = {"index": index, "error": f"receipt {receipt_id} appears more than once"}
+        else:
+            seen.add(receipt_id)
+            rows.append((index, receipt_id))
+
+    def write(batch):
+        current = _fetch_current([receipt_id for _, receipt_id in batch])
+        deltas = {}
+        for index, receipt_id in batch:
+            old = current.get(receipt_id)
+            if old is None:
+                results[index] = {"index": index, "error": "Receipt not found"}
+                continue
+            collect_rollup_delta(deltas, old, -1)
+            results[index] = {"index": index, "receipt_id": receipt_id}
+        if current:
+            db.session.execute(
+                delete(Receipt).where(Receipt.id.in_(list(current))).execution_options(synchronize_session=False)
+            )
+        apply_rollup_deltas(deltas)
+
+    return _run(rows, write, results, "delete")
+
+
+def _start(items):
+    if len(items) > Config.BULK_MAX_ITEMS:
+        raise ValueError(f"At most {Config.BULK_MAX_ITEMS} items per request.")
+    return [None] * len(items), []
+
+
+def _run(rows, write, results, action):
+    """Writes rows in batches inside a single transaction; any database error rolls back all of them."""
+    try:
+        for start in range(0, len(rows), Config.BULK_BATCH_SIZE):
+            write(rows[start:start + Config.BULK_BATCH_SIZE])
+        db.session.commit()
+        bump_data_version()
+    except Exception as e:
+        db.session.rollback()
+        return {"error": f"Failed to {action} receipts: {str(e)}"}
+    failed = sum(1 for result in results if "error" in result)
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
+
+
+def _parse_update(item):
+    if not isinstance(item, dict):
+        raise ValueError("expected an object")
+    changes = dict(item)
+    receipt_id = changes.pop("id", None)
+    if isinstance(receipt_id, bool) or not isinstance(receipt_id, int):
+        raise ValueError("id must be an integer")
+    unknown = set(changes) - UPDATABLE_FIELDS
+    if unknown:
+        raise ValueError(f"unknown fields {', '.join(sorted(unknown))}")
+    if not changes:
+        raise ValueError("nothing to update")
+    if changes.get("date_time") is not None:
+        changes["date_time"] = datetime.fromisoformat(changes["date_time"])
+    if changes.get("total_amount") is not None:
+        changes["total_amount"] = float(changes["total_amount"])
+    return receipt_id, changes
+
+
+def _fetch_current(ids):
+    rows = db.session.execute(select(*ROLLUP_COLUMNS).where(Receipt.id.in_(ids)))
+    return {row.id: row for row in rows}
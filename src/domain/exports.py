@@ -0,0 +1,115 @@
+import csv
+import io
+from sqlalchemy import select
+from core.database import db
+from config.settings import Config
+from domain.receipts import LISTING_ORDER, apply_search_filters
+from schemas.receipt_schema import Receipt
+
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+EXPORT_COLUMNS = ["id", "total_amount", "bill_type", "vendor_name", "date_time", "city", "state", "country"]
+
+
+def export_receipts(export_format="csv", batch_size=None, **filters):
+    """Returns a generator of bytes: every receipt matching the search_receipts() filters, newest first.
+
+    Rows are read batch_size (Config.EXPORT_BATCH_SIZE) at a time through a
+    server-side cursor and each batch is encoded and yielded before the next
+    is fetched, so memory does not grow with the number of rows. Parquet
+    files get one row group per batch. Raises ValueError for an unknown format
+    or a malformed filter, TypeError for an unknown filter.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}.")
+    # Built up front so bad filters fail before the response starts
+    query = apply_search_filters(
+        select(*[getattr(Receipt, column) for column in EXPORT_COLUMNS]), **filters
+    ).order_by(*LISTING_ORDER)
+    batches = _iter_batches(query, batch_size or Config.EXPORT_BATCH_SIZE)
+    if export_format == "csv":
+        return _write_csv(batches)
+    _require_pyarrow()
+    return _write_parquet(batches)
+
+
+def _iter_batches(query, batch_size):
+    # yield_per keeps the rows on the server (a named cursor on PostgreSQL)
+    result = db.session.execute(query.execution_options(yield_per=batch_size))
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def _write_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in batches:
+        writer.writerows(
+            (*row[:4], row.date_time.isoformat() if row.date_time else None, *row[5:]) for row in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _write_parquet(batches):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("total_amount", pa.float64()),
+        ("bill_type", pa.string()),
+        ("vendor_name", pa.string()),
+        ("date_time", pa.timestamp("us")),
+        ("city", pa.string()),
+        ("state", pa.string()),
+        ("country", pa.string()),
+    ])
+    sink = _DrainableSink()
+    with pq.ParquetWriter(sink, schema, compression="snappy") as writer:
+        for rows in batches:
+            columns = list(zip(*rows))
+            writer.write_table(pa.table(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+            ))
+            yield sink.drain()
+    # Closing the writer appends the footer
+    yield sink.drain()
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ValueError("Parquet export needs pyarrow; install it or use format=csv.")
+
+
+class _DrainableSink(io.RawIOBase):
+    """A write-only file for ParquetWriter whose bytes can be taken out as they are written."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
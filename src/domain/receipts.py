@@ -1,32 +1,42 @@
+import base64
+import binascii
 import json
-from datetime import datetime
+import re
+from datetime import datetime, timedelta
+from markupsafe import escape
+from sqlalchemy import and_, or_, tuple_
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+from sqlalchemy.orm import undefer
 from core.database import db
-from schemas.receipt_schema import Receipt
+from config.settings import Config
+from schemas.receipt_schema import FULLTEXT_CONFIG, Receipt
+from schemas.receipt_rollup_schema import ReceiptRollup
+from domain.rollups import add_to_rollups, move_in_rollups, rollup_amount, rollup_key
+from services.response_cache import bump_data_version
+
+# Newest first; receipts without a date come last, in id order
+LISTING_ORDER = (Receipt.date_time.desc().nulls_last(), Receipt.id.desc())
+
+ANALYTICS_BREAKDOWNS = {"bill_type", "month"}
+
+# ts_headline marks matches with control characters, which become <mark> tags once the rest is HTML-escaped
+HEADLINE_START, HEADLINE_STOP = "\x02", "\x03"
+FULLTEXT_HEADLINE_OPTIONS = (
+    f'StartSel="{HEADLINE_START}", StopSel="{HEADLINE_STOP}", MaxFragments=2, MaxWords=20, MinWords=5'
+)
 
 
 def insert_receipt(data):
     """Parses extracted data and inserts it into PostgreSQL database."""
     try:
-        if isinstance(data, str):
-            data = json.loads(data)
-
-        # Extract the formatted_data if it exists
-        if "formatted_data" in data:
-            data = json.loads(data["formatted_data"])
-
         # Create new Receipt entry
-        new_receipt = Receipt(
-            bill_type=data.get("bill_type"),
-            vendor_name=data.get("vendor_name"),
-            date_time=datetime.fromisoformat(data.get("date_time")),
-            total_amount=data.get("total_amount"),
-            city=data.get("location", {}).get("city"),
-            state=data.get("location", {}).get("state"),
-            country=data.get("location", {}).get("country"),
-        )
-        # Insert into DB
+        new_receipt = Receipt(**receipt_values(data))
+
+        # Insert into DB, updating the analytics rollups (if enabled) in the same transaction
         db.session.add(new_receipt)
+        add_to_rollups(rollup_key(new_receipt), rollup_amount(new_receipt))
         db.session.commit()
+        bump_data_version()
 
         return {
             "message": "Data inserted into PostgreSQL successfully!",
@@ -38,6 +48,31 @@ def insert_receipt(data):
         return {"error": f"Failed to insert data: {str(e)}"}
 
 
+def receipt_values(data):
+    """Maps an extraction (or an upload result wrapping one) to Receipt column values."""
+    if isinstance(data, str):
+        data = json.loads(data)
+
+    # Upload results carry the raw OCR text next to the extracted fields
+    ocr_text = data.get("ocr_text")
+
+    # Extract the formatted_data if it exists
+    if "formatted_data" in data:
+        data = json.loads(data["formatted_data"])
+
+    location = data.get("location", {})
+    return {
+        "bill_type": data.get("bill_type"),
+        "vendor_name": data.get("vendor_name"),
+        "date_time": datetime.fromisoformat(data.get("date_time")),
+        "total_amount": data.get("total_amount"),
+        "city": location.get("city"),
+        "state": location.get("state"),
+        "country": location.get("country"),
+        "ocr_text": ocr_text,
+    }
+
+
 def get_all_receipts():
     """Retrieves all receipts from the database."""
     try:
@@ -48,18 +83,196 @@ def get_all_receipts():
         return {"error": f"Failed to retrieve receipts: {str(e)}"}
 
 
+def list_receipts(limit=None, cursor=None):
+    """Returns one keyset page of receipts, newest first, and the cursor for the next page.
+
+    The cursor encodes the (date_time, id) of the last receipt on the page, so
+    each page is an index range scan no matter how deep into the table it is.
+    Raises ValueError for a malformed cursor or limit.
+    """
+    limit = Config.RECEIPTS_PAGE_SIZE if limit in (None, "") else int(limit)
+    if not 1 <= limit <= Config.RECEIPTS_MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {Config.RECEIPTS_MAX_PAGE_SIZE}.")
+
+    query = Receipt.query.order_by(*LISTING_ORDER)
+    if cursor:
+        date_time, receipt_id = decode_cursor(cursor)
+        if date_time is None:
+            query = query.filter(Receipt.date_time.is_(None), Receipt.id < receipt_id)
+        else:
+            query = query.filter(or_(
+                tuple_(Receipt.date_time, Receipt.id) < (date_time, receipt_id),
+                Receipt.date_time.is_(None),
+            ))
+
+    # One extra row tells us whether there is a next page without a COUNT(*)
+    receipts = query.limit(limit + 1).all()
+    has_more = len(receipts) > limit
+    receipts = receipts[:limit]
+    return {
+        "receipts": [receipt.to_dict() for receipt in receipts],
+        "next_cursor": encode_cursor(receipts[-1]) if has_more else None,
+    }
+
+
+def stream_receipts(batch_size=None):
+    """Yields every receipt as a dict, newest first, holding only one batch of rows at a time.
+
+    yield_per makes the PostgreSQL driver use a server-side cursor, so rows
+    are fetched batch_size at a time instead of all at once.
+    """
+    query = Receipt.query.order_by(*LISTING_ORDER).yield_per(batch_size or Config.RECEIPTS_STREAM_BATCH)
+    for receipt in query:
+        yield receipt.to_dict()
+
+
+def encode_cursor(receipt):
+    """Opaque pagination cursor for the position just after this receipt."""
+    return _encode_position([receipt.date_time.isoformat() if receipt.date_time else None, receipt.id])
+
+
+def decode_cursor(cursor):
+    """Returns the (date_time, id) a cursor points at, or raises ValueError."""
+    try:
+        date_time, receipt_id = _decode_position(cursor)
+        return (datetime.fromisoformat(date_time) if date_time else None), int(receipt_id)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor.")
+
+
+def _encode_position(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _decode_position(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, TypeError, ValueError):
+        raise ValueError("Invalid cursor.")
+
+
+def fulltext_search(q, limit=None, cursor=None):
+    """Ranks receipts by how well their OCR text matches q and returns one page with highlights.
+
+    On PostgreSQL q uses web search syntax ("hdmi cable", -refund, "exact phrase")
+    against the indexed search_vector, ranked with ts_rank_cd. Highlights are
+    only generated for the rows on the page, since ts_headline re-parses the
+    whole text. Other databases fall back to matching every word with ilike,
+    newest first. Raises ValueError for an empty query or a bad limit/cursor.
+    """
+    if not q or not q.strip():
+        raise ValueError("q is required.")
+    limit = Config.FULLTEXT_PAGE_SIZE if limit in (None, "") else int(limit)
+    if not 1 <= limit <= Config.RECEIPTS_MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {Config.RECEIPTS_MAX_PAGE_SIZE}.")
+    after = None
+    if cursor:
+        try:
+            rank, receipt_id = _decode_position(cursor)
+            after = float(rank), int(receipt_id)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor.")
+
+    if db.engine.dialect.name == "postgresql":
+        rows = _fulltext_postgres(q, limit + 1, after)
+    else:
+        rows = _fulltext_fallback(q, limit + 1, after)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    results = []
+    for receipt, rank, highlight in rows:
+        result = receipt.to_dict()
+        result.update(rank=rank, highlight=highlight)
+        results.append(result)
+    return {
+        "receipts": results,
+        "next_cursor": _encode_position([rows[-1][1], rows[-1][0].id]) if has_more else None,
+    }
+
+
+def _fulltext_postgres(q, limit, after):
+    tsquery = db.func.websearch_to_tsquery(FULLTEXT_CONFIG, q)
+    search_vector = db.literal_column("receipts.search_vector")
+    # ts_rank_cd() is real; the cursor's rank comes back as a float8, which a real never equals
+    rank = db.cast(db.func.ts_rank_cd(search_vector, tsquery), DOUBLE_PRECISION)
+
+    page = (
+        db.select(Receipt.id, rank.label("rank"))
+        .where(search_vector.op("@@")(tsquery))
+        .order_by(rank.desc(), Receipt.id.desc())
+        .limit(limit)
+    )
+    if after:
+        page = page.where(or_(rank < after[0], and_(rank == after[0], Receipt.id < after[1])))
+    page = page.subquery()
+
+    highlight = db.func.ts_headline(FULLTEXT_CONFIG, Receipt.ocr_text, tsquery, FULLTEXT_HEADLINE_OPTIONS)
+    query = (
+        db.select(Receipt, page.c.rank, highlight)
+        .join(page, Receipt.id == page.c.id)
+        .order_by(page.c.rank.desc(), Receipt.id.desc())
+    )
+    return [(receipt, rank, _headline_html(headline)) for receipt, rank, headline in db.session.execute(query)]
+
+
+def _headline_html(headline):
+    """HTML-escapes a ts_headline() result and turns its match markers into <mark> tags."""
+    return (
+        str(escape(headline or ""))
+        .replace(HEADLINE_START, "<mark>")
+        .replace(HEADLINE_STOP, "</mark>")
+    )
+
+
+def _fulltext_fallback(q, limit, after):
+    words = q.split()
+    query = Receipt.query.filter(*[
+        Receipt.ocr_text.ilike(f"%{_escape_like(word)}%", escape="\\") for word in words
+    ])
+    if after:
+        query = query.filter(Receipt.id < after[1])
+    receipts = query.options(undefer(Receipt.ocr_text)).order_by(Receipt.id.desc()).limit(limit).all()
+    return [(receipt, 0.0, _highlight(receipt.ocr_text, words)) for receipt in receipts]
+
+
+def _highlight(text, words, context=60):
+    """An HTML snippet around the first matched word, escaped, with every match wrapped in <mark>."""
+    pattern = re.compile("|".join(re.escape(word) for word in words), re.I)
+    match = pattern.search(text or "")
+    if not match:
+        return ""
+    start, end = max(0, match.start() - context), min(len(text), match.end() + context)
+    snippet = " ".join(text[start:end].split())
+    parts, position = [], 0
+    for found in pattern.finditer(snippet):
+        parts += [escape(snippet[position:found.start()]), f"<mark>{escape(found.group(0))}</mark>"]
+        position = found.end()
+    parts.append(escape(snippet[position:]))
+    return "".join(str(part) for part in parts)
+
+
+def _escape_like(value):
+    """Escapes LIKE wildcards (with backslash as the escape character) so they match literally."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
 def update_receipt(receipt_id, data):
     """Updates a receipt by its ID in the database."""
     try:
         # Query the receipt by its ID
         receipt = Receipt.query.get(receipt_id)
         if receipt:
+            old_key, old_amount = rollup_key(receipt), rollup_amount(receipt)
+
             # Update the receipt with the new data
             for key, value in data.items():
                 setattr(receipt, key, value)
+            move_in_rollups(old_key, old_amount, rollup_key(receipt), rollup_amount(receipt))
 
             # Commit the changes to the database
             db.session.commit()
+            bump_data_version()
             return {"message": "Receipt updated successfully!"}
         else:
             return {"error": "Receipt not found"}
@@ -76,7 +289,9 @@ def delete_receipt(receipt_id):
         if receipt:
             # Delete the receipt from the database
             db.session.delete(receipt)
+            add_to_rollups(rollup_key(receipt), -rollup_amount(receipt), count=-1)
             db.session.commit()
+            bump_data_version()
             return {"message": "Receipt deleted successfully!"}
         else:
             return {"error": "Receipt not found"}
@@ -97,31 +312,107 @@ def search_receipts(
 ):
     """Search receipts with multiple filter parameters."""
     try:
-        query = Receipt.query
-
-        if vendor:
-            query = query.filter(Receipt.vendor_name.ilike(f"%{vendor}%"))
-        if city:
-            query = query.filter(Receipt.city.ilike(f"%{city}%"))
-        if min_amount:
-            query = query.filter(Receipt.total_amount >= min_amount)
-        if max_amount:
-            query = query.filter(Receipt.total_amount <= max_amount)
-        if date:
-            query = query.filter(db.func.date(Receipt.date_time) == date)
-        if state:
-            query = query.filter(Receipt.state.ilike(f"%{state}%"))
-        if country:
-            query = query.filter(Receipt.country.ilike(f"%{country}%"))
-        if bill_type:
-            query = query.filter(Receipt.bill_type.ilike(f"%{bill_type}%"))
-
+        query = apply_search_filters(
+            Receipt.query,
+            vendor=vendor,
+            city=city,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            date=date,
+            state=state,
+            country=country,
+            bill_type=bill_type,
+        )
         receipts = query.all()
         return [receipt.to_dict() for receipt in receipts]
     except Exception as e:
         return {"error": f"Failed to search receipts: {str(e)}"}
 
 
+# The keyword arguments of search_receipts() and apply_search_filters()
+SEARCH_FILTERS = ("vendor", "city", "min_amount", "max_amount", "date", "state", "country", "bill_type")
+
+
+def apply_search_filters(
+    query,
+    vendor=None,
+    city=None,
+    min_amount=None,
+    max_amount=None,
+    date=None,
+    state=None,
+    country=None,
+    bill_type=None,
+):
+    """Adds the search_receipts() filters to a query (or select()) over receipts."""
+    query = apply_receipt_filters(
+        query,
+        Receipt,
+        Receipt.date_time,
+        vendor_name=vendor,
+        city=city,
+        state=state,
+        country=country,
+        bill_type=bill_type,
+        date=date,
+    )
+    if min_amount:
+        query = query.filter(Receipt.total_amount >= min_amount)
+    if max_amount:
+        query = query.filter(Receipt.total_amount <= max_amount)
+    return query
+
+
+def apply_receipt_filters(
+    query,
+    table,
+    date_column,
+    vendor_name=None,
+    city=None,
+    state=None,
+    country=None,
+    bill_type=None,
+    date=None,
+    year=None,
+    month=None,
+):
+    """Adds the shared search/analytics filters to a query on receipts or receipt_rollups.
+
+    Text filters are substring matches, which the pg_trgm indexes serve.
+    Date filters become half-open ranges on date_column rather than
+    date()/extract() calls, so the date_time index can be used.
+    """
+    for column, value in (
+        (table.vendor_name, vendor_name),
+        (table.city, city),
+        (table.state, state),
+        (table.country, country),
+        (table.bill_type, bill_type),
+    ):
+        if value:
+            query = query.filter(column.ilike(f"%{value}%"))
+
+    if date:
+        start = datetime.fromisoformat(str(date)).replace(hour=0, minute=0, second=0, microsecond=0)
+        query = _filter_range(query, date_column, start, start + timedelta(days=1))
+    elif year and month:
+        start = datetime(int(year), int(month), 1)
+        end = datetime(int(year) + 1, 1, 1) if int(month) == 12 else datetime(int(year), int(month) + 1, 1)
+        query = _filter_range(query, date_column, start, end)
+    elif year:
+        query = _filter_range(query, date_column, datetime(int(year), 1, 1), datetime(int(year) + 1, 1, 1))
+    elif month:
+        # The same month of every year is not one range, so this one cannot use the index
+        query = query.filter(db.func.extract("month", date_column) == int(month))
+    return query
+
+
+def _filter_range(query, date_column, start, end):
+    if isinstance(date_column.type, db.Date):
+        start, end = start.date(), end.date()
+    return query.filter(date_column >= start, date_column < end)
+
+
 def get_analytics(
     year=None,
     month=None,
@@ -130,51 +421,83 @@ def get_analytics(
     state=None,
     country=None,
     bill_type=None,
+    breakdown=None,
 ):
-    """Get analytics data for receipts."""
-    try:
-        query = Receipt.query
+    """Get analytics data for receipts.
 
-        # Apply filters
-        if year:
-            query = query.filter(
-                db.func.extract("year", Receipt.date_time) == int(year)
-            )
-        if month:
-            query = query.filter(
-                db.func.extract("month", Receipt.date_time) == int(month)
-            )
-        if vendor_name:
-            query = query.filter(Receipt.vendor_name.ilike(f"%{vendor_name}%"))
-        if city:
-            query = query.filter(Receipt.city.ilike(f"%{city}%"))
-        if state:
-            query = query.filter(Receipt.state.ilike(f"%{state}%"))
-        if country:
-            query = query.filter(Receipt.country.ilike(f"%{country}%"))
-        if bill_type:
-            query = query.filter(Receipt.bill_type.ilike(f"%{bill_type}%"))
+    Totals and the per-vendor summary are computed by the database with
+    aggregate queries, so no receipt rows are loaded. breakdown is a comma
+    separated list of extra summaries to add: "bill_type" and/or "month".
+    """
+    try:
+        breakdowns = [name.strip() for name in (breakdown or "").split(",") if name.strip()]
+        unknown = set(breakdowns) - ANALYTICS_BREAKDOWNS
+        if unknown:
+            raise ValueError(f"Unknown breakdown '{', '.join(sorted(unknown))}'.")
 
-        receipts = query.all()
+        if Config.ANALYTICS_USE_ROLLUPS:
+            # Pre-aggregated per day, so the cost follows the number of slices rather than receipts
+            table, date_column = ReceiptRollup, ReceiptRollup.day
+            count = db.func.coalesce(db.func.sum(ReceiptRollup.receipt_count), 0)
+            total = db.func.coalesce(db.func.sum(ReceiptRollup.total_amount), 0)
+            average = total / db.func.nullif(count, 0)
+        else:
+            # Missing amounts count as 0, as they did when this was summed in Python
+            amount = db.func.coalesce(Receipt.total_amount, 0)
+            table, date_column = Receipt, Receipt.date_time
+            count = db.func.count(Receipt.id)
+            total = db.func.coalesce(db.func.sum(amount), 0)
+            average = db.func.avg(amount)
 
-        # Calculate analytics
-        total_spent = sum(receipt.total_amount for receipt in receipts)
-        receipt_count = len(receipts)
-        avg_amount = total_spent / receipt_count if receipt_count > 0 else 0
+        query = apply_receipt_filters(
+            table.query,
+            table,
+            date_column,
+            vendor_name=vendor_name,
+            city=city,
+            state=state,
+            country=country,
+            bill_type=bill_type,
+            year=year,
+            month=month,
+        )
 
-        # Group by vendor
-        vendor_summary = {}
-        for receipt in receipts:
-            if receipt.vendor_name not in vendor_summary:
-                vendor_summary[receipt.vendor_name] = {"count": 0, "total": 0}
-            vendor_summary[receipt.vendor_name]["count"] += 1
-            vendor_summary[receipt.vendor_name]["total"] += receipt.total_amount
+        receipt_count, total_spent, avg_amount = query.with_entities(count, total, average).one()
 
-        return {
+        result = {
             "total_spent": total_spent,
             "receipt_count": receipt_count,
-            "average_amount": avg_amount,
-            "vendor_summary": vendor_summary,
+            "average_amount": avg_amount or 0,
+            "vendor_summary": _summarize(query, [table.vendor_name], count, total),
         }
+        if "bill_type" in breakdowns:
+            result["bill_type_summary"] = _summarize(query, [table.bill_type], count, total)
+        if "month" in breakdowns:
+            year_column = db.func.extract("year", date_column)
+            month_column = db.func.extract("month", date_column)
+            summary = _summarize(
+                query.filter(date_column.isnot(None)).order_by(year_column, month_column),
+                [year_column, month_column],
+                count,
+                total,
+            )
+            result["monthly_summary"] = {
+                f"{int(row_year):04d}-{int(row_month):02d}": values
+                for (row_year, row_month), values in summary.items()
+            }
+        return result
     except Exception as e:
         return {"error": f"Failed to get analytics: {str(e)}"}
+
+
+def _summarize(query, columns, count, total):
+    """{value: {"count", "total"}} per distinct value of columns (a tuple key for several), using GROUP BY."""
+    grouped = query.with_entities(*columns, count, total).group_by(*columns)
+    if Config.ANALYTICS_USE_ROLLUPS:
+        # Deletes leave emptied rollup rows behind until the next rebuild
+        grouped = grouped.having(count != 0)
+    summary = {}
+    for row in grouped.all():
+        key = row[0] if len(columns) == 1 else tuple(row[:len(columns)])
+        summary[key] = {"count": row[-2], "total": row[-1]}
+    return summary
@@ -0,0 +1,111 @@
+from datetime import datetime
+from sqlalchemy import delete, insert, select, update
+from config.settings import Config
+from core.database import db
+from schemas.receipt_schema import Receipt
+from schemas.receipt_rollup_schema import ROLLUP_DIMENSIONS, ReceiptRollup
+
+
+def rollup_key(receipt):
+    """Returns the rollup dimensions of a Receipt."""
+    key = {"day": _to_day(receipt.date_time)}
+    key.update({name: getattr(receipt, name) for name in ROLLUP_DIMENSIONS})
+    return key
+
+
+def rollup_amount(receipt):
+    """The amount a Receipt contributes to its rollup; missing totals count as 0."""
+    amount = receipt.total_amount
+    return float(amount) if amount not in (None, "") else 0.0
+
+
+def add_to_rollups(key, amount, count=1):
+    """Adds count receipts totalling amount to the rollup row for key (negative values subtract).
+
+    Runs in the caller's transaction, so the rollup commits or rolls back with
+    the receipt change. Only the lowest-id row for a key is updated: if two
+    writers race to create the same key they each insert a row, which the
+    SUMs over rollups still add up correctly. Does nothing while
+    ANALYTICS_USE_ROLLUPS is off, so writes skip the rollup rows entirely.
+    """
+    if not Config.ANALYTICS_USE_ROLLUPS:
+        return
+    conditions = [
+        getattr(ReceiptRollup, name).is_(None) if value is None else getattr(ReceiptRollup, name) == value
+        for name, value in key.items()
+    ]
+    target = select(db.func.min(ReceiptRollup.id)).where(*conditions).scalar_subquery()
+    result = db.session.execute(
+        update(ReceiptRollup)
+        .where(ReceiptRollup.id == target)
+        .values(
+            receipt_count=ReceiptRollup.receipt_count + count,
+            total_amount=ReceiptRollup.total_amount + amount,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.session.execute(insert(ReceiptRollup).values(**key, receipt_count=count, total_amount=amount))
+
+
+def move_in_rollups(old_key, old_amount, new_key, new_amount):
+    """Moves one receipt from old_key/old_amount to new_key/new_amount."""
+    if old_key == new_key:
+        if old_amount != new_amount:
+            add_to_rollups(new_key, new_amount - old_amount, count=0)
+        return
+    add_to_rollups(old_key, -old_amount, count=-1)
+    add_to_rollups(new_key, new_amount)
+
+
+def collect_rollup_delta(deltas, receipt, sign):
+    """Accumulates +1 (sign=1) or -1 (sign=-1) receipt into deltas, keyed by rollup key."""
+    key = tuple(rollup_key(receipt).items())
+    count, amount = deltas.get(key, (0, 0.0))
+    deltas[key] = (count + sign, amount + sign * rollup_amount(receipt))
+
+
+def apply_rollup_deltas(deltas):
+    """Applies collected deltas with one statement per distinct rollup key."""
+    for key, (count, amount) in deltas.items():
+        if count or amount:
+            add_to_rollups(dict(key), amount, count=count)
+
+
+def rebuild_rollups():
+    """Recomputes every rollup row from the receipts table in one transaction; returns the row count.
+
+    Used to backfill whenever ANALYTICS_USE_ROLLUPS is turned on (rollups are
+    not maintained while it is off) and to compact keys that were split by
+    concurrent writers or emptied by deletes.
+    """
+    if db.engine.dialect.name == "postgresql":
+        # Writers wait for the rebuild instead of updating rows it is about to replace
+        db.session.execute(db.text("LOCK TABLE receipt_rollups IN EXCLUSIVE MODE"))
+
+    day = db.func.date(Receipt.date_time)
+    dimensions = [getattr(Receipt, name) for name in ROLLUP_DIMENSIONS]
+    source = select(
+        day,
+        *dimensions,
+        db.func.count(Receipt.id),
+        db.func.coalesce(db.func.sum(Receipt.total_amount), 0),
+    ).group_by(day, *dimensions)
+
+    db.session.execute(delete(ReceiptRollup))
+    db.session.execute(
+        insert(ReceiptRollup).from_select(
+            ["day", *ROLLUP_DIMENSIONS, "receipt_count", "total_amount"], source
+        )
+    )
+    db.session.commit()
+    return db.session.scalar(select(db.func.count(ReceiptRollup.id)))
+
+
+def _to_day(value):
+    # update_receipt sets attributes straight from the request JSON, so dates may still be strings
+    if value in (None, ""):
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.date() if isinstance(value, datetime) else value
@@ -0,0 +1,24 @@
+from core.database import db
+
+# Receipt columns a rollup row is keyed on, besides the day
+ROLLUP_DIMENSIONS = ["vendor_name", "bill_type", "city", "state", "country"]
+
+
+class ReceiptRollup(db.Model):
+    """Receipt count and total per day x vendor x bill type x location, kept in step with receipts."""
+
+    __tablename__ = "receipt_rollups"
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=True)
+    vendor_name = db.Column(db.String(100), nullable=True)
+    bill_type = db.Column(db.String(50), nullable=True)
+    city = db.Column(db.String(50), nullable=True)
+    state = db.Column(db.String(50), nullable=True)
+    country = db.Column(db.String(50), nullable=True)
+    receipt_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_receipt_rollups_key", "day", *ROLLUP_DIMENSIONS),
+    )
@@ -1,5 +1,19 @@
+from sqlalchemy import DDL, event
 from core.database import db
 
+# Columns searched with ilike('%text%'); on PostgreSQL each gets a pg_trgm GIN index
+TRIGRAM_COLUMNS = ["vendor_name", "city", "state", "country", "bill_type"]
+
+FULLTEXT_CONFIG = "english"
+
+# PostgreSQL keeps a tsvector of the OCR text in step with it. It is not mapped on the
+# model because other databases cannot create it; queries refer to it by name.
+SEARCH_VECTOR_DDL = [
+    "ALTER TABLE receipts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS "
+    f"(to_tsvector('{FULLTEXT_CONFIG}', coalesce(ocr_text, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_receipts_search_vector ON receipts USING gin (search_vector)",
+]
+
 class Receipt(db.Model):
     __tablename__ = "receipts"
 
@@ -11,6 +25,26 @@ class Receipt(db.Model):
     city = db.Column(db.String(50), nullable=True)
     state = db.Column(db.String(50), nullable=True)
     country = db.Column(db.String(50), nullable=True)
+    # Raw OCR text for full-text search; deferred so listings do not load it
+    ocr_text = db.deferred(db.Column(db.Text, nullable=True))
+
+    __table_args__ = (
+        # Date filters are written as date_time ranges so they can use this index
+        db.Index("ix_receipts_date_time", "date_time"),
+        # Same order as the receipt listing, so keyset pages are index scans
+        db.Index(
+            "ix_receipts_listing", date_time.desc().nulls_last(), id.desc()
+        ).ddl_if(dialect="postgresql"),
+        *[
+            db.Index(
+                f"ix_receipts_{column}_trgm",
+                column,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+            ).ddl_if(dialect="postgresql")
+            for column in TRIGRAM_COLUMNS
+        ],
+    )
 
     def to_dict(self):
         return {
@@ -23,4 +57,14 @@ class Receipt(db.Model):
             'state': self.state,
             'country': self.country
         }
-    
+
+
+# The trigram operator classes come from the pg_trgm extension
+event.listen(
+    Receipt.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+for statement in SEARCH_VECTOR_DDL:
+    event.listen(Receipt.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
@@ -0,0 +1,57 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import Config
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop():
+    """Returns the process-wide OCR event loop, starting it on a daemon thread on first use.
+
+    Its default executor is one shared pool of OCR_IO_WORKERS threads for the
+    blocking Google SDK calls, so the number of threads does not grow with
+    the number of documents in flight.
+    """
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                loop.set_default_executor(
+                    ThreadPoolExecutor(max_workers=Config.OCR_IO_WORKERS, thread_name_prefix="ocr-io")
+                )
+                threading.Thread(target=loop.run_forever, name="ocr-event-loop", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def run_coroutine(coro, timeout=None):
+    """Runs a coroutine on the shared loop from synchronous code and waits for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result(timeout)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Awaits a blocking call on the shared executor."""
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+async def wait_for_operation(operation, timeout):
+    """Polls a long-running operation until it is done, without holding a thread while it waits.
+
+    Each done() check is one short RPC on the executor; the sleep between
+    checks starts at OCR_POLL_INTERVAL and doubles up to OCR_POLL_MAX_INTERVAL.
+    Returns operation.result(), which raises if the operation failed.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = Config.OCR_POLL_INTERVAL
+    while not await run_blocking(operation.done):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise TimeoutError(f"Operation did not finish within {timeout} seconds.")
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, Config.OCR_POLL_MAX_INTERVAL)
+    return await run_blocking(operation.result)
@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import text
+from config.settings import Config
+from core.database import db
+
+logger = logging.getLogger(__name__)
+
+
+class ClientRegistry:
+    """Creates each Google client once per process and shares it between threads.
+
+    Clients are built on first use from the registered factory. Creation
+    time, lookups and the latency of calls wrapped in timed() are counted
+    per client.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._clients = {}
+        self._locks = {}
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def register(self, name, factory):
+        self._factories[name] = factory
+        self._locks[name] = threading.Lock()
+        self._stats[name] = {
+            "created": 0,
+            "creation_seconds": 0.0,
+            "lookups": 0,
+            "calls": 0,
+            "call_seconds": 0.0,
+        }
+
+    def get(self, name):
+        client = self._clients.get(name)
+        if client is None:
+            with self._locks[name]:
+                client = self._clients.get(name)
+                if client is None:
+                    started = time.perf_counter()
+                    client = self._factories[name]()
+                    self._clients[name] = client
+                    elapsed = time.perf_counter() - started
+                    self._count(name, created=1, creation_seconds=elapsed)
+                    logger.info(f"Created {name} client in {elapsed:.3f}s")
+        self._count(name, lookups=1)
+        return client
+
+    def set(self, name, client):
+        """Replaces a client, e.g. with a fake for tests and benchmarks."""
+        with self._locks[name]:
+            self._clients[name] = client
+
+    def reset(self, name=None):
+        """Drops cached clients so the next get() builds new ones."""
+        for key in [name] if name else list(self._factories):
+            with self._locks[key]:
+                self._clients.pop(key, None)
+
+    @contextmanager
+    def timed(self, name):
+        """Records the latency of a call made through the named client."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._count(name, calls=1, call_seconds=time.perf_counter() - started)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+        for name, values in stats.items():
+            values["initialized"] = name in self._clients
+            values["avg_call_seconds"] = values["call_seconds"] / values["calls"] if values["calls"] else 0
+        return stats
+
+    def _count(self, name, **increments):
+        with self._stats_lock:
+            for key, value in increments.items():
+                self._stats[name][key] += value
+
+
+# The Google SDKs are slow to import, so each factory imports its own on first use
+def _create_storage_client():
+    from google.cloud import storage
+
+    return storage.Client()
+
+
+def _create_vision_client():
+    from google.cloud import vision
+
+    return vision.ImageAnnotatorClient()
+
+
+def _create_llm():
+    from langchain_google_genai import GoogleGenerativeAI
+
+    return GoogleGenerativeAI(model="gemini-1.5-flash", temperature=0)
+
+
+registry = ClientRegistry()
+registry.register("storage", _create_storage_client)
+registry.register("vision", _create_vision_client)
+registry.register("llm", _create_llm)
+
+
+def get_storage_client():
+    return registry.get("storage")
+
+
+def get_vision_client():
+    return registry.get("vision")
+
+
+def get_llm():
+    return registry.get("llm")
+
+
+def warm_up(app):
+    """Builds every client and opens connections so the first request is not the slow one.
+
+    Failures are logged rather than raised; the request path will retry.
+    """
+    started = time.perf_counter()
+    for name, warm in (
+        ("storage", _warm_storage),
+        ("vision", _warm_vision),
+        ("llm", get_llm),
+        ("database", lambda: _warm_database(app)),
+    ):
+        try:
+            warm()
+        except Exception as e:
+            logger.warning(f"Warm-up of {name} failed: {e}")
+    logger.info(f"Client warm-up finished in {time.perf_counter() - started:.3f}s")
+
+
+def _warm_storage():
+    if Config.STORAGE_BACKEND != "gcs":
+        return
+    # Resolves credentials and opens the HTTPS connection (DNS + TLS) to Cloud Storage
+    client = get_storage_client()
+    with registry.timed("storage"):
+        client.lookup_bucket(Config.BUCKET_NAME)
+
+
+def _warm_vision():
+    import grpc
+
+    # The gRPC channel connects lazily; wait for it so the TLS handshake happens now
+    client = get_vision_client()
+    with registry.timed("vision"):
+        grpc.channel_ready_future(client.transport.grpc_channel).result(timeout=10)
+
+
+def _warm_database(app):
+    with app.app_context():
+        db.session.execute(text("SELECT 1"))
+        db.session.remove()
@@ -1,17 +1,153 @@
-from google.cloud import storage
+import io
+import mmap
+import os
 import re
+import shutil
+import tempfile
+import threading
+from collections import namedtuple
+from services.clients import get_storage_client, registry
+from config.settings import Config
+
+# An object in LocalStorage; .name matches the GCS blob name
+LocalBlob = namedtuple("LocalBlob", ["name", "path"])
+
+# Files being written by LocalStorage; never listed
+TEMP_PREFIX = ".upload-"
+
 
 def get_bucket_and_prefix(gcs_uri):
     """Extract bucket name and file prefix from a GCS URI."""
     match = re.match(r"gs://([^/]+)/?(.*)", gcs_uri.strip())
     return match.group(1), match.group(2)
 
+
+class GCSStorage:
+    """Objects in Google Cloud Storage, through the shared storage client."""
+
+    name = "gcs"
+    # Vision's async file OCR reads its input from and writes its output to GCS itself
+    supports_async_ocr = True
+
+    def upload_file(self, bucket_name, object_name, file_obj, content_type=None):
+        blob = get_storage_client().bucket(bucket_name).blob(object_name)
+        with registry.timed("storage"):
+            blob.upload_from_file(file_obj, content_type=content_type, rewind=True)
+
+    def list_blobs(self, bucket_name, prefix):
+        # bucket() builds a local handle; get_bucket() would cost an extra metadata request
+        bucket = get_storage_client().bucket(bucket_name)
+        with registry.timed("storage"):
+            return [blob for blob in bucket.list_blobs(prefix=prefix) if not blob.name.endswith("/")]
+
+    def read_blob(self, blob):
+        with registry.timed("storage"):
+            return blob.download_as_bytes()
+
+    def read_bytes(self, bucket_name, object_name):
+        return self.read_blob(get_storage_client().bucket(bucket_name).blob(object_name))
+
+
+class LocalStorage:
+    """Objects as files under root/<bucket>/<object name>, for nodes that do not need GCS.
+
+    Writes go to a temp file in the target directory and are renamed into
+    place, so readers never see a partial object. Reads memory-map the file.
+    """
+
+    name = "local"
+    supports_async_ocr = False
+
+    def __init__(self, root):
+        self._root = os.path.abspath(root)
+
+    def upload_file(self, bucket_name, object_name, file_obj, content_type=None):
+        path = self._path(bucket_name, object_name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                file_obj.seek(0)
+                shutil.copyfileobj(file_obj, out)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def list_blobs(self, bucket_name, prefix):
+        bucket_root = self._path(bucket_name, "")
+        # Only walk the directory the prefix points into
+        start = self._path(bucket_name, prefix.rpartition("/")[0]) if "/" in prefix else bucket_root
+        blobs = []
+        for directory, _, files in os.walk(start):
+            for file_name in files:
+                if file_name.startswith(TEMP_PREFIX):
+                    continue
+                path = os.path.join(directory, file_name)
+                name = os.path.relpath(path, bucket_root).replace(os.sep, "/")
+                if name.startswith(prefix):
+                    blobs.append(LocalBlob(name, path))
+        return sorted(blobs)
+
+    def read_blob(self, blob):
+        with open(blob.path, "rb") as f:
+            # mmap cannot map an empty file
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[:]
+
+    def read_bytes(self, bucket_name, object_name):
+        return self.read_blob(LocalBlob(object_name, self._path(bucket_name, object_name)))
+
+    def _path(self, bucket_name, object_name):
+        path = os.path.abspath(os.path.join(self._root, bucket_name, object_name))
+        if not path.startswith(os.path.join(self._root, "")):
+            raise ValueError(f"Object '{bucket_name}/{object_name}' is outside the storage directory.")
+        return path
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Returns the process-wide storage backend chosen by Config.STORAGE_BACKEND ("gcs" or "local")."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if Config.STORAGE_BACKEND == "gcs":
+                    _storage = GCSStorage()
+                elif Config.STORAGE_BACKEND == "local":
+                    _storage = LocalStorage(Config.LOCAL_STORAGE_DIR)
+                else:
+                    raise ValueError(f"Unknown storage backend '{Config.STORAGE_BACKEND}'.")
+    return _storage
+
+
+def upload_file(bucket_name, object_name, file_obj, content_type=None):
+    """Stores a file-like object, read from its start."""
+    get_storage().upload_file(bucket_name, object_name, file_obj, content_type)
+
+
+def upload_bytes(bucket_name, object_name, data, content_type=None):
+    get_storage().upload_file(bucket_name, object_name, io.BytesIO(data), content_type)
+
+
 def list_blobs(bucket_name, prefix):
     """List all blobs in a bucket with the given prefix."""
-    storage_client = storage.Client()
-    bucket = storage_client.get_bucket(bucket_name)
-    return [blob for blob in bucket.list_blobs(prefix=prefix) if not blob.name.endswith("/")]
+    return get_storage().list_blobs(bucket_name, prefix)
+
 
 def download_blob(blob):
     """Download a blob's content."""
-    return blob.download_as_bytes().decode("utf-8")
+    return get_storage().read_blob(blob).decode("utf-8")
+
+
+def read_bytes(bucket_name, object_name):
+    return get_storage().read_bytes(bucket_name, object_name)
@@ -1,15 +1,44 @@
-import os
 import logging
+import re
+import uuid
 from werkzeug.utils import secure_filename
-from services.image_processing import image_to_pdf  # Assume you have this function
+from services.image_processing import image_to_pdf, ocr_pdf_files, render_jpegs
+from services.ocr_service import build_ocr_results, detect_images
+from services.result_cache import get_ocr_cache, hash_stream
+from services.tesseract_ocr import tesseract_texts
 from config.settings import Config  # Import configuration
+from core.metrics import OCR_FALLBACKS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def upload_image(image):
-    """Handles image upload and processing."""
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
+ALLOWED_EXTENSIONS = IMAGE_EXTENSIONS | {'pdf'}
+OCR_MODES = {'pdf', 'image'}
+OCR_ENGINES = {'vision', 'tesseract'}
+PDF_PAGE = re.compile(rb"/Type\s*/Page(?![a-z])")
+
+
+def is_allowed_file(filename):
+    """Checks whether the uploaded file name has a supported image or PDF extension."""
+    filename = secure_filename(filename or "")
+    return filename.rsplit('.', 1)[-1].lower() in ALLOWED_EXTENSIONS
+
+
+def upload_image(image, ocr_mode=None, ocr_engine=None):
+    """Handles image upload and processing.
+
+    ocr_mode overrides Config.OCR_MODE for this upload: "pdf" converts the image
+    to a PDF and runs async OCR through Cloud Storage, "image" sends the bytes
+    straight to Vision. ocr_engine overrides Config.OCR_ENGINE: "vision", or
+    "tesseract" to OCR locally (falling back to Vision in ocr_mode when
+    enabled and Tesseract is not confident).
+
+    Each receipt in a photo and each page of an uploaded PDF becomes its own
+    entry in "receipts"; PDFs always go through Vision's file OCR. The first
+    receipt is also returned at the top level.
+    """
 
     try:
         # Ensure the uploaded file is valid
@@ -17,37 +46,55 @@ def upload_image(image):
             raise ValueError("No file provided.")
 
         # Validate file type (Optional, but recommended)
-        allowed_extensions = {'jpg', 'jpeg', 'png'}
         filename = secure_filename(image.filename)
-        file_ext = filename.rsplit('.', 1)[-1].lower()
 
-        if file_ext not in allowed_extensions:
-            raise ValueError("Invalid file type. Only JPG, JPEG, and PNG are allowed.")
+        if not is_allowed_file(filename):
+            raise ValueError("Invalid file type. Only JPG, JPEG, PNG, and PDF are allowed.")
 
-        # Get environment variables from Config
-        image_save_path = Config.IMAGE_SAVE_PATH
-        pdf_output_path = Config.PDF_OUTPUT_PATH
-        bucket_name = Config.BUCKET_NAME
-        dest_bucket_name = Config.DEST_BUCKET_NAME
-        output_file_name = Config.PDF_OUTPUT_FILE_NAME
+        ocr_mode = (ocr_mode or Config.OCR_MODE).lower()
+        if ocr_mode not in OCR_MODES:
+            raise ValueError(f"Invalid OCR mode '{ocr_mode}'. Use one of: {', '.join(sorted(OCR_MODES))}.")
 
-        # Ensure upload directory exists
-        upload_dir = os.path.dirname(image_save_path)
-        os.makedirs(upload_dir, exist_ok=True)
+        ocr_engine = (ocr_engine or Config.OCR_ENGINE).lower()
+        if ocr_engine not in OCR_ENGINES:
+            raise ValueError(f"Invalid OCR engine '{ocr_engine}'. Use one of: {', '.join(sorted(OCR_ENGINES))}.")
+        if is_pdf(filename):
+            # Tesseract reads images only
+            ocr_engine = "vision"
 
-        # Save the uploaded file securely
-        image_path = os.path.join(upload_dir, filename)
-        image.save(image_path)
+        # Identical bytes were already OCR'd and extracted; skip every cloud call
+        cache = get_ocr_cache()
+        cache_key = hash_stream(image.stream)
+        if ocr_engine != "vision":
+            # Engines read text differently, so each keeps its own entries
+            cache_key = f"{ocr_engine}:{cache_key}"
+        ocr_result = cache.get(cache_key) if cache else None
 
-        logger.info(f"File uploaded successfully: {image_path}")
+        if ocr_result is not None:
+            logger.info(f"OCR cache hit for {filename}")
+            if "receipts" not in ocr_result:
+                # Entries cached before multi-receipt uploads hold a single receipt
+                ocr_result = {"receipts": [ocr_result]}
+        else:
+            if is_pdf(filename):
+                ocr_result = ocr_pdf_upload(image, filename)
+            elif ocr_engine == "tesseract":
+                ocr_result = ocr_with_tesseract(image, filename, ocr_mode)
+            else:
+                ocr_result = ocr_with_vision(image, filename, ocr_mode)
 
-        # Process the image (Convert to PDF)
-        formatted_data = image_to_pdf(image_path, pdf_output_path, bucket_name, dest_bucket_name, output_file_name)
+            if "error" in ocr_result:
+                return {"error": ocr_result["error"]}, 422
+            if cache:
+                cache.set(cache_key, ocr_result)
 
+        receipts = ocr_result["receipts"]
         return {
             "message": "File uploaded and processed successfully!",
             "file_name": filename,
-            "formatted_data": formatted_data
+            "formatted_data": receipts[0]["formatted_data"],
+            "ocr_text": receipts[0]["ocr_text"],
+            "receipts": receipts,
         }
 
     except ValueError as ve:
@@ -57,3 +104,83 @@ def upload_image(image):
     except Exception as e:
         logger.error(f"Unexpected error during upload: {e}", exc_info=True)
         return {"error": "An error occurred while processing the image."}, 500
+
+
+def is_pdf(filename):
+    return filename.rsplit('.', 1)[-1].lower() == 'pdf'
+
+
+def ocr_with_vision(image, filename, ocr_mode, contents=None):
+    """OCRs the upload with Google Vision, through a PDF in storage or in memory.
+
+    contents are the images as they would be sent in "image" mode, one per
+    receipt, if already rendered.
+    """
+    if ocr_mode == "image":
+        # Nothing touches the disk or Cloud Storage in this mode
+        if contents is None:
+            contents = render_images(image)
+        logger.info(f"Processing in memory: {filename}")
+        return detect_images(contents)
+    return ocr_via_pdf(image, filename)
+
+
+def render_images(image):
+    """The upload as the images sent to Vision or Tesseract: one pre-processed JPEG per receipt, or the raw bytes."""
+    image.stream.seek(0)
+    return render_jpegs(image.stream) if Config.PREPROCESS_ENABLED else [image.read()]
+
+
+def ocr_with_tesseract(image, filename, ocr_mode):
+    """OCRs the upload locally with Tesseract on the pre-processed image.
+
+    If Config.OCR_FALLBACK_ENGINE is "vision" and Tesseract fails or its mean
+    word confidence is below Config.TESSERACT_MIN_CONFIDENCE, the upload is
+    OCR'd again with Vision in ocr_mode.
+    """
+    contents = render_images(image)
+    try:
+        results = tesseract_texts(contents)
+    except Exception as e:
+        if Config.OCR_FALLBACK_ENGINE != "vision":
+            raise
+        logger.warning(f"Tesseract failed on {filename}, falling back to Vision: {e}")
+        OCR_FALLBACKS.labels("error").inc()
+        return ocr_with_vision(image, filename, ocr_mode, contents)
+
+    # The least confident receipt decides, so a photo is never OCR'd by both engines
+    confidence = min(confidence for _, confidence in results)
+    if Config.OCR_FALLBACK_ENGINE == "vision" and (
+        not all(text for text, _ in results) or confidence < Config.TESSERACT_MIN_CONFIDENCE
+    ):
+        logger.info(f"Tesseract confidence {confidence:.0f} on {filename}, falling back to Vision")
+        OCR_FALLBACKS.labels("low_confidence").inc()
+        return ocr_with_vision(image, filename, ocr_mode, contents)
+    logger.info(f"Processed with Tesseract (confidence {confidence:.0f}): {filename}")
+    return build_ocr_results([text for text, _ in results])
+
+
+def ocr_via_pdf(image, filename):
+    """Converts the image to a PDF in Cloud Storage and runs async OCR on it."""
+    # A unique object per upload keeps concurrent uploads from overwriting each other
+    object_name = f"{Config.PDF_OBJECT_PREFIX}{uuid.uuid4().hex}.pdf"
+    logger.info(f"Uploading {filename} as gs://{Config.BUCKET_NAME}/{object_name}")
+
+    image.stream.seek(0)
+    return image_to_pdf(image.stream, Config.BUCKET_NAME, Config.DEST_BUCKET_NAME, object_name)
+
+
+def ocr_pdf_upload(image, filename):
+    """Uploads a PDF as-is and OCRs it with Vision, one receipt per page."""
+    image.stream.seek(0)
+    content = image.stream.read()
+    if not content.startswith(b"%PDF-"):
+        raise ValueError("Uploaded file is not a readable PDF.")
+    # Page objects in compressed object streams are not counted; detect_document() checks again after OCR
+    if len(PDF_PAGE.findall(content)) > Config.RECEIPT_MAX_PAGES:
+        raise ValueError(f"PDF has more than {Config.RECEIPT_MAX_PAGES} pages.")
+
+    object_name = f"{Config.PDF_OBJECT_PREFIX}{uuid.uuid4().hex}.pdf"
+    logger.info(f"Uploading {filename} as gs://{Config.BUCKET_NAME}/{object_name}")
+    image.stream.seek(0)
+    return ocr_pdf_files([image.stream], Config.BUCKET_NAME, Config.DEST_BUCKET_NAME, [object_name])
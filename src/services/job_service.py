@@ -0,0 +1,175 @@
+import logging
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from werkzeug.datastructures import FileStorage
+from config.settings import Config
+from core.metrics import stage_timer
+from services.file_service import upload_image
+from domain.bulk_receipts import bulk_insert_receipts
+from domain.receipts import insert_receipt
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = {"succeeded", "failed"}
+
+
+class QueueFullError(Exception):
+    """Raised when every worker is busy and the pending queue is full."""
+
+
+class JobQueue:
+    """Bounded in-process worker pool that tracks background jobs by id."""
+
+    def __init__(self, max_workers, max_pending, retention):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="upload-job"
+        )
+        # One slot per running job plus one per job waiting for a worker
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._retention = retention
+
+    def submit(self, func, *args, **kwargs):
+        """Queues func(*args, **kwargs) and returns the new job id."""
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError("Upload queue is full. Please try again later.")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._prune()
+
+        try:
+            self._executor.submit(self._run, job, func, args, kwargs)
+        except Exception:
+            self._slots.release()
+            with self._lock:
+                self._jobs.pop(job_id, None)
+            raise
+        return job_id
+
+    def get(self, job_id):
+        """Returns a snapshot of the job, or None if it is unknown or expired."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, func, args, kwargs):
+        self._update(job, status="running", started_at=_now())
+        try:
+            result = func(*args, **kwargs)
+            if isinstance(result, dict) and "error" in result:
+                self._update(job, status="failed", error=result["error"], finished_at=_now())
+            else:
+                self._update(job, status="succeeded", result=result, finished_at=_now())
+        except Exception as e:
+            logger.error(f"Job {job['job_id']} failed: {e}", exc_info=True)
+            self._update(job, status="failed", error=str(e), finished_at=_now())
+        finally:
+            self._slots.release()
+
+    def _update(self, job, **fields):
+        with self._lock:
+            job.update(fields)
+
+    def _prune(self):
+        """Drops the oldest finished jobs once the retention limit is exceeded."""
+        excess = len(self._jobs) - self._retention
+        if excess <= 0:
+            return
+        for job_id in [j for j, job in self._jobs.items() if job["status"] in FINISHED_STATUSES][:excess]:
+            del self._jobs[job_id]
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Returns the process-wide upload job queue, creating it on first use."""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue(
+                    Config.UPLOAD_WORKERS,
+                    Config.UPLOAD_QUEUE_SIZE,
+                    Config.UPLOAD_JOB_RETENTION,
+                )
+    return _job_queue
+
+
+def buffer_upload(image):
+    """Copies an uploaded file so it outlives the request.
+
+    The copy stays in memory up to UPLOAD_SPOOL_MAX_BYTES and only spills to
+    an anonymous temp file above that.
+    """
+    buffer = tempfile.SpooledTemporaryFile(max_size=Config.UPLOAD_SPOOL_MAX_BYTES)
+    shutil.copyfileobj(image.stream, buffer)
+    buffer.seek(0)
+    return FileStorage(
+        stream=buffer,
+        filename=image.filename,
+        content_type=image.content_type,
+    )
+
+
+def process_receipt_upload(app, image, ocr_mode=None, ocr_engine=None):
+    """Runs the OCR pipeline for an uploaded image or PDF and stores its receipts.
+
+    Returns the ids of every receipt stored in "receipt_ids", the first also
+    as "receipt_id".
+    """
+    with stage_timer("upload_image"):
+        upload = upload_image(image, ocr_mode, ocr_engine)
+    if isinstance(upload, tuple):
+        # upload_image reports failures as (error, status_code)
+        upload = upload[0]
+    if "error" in upload:
+        return upload
+
+    receipts = upload["receipts"]
+    with app.app_context(), stage_timer("db_insert"):
+        if len(receipts) == 1:
+            result = insert_receipt(receipts[0])
+            if "receipt_id" in result:
+                result["receipt_ids"] = [result["receipt_id"]]
+            return result
+        inserted = bulk_insert_receipts(receipts)
+
+    if "error" in inserted:
+        return inserted
+    receipt_ids = [item["receipt_id"] for item in inserted["results"] if "receipt_id" in item]
+    if not receipt_ids:
+        return {"error": inserted["results"][0]["error"]}
+    result = {
+        "message": f"Inserted {len(receipt_ids)} receipts into PostgreSQL successfully!",
+        "receipt_id": receipt_ids[0],
+        "receipt_ids": receipt_ids,
+    }
+    if inserted["failed"]:
+        result["failed"] = [item for item in inserted["results"] if "error" in item]
+    return result
@@ -1,54 +1,29 @@
-from google.cloud import vision
+import hashlib
 import json
-from services.cloud_storage import get_bucket_and_prefix, list_blobs, download_blob
-from langchain_google_genai import GoogleGenerativeAI
-from concurrent.futures import ThreadPoolExecutor
+import logging
+import re
+import threading
+import time
+from services.cloud_storage import (
+    download_blob,
+    get_bucket_and_prefix,
+    get_storage,
+    list_blobs,
+    read_bytes,
+    upload_bytes,
+)
+from services.clients import get_llm, get_vision_client, registry
+from services.async_runtime import run_blocking, run_coroutine, wait_for_operation
+from services.receipt_parser import parse_receipt_json
+from services.result_cache import MemoryBackend, ResultCache, hash_bytes
+from config.settings import Config
+from core.metrics import stage_timer
 import asyncio
 import os
-llm = GoogleGenerativeAI(model="gemini-1.5-flash", temperature=0)
 
+logger = logging.getLogger(__name__)
 
-def async_detect_document(gcs_source_uri, gcs_destination_uri):
-    """Performs OCR on PDF files stored in Google Cloud Storage."""
-    mime_type = "application/pdf"
-    batch_size = 2
-
-    client = vision.ImageAnnotatorClient()
-    feature = vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)
-
-    input_config = vision.InputConfig(
-        gcs_source=vision.GcsSource(uri=gcs_source_uri), mime_type=mime_type
-    )
-    output_config = vision.OutputConfig(
-        gcs_destination=vision.GcsDestination(uri=gcs_destination_uri),
-        batch_size=batch_size,
-    )
-
-    async_request = vision.AsyncAnnotateFileRequest(
-        features=[feature], input_config=input_config, output_config=output_config
-    )
-    operation = client.async_batch_annotate_files(requests=[async_request])
-
-    operation.result(timeout=420)
-
-    bucket_name, prefix = get_bucket_and_prefix(gcs_destination_uri)
-    blob_list = list_blobs(bucket_name, prefix)
-
-    if not blob_list:
-        return {"error": "No OCR output found."}
-    response = json.loads(download_blob(blob_list[0]))
-    first_page_response = response["responses"][0]
-    annotation = first_page_response.get("fullTextAnnotation", {})
-    return (
-        process_text(annotation["text"])
-        if "text" in annotation
-        else {"error": "No text found"}
-    )
-
-
-def process_text(text):
-    """Generates structured JSON from OCR text using LLM."""
-    prompt = f"""You are an AI trained to convert the given text into a structured JSON response. Analyze the text provided in the context, and return the response strictly in JSON format. Use 'nan' for any missing fields.
+PROMPT_TEMPLATE = """You are an AI trained to convert the given text into a structured JSON response. Analyze the text provided in the context, and return the response strictly in JSON format. Use 'nan' for any missing fields.
     Extract and classify the context into a JSON structure as per the given specification. Ensure the bill_type is classified into one of the specified categories: 'restaurant', 'public transport', 'hotel', 'retail', 'taxi', 'tourist attraction'. The response should only include the fields: bill_type, total_amount, vendor_name, date and time (with timezone), and geographical location (city, state, and country). If there is no total amount visible, use the subtotal and add the tax if it's a numerical value; if tax is not numerical or not present, use just the subtotal.
     
     context: {text}
@@ -128,25 +103,520 @@ def process_text(text):
         "state": "Colorado",
         "country": "USA"
     """
-    response = llm.invoke(prompt)
+
+# Appended to PROMPT_TEMPLATE when several receipts share one request
+BATCH_PROMPT_SUFFIX = """
+    The context above holds {count} separate receipts, each starting with a line "### RECEIPT n ###".
+    Extract every receipt independently and return strictly a JSON array of exactly {count} objects,
+    in the same order as the receipts, with nothing before or after the array.
+    """
+
+# Changes whenever either prompt is edited, invalidating memoized extractions
+PROMPT_VERSION = hashlib.sha256((PROMPT_TEMPLATE + BATCH_PROMPT_SUFFIX).encode("utf-8")).hexdigest()[:12]
+
+
+class VisionBatcher:
+    """Collects pending PDF OCR requests and submits them together in one Vision operation.
+
+    Lives on the shared OCR event loop: detect() is awaited there and
+    resolves to the OCR text of each page of its own file (None for a page
+    without text). At most `concurrency` operations run at once; while they run,
+    no thread is held.
+    """
+
+    def __init__(self, window, max_files, concurrency):
+        self._window = window
+        self._max_files = max(1, max_files)
+        self._concurrency = concurrency
+        self._operations = None
+        self._pending = []
+        self._flush_handle = None
+        self._tasks = set()
+
+    async def detect(self, gcs_source_uri, gcs_destination_uri):
+        """Queues a PDF for OCR and waits for its page texts."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((gcs_source_uri, gcs_destination_uri, future))
+        if len(self._pending) >= self._max_files:
+            self._flush()
+        elif self._flush_handle is None:
+            # Hold the first file for up to the window so others can join its batch
+            self._flush_handle = loop.call_later(self._window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        while self._pending:
+            batch = self._pending[: self._max_files]
+            del self._pending[: self._max_files]
+            task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+            # The loop only keeps weak references to tasks
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch):
+        if self._operations is None:
+            self._operations = asyncio.Semaphore(self._concurrency)
+        try:
+            async with self._operations:
+                await annotate_files([(source, destination) for source, destination, _ in batch])
+        except Exception as e:
+            logger.error(f"Vision batch of {len(batch)} files failed: {e}", exc_info=True)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # Every file's output is read at the same time
+        outputs = await asyncio.gather(
+            *(read_ocr_pages(destination) for _, destination, _ in batch),
+            return_exceptions=True,
+        )
+        for (_, _, future), pages in zip(batch, outputs):
+            if future.done():
+                continue
+            if isinstance(pages, Exception):
+                future.set_exception(pages)
+            else:
+                future.set_result(pages)
+
+
+# The synchronous file API OCRs at most this many pages of a PDF per request
+INLINE_MAX_PAGES = 5
+OUTPUT_SHARD_NAME = re.compile(r"output-(\d+)-to-\d+\.json$")
+
+_batcher = None
+_ocr_slots = None
+
+
+def get_vision_batcher():
+    """Returns the process-wide Vision batcher; call on the OCR event loop."""
+    global _batcher
+    if _batcher is None:
+        _batcher = VisionBatcher(
+            Config.OCR_BATCH_WINDOW,
+            Config.OCR_BATCH_MAX_FILES,
+            Config.OCR_BATCH_CONCURRENCY,
+        )
+    return _batcher
+
+
+def get_ocr_slots():
+    """The semaphore capping documents in OCR at once (OCR_MAX_IN_FLIGHT); call on the OCR event loop."""
+    global _ocr_slots
+    if _ocr_slots is None:
+        _ocr_slots = asyncio.Semaphore(Config.OCR_MAX_IN_FLIGHT)
+    return _ocr_slots
+
+
+def build_annotate_requests(uris):
+    """One AsyncAnnotateFileRequest (DOCUMENT_TEXT_DETECTION) per (gcs_source_uri, gcs_destination_uri) pair."""
+    from google.cloud import vision
+
+    feature = vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)
+    requests = []
+    for gcs_source_uri, gcs_destination_uri in uris:
+        input_config = vision.InputConfig(
+            gcs_source=vision.GcsSource(uri=gcs_source_uri), mime_type="application/pdf"
+        )
+        output_config = vision.OutputConfig(
+            gcs_destination=vision.GcsDestination(uri=gcs_destination_uri),
+            batch_size=Config.OCR_OUTPUT_BATCH_SIZE,
+        )
+        requests.append(
+            vision.AsyncAnnotateFileRequest(
+                features=[feature], input_config=input_config, output_config=output_config
+            )
+        )
+    return requests
+
+
+async def annotate_files(uris):
+    """Runs DOCUMENT_TEXT_DETECTION on several PDFs in a single async Vision operation.
+
+    The operation is started on the shared executor and then polled, so
+    waiting for it does not hold a thread.
+
+    Args:
+    uris (list): (gcs_source_uri, gcs_destination_uri) pairs, one per file.
+    """
+    if not get_storage().supports_async_ocr:
+        return await annotate_files_inline(uris)
+
+    client = get_vision_client()
+    with registry.timed("vision"), stage_timer("vision_operation"):
+        operation = await run_blocking(client.async_batch_annotate_files, requests=build_annotate_requests(uris))
+        await wait_for_operation(operation, Config.OCR_OPERATION_TIMEOUT)
+
+
+async def annotate_files_inline(uris):
+    """annotate_files() for local storage, which Vision cannot read from or write to.
+
+    Each PDF is sent inline to the synchronous file API, which takes one
+    file and at most INLINE_MAX_PAGES pages per call; the first call reports
+    the page count, then the remaining pages and the other files of the
+    batch are sent concurrently. The replies are stored where the async
+    operation would have written its output shards, so read_ocr_pages()
+    works the same for both backends.
+    """
+    async def annotate(gcs_source_uri, gcs_destination_uri):
+        source_bucket, source_name = get_bucket_and_prefix(gcs_source_uri)
+        content = await run_blocking(read_bytes, source_bucket, source_name)
+        first_pages = list(range(1, INLINE_MAX_PAGES + 1))
+        total_pages = await run_blocking(annotate_pages, content, first_pages, gcs_destination_uri)
+        # One page past the limit is enough for detect_document() to reject the file
+        total_pages = min(total_pages, Config.RECEIPT_MAX_PAGES + 1)
+        await asyncio.gather(*(
+            run_blocking(
+                annotate_pages, content, list(range(start, min(start + INLINE_MAX_PAGES, total_pages + 1))),
+                gcs_destination_uri,
+            )
+            for start in range(INLINE_MAX_PAGES + 1, total_pages + 1, INLINE_MAX_PAGES)
+        ))
+
+    # gather() re-raises the first failure, failing the whole batch like the async operation
+    await asyncio.gather(*(annotate(source, destination) for source, destination in uris))
+
+
+def annotate_pages(content, pages, gcs_destination_uri):
+    """OCRs the given pages of an inline PDF and stores them as one output shard; returns the PDF's page count."""
+    from google.cloud import vision
+
+    request = vision.AnnotateFileRequest(
+        input_config=vision.InputConfig(content=content, mime_type="application/pdf"),
+        features=[vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)],
+        pages=pages,
+    )
+    with registry.timed("vision"), stage_timer("vision_operation"):
+        file_response = get_vision_client().batch_annotate_files(requests=[request]).responses[0]
+    if file_response.error.message:
+        raise RuntimeError(f"Vision API error: {file_response.error.message}")
+
+    # Pages past the end of the PDF get no response
+    responses = [
+        {"fullTextAnnotation": {"text": page.full_text_annotation.text}, "context": {"pageNumber": page_number}}
+        for page_number, page in zip(pages, file_response.responses)
+    ]
+    destination_bucket, prefix = get_bucket_and_prefix(gcs_destination_uri)
+    upload_bytes(
+        destination_bucket,
+        f"{prefix}output-{pages[0]}-to-{pages[0] + len(responses) - 1}.json",
+        json.dumps({"responses": responses}).encode("utf-8"),
+        "application/json",
+    )
+    return file_response.total_pages
+
+
+async def read_ocr_pages(gcs_destination_uri):
+    """Reads the OCR text of every page Vision wrote under the destination prefix, in page order.
+
+    Vision writes OCR_OUTPUT_BATCH_SIZE pages per output shard; the shards
+    are downloaded and parsed concurrently. Pages without text are None.
+    """
+    bucket_name, prefix = get_bucket_and_prefix(gcs_destination_uri)
+    with stage_timer("ocr_output_list"):
+        blob_list = await run_blocking(list_blobs, bucket_name, prefix)
+
+    shards = await asyncio.gather(*(run_blocking(read_ocr_shard, blob) for blob in blob_list))
+    pages = sorted(page for shard in shards for page in shard)
+    return [text for _, text in pages]
+
+
+def read_ocr_shard(blob):
+    """Parses one output shard into (page number, text) pairs."""
+    with stage_timer("ocr_output_download"):
+        response = json.loads(download_blob(blob))
+
+    # Shards are named output-<first page>-to-<last page>.json, for responses without a page number
+    match = OUTPUT_SHARD_NAME.search(blob.name)
+    first_page = int(match.group(1)) if match else 1
+    pages = []
+    for index, page_response in enumerate(response.get("responses", [])):
+        page_number = page_response.get("context", {}).get("pageNumber", first_page + index)
+        pages.append((page_number, page_response.get("fullTextAnnotation", {}).get("text") or None))
+    return pages
+
+
+async def detect_document(gcs_source_uri, gcs_destination_uri):
+    """OCRs a PDF in storage and extracts one receipt per page; runs on the OCR event loop.
+
+    At most OCR_MAX_IN_FLIGHT documents are between here and their result at
+    once; the rest wait for a slot without holding a thread. Documents of
+    more than RECEIPT_MAX_PAGES pages are an error, before any extraction.
+    """
+    async with get_ocr_slots():
+        with stage_timer("vision"):
+            pages = await get_vision_batcher().detect(gcs_source_uri, gcs_destination_uri)
+        if len(pages) > Config.RECEIPT_MAX_PAGES:
+            return {"error": f"Document has more than {Config.RECEIPT_MAX_PAGES} pages."}
+        return await extract_receipts(pages)
+
+
+def async_detect_document(gcs_source_uri, gcs_destination_uri):
+    """Performs OCR on PDF files stored in Google Cloud Storage (blocking wrapper around detect_document)."""
+    return run_coroutine(detect_document(gcs_source_uri, gcs_destination_uri))
+
+
+def detect_image_text(content):
+    """Runs synchronous DOCUMENT_TEXT_DETECTION on raw image bytes, or returns None if there is no text."""
+    from google.cloud import vision
+
+    client = get_vision_client()
+    with registry.timed("vision"), stage_timer("vision_image"):
+        response = client.document_text_detection(image=vision.Image(content=content))
+    if response.error.message:
+        raise RuntimeError(f"Vision API error: {response.error.message}")
+    return response.full_text_annotation.text or None
+
+
+def detect_images(contents):
+    """Performs OCR directly on in-memory images, one receipt each, without a PDF or GCS round-trip."""
+    return run_coroutine(recognize_images(contents))
+
+
+async def recognize_images(contents):
+    texts = await asyncio.gather(*(run_blocking(detect_image_text, content) for content in contents))
+    return await extract_receipts(texts)
+
+
+def build_ocr_results(texts):
+    """Extracts several receipts at once (blocking wrapper around extract_receipts)."""
+    return run_coroutine(extract_receipts(texts))
+
+
+async def extract_receipts(texts):
+    """Pairs the OCR text of each page or region with its structured extraction.
+
+    Texts are handed to process_texts() LLM_BATCH_MAX_ITEMS at a time, so a
+    multi-page document shares LLM requests; at most
+    RECEIPT_EXTRACT_CONCURRENCY of those chunks run at once on the shared
+    executor, so a long document does not take every executor thread.
+    Returns {"receipts": [{"ocr_text", "formatted_data"}, ...]} in the order
+    of texts, or {"error": ...} when none has text.
+    """
+    texts = [text for text in texts if text]
+    if not texts:
+        return {"error": "No text found"}
+    size = max(Config.LLM_BATCH_MAX_ITEMS, 1)
+    slots = asyncio.Semaphore(Config.RECEIPT_EXTRACT_CONCURRENCY)
+
+    async def extract(chunk):
+        async with slots:
+            return await run_blocking(process_texts, chunk)
+
+    chunks = await asyncio.gather(*(extract(texts[start:start + size]) for start in range(0, len(texts), size)))
+    formatted = [formatted_data for chunk in chunks for formatted_data in chunk]
+    return {"receipts": [
+        {"ocr_text": text, "formatted_data": formatted_data} for text, formatted_data in zip(texts, formatted)
+    ]}
+
+
+def merge_ocr_results(results):
+    """Combines the {"receipts": [...]} results of several documents; an error only if none found a receipt."""
+    receipts = [receipt for result in results for receipt in result.get("receipts", [])]
+    if receipts:
+        return {"receipts": receipts}
+    errors = [result["error"] for result in results if "error" in result]
+    return {"error": errors[0] if errors else "No text found"}
+
+
+def process_text(text):
+    """Generates structured JSON from OCR text using LLM.
+
+    Receipts the rule-based parser reads with enough confidence never reach
+    the LLM. Results are memoized on the normalized text and the prompt
+    version, so re-scans of the same receipt skip the LLM and prompt edits
+    start fresh.
+    """
+    with stage_timer("extraction"):
+        formatted_data = _lookup_extraction(text)
+        if formatted_data is None:
+            formatted_data = extract_with_llm(text)
+            _store_extraction(text, formatted_data)
+    return formatted_data
+
+
+def process_texts(texts):
+    """Batched process_text for several receipts; returns one JSON string per input, in order.
+
+    Used by extract_receipts() for the pages of a PDF and the receipts of a
+    photo. Texts not answered by the fast path or the memo are packed into
+    as few LLM requests as LLM_BATCH_MAX_ITEMS and LLM_BATCH_MAX_TOKENS
+    allow, so the prompt's worked examples are paid for once per batch
+    rather than once per receipt.
+    """
+    with stage_timer("extraction"):
+        results = [_lookup_extraction(text) for text in texts]
+        pending = [index for index, result in enumerate(results) if result is None]
+
+        for batch in _plan_batches([texts[index] for index in pending]):
+            batch_indexes = [pending[position] for position in batch]
+            extracted = extract_batch_with_llm([texts[index] for index in batch_indexes])
+            for index, formatted_data in zip(batch_indexes, extracted):
+                _store_extraction(texts[index], formatted_data)
+                results[index] = formatted_data
+    return results
+
+
+def _lookup_extraction(text):
+    """Answers from the fast path or the memo, or returns None if the LLM is needed."""
+    if Config.FAST_PARSER_ENABLED:
+        formatted_data = parse_receipt_json(text, Config.FAST_PARSER_THRESHOLD)
+        if formatted_data is not None:
+            _record_fast_path()
+            return formatted_data
+
+    cache = get_extraction_cache()
+    return cache.get(extraction_cache_key(text)) if cache else None
+
+
+def _store_extraction(text, formatted_data):
+    cache = get_extraction_cache()
+    if cache:
+        cache.set(extraction_cache_key(text), formatted_data)
+
+
+def _plan_batches(texts):
+    """Groups positions into batches bounded by item count and an estimated token budget."""
+    batches, current, current_tokens = [], [], 0
+    for position, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (
+            len(current) >= Config.LLM_BATCH_MAX_ITEMS
+            or current_tokens + tokens > Config.LLM_BATCH_MAX_TOKENS
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(position)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def estimate_tokens(text):
+    """Rough token count for budgeting (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def extract_batch_with_llm(texts):
+    """Extracts several receipts in one LLM request, falling back per item when the reply is unusable."""
+    if len(texts) == 1:
+        return [extract_with_llm(texts[0])]
+
+    # Every marker on a line of its own, including the first one after "context:"
+    sections = "".join(
+        f"\n### RECEIPT {number} ###\n{text}" for number, text in enumerate(texts, start=1)
+    )
+    prompt = PROMPT_TEMPLATE.format(text=sections) + BATCH_PROMPT_SUFFIX.format(count=len(texts))
+    started = time.perf_counter()
+    try:
+        with registry.timed("llm"), stage_timer("llm"):
+            response = get_llm().invoke(prompt)
+        items = json.loads(response.strip("`json\n").strip("`\n"))
+    except Exception as e:
+        logger.warning(f"Batched extraction of {len(texts)} receipts failed, retrying one by one: {e}")
+        items = []
+    finally:
+        _record_llm_call(time.perf_counter() - started, len(prompt))
+
+    if not isinstance(items, list) or len(items) != len(texts):
+        items = [None] * len(texts)
+    return [
+        json.dumps(item) if isinstance(item, dict) else extract_with_llm(text)
+        for text, item in zip(texts, items)
+    ]
+
+
+def extract_with_llm(text):
+    """Sends the extraction prompt for a single OCR text to the LLM."""
+    prompt = PROMPT_TEMPLATE.format(text=text)
+    started = time.perf_counter()
+    with registry.timed("llm"), stage_timer("llm"):
+        response = get_llm().invoke(prompt)
+    _record_llm_call(time.perf_counter() - started, len(prompt))
     formatted_data = response.strip("`json\n").strip("`\n")
     return formatted_data
 
 
-async def process_blob(executor, blob_name, bucket_name, destination_bucket_name):
-    """Asynchronous wrapper to process each blob using threading."""
-    print(f"Processing file: {blob_name}")
+def normalize_ocr_text(text):
+    """Canonical form of OCR text: whitespace collapsed, blank lines dropped, lines sorted.
+
+    Sorting makes re-scans that return the same lines in a different order
+    share a cache entry.
+    """
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(sorted(line for line in lines if line))
+
+
+def extraction_cache_key(text):
+    return f"{PROMPT_VERSION}:{hash_bytes(normalize_ocr_text(text).encode('utf-8'))}"
+
+
+_extraction_cache = None
+_extraction_cache_lock = threading.Lock()
+_llm_usage = {"calls": 0, "seconds": 0.0, "prompt_chars": 0, "fast_path": 0}
+_llm_usage_lock = threading.Lock()
+
+
+def get_extraction_cache():
+    """Returns the process-wide LLM extraction cache, or None when it is disabled."""
+    global _extraction_cache
+    if Config.LLM_CACHE_MAX_ENTRIES <= 0:
+        return None
+    if _extraction_cache is None:
+        with _extraction_cache_lock:
+            if _extraction_cache is None:
+                _extraction_cache = ResultCache(
+                    [MemoryBackend(Config.LLM_CACHE_MAX_ENTRIES)], Config.LLM_CACHE_TTL
+                )
+    return _extraction_cache
+
+
+def _record_llm_call(seconds, prompt_chars):
+    with _llm_usage_lock:
+        _llm_usage["calls"] += 1
+        _llm_usage["seconds"] += seconds
+        _llm_usage["prompt_chars"] += prompt_chars
+
+
+def _record_fast_path():
+    with _llm_usage_lock:
+        _llm_usage["fast_path"] += 1
+
+
+def get_extraction_stats():
+    """Cache counters plus an estimate of the LLM time and prompt volume the cache saved."""
+    with _llm_usage_lock:
+        usage = dict(_llm_usage)
+    cache = get_extraction_cache()
+    stats = cache.stats() if cache else {"hits": 0, "misses": 0}
+    calls = usage["calls"]
+    avg_seconds = usage["seconds"] / calls if calls else 0
+    avg_prompt_chars = usage["prompt_chars"] / calls if calls else 0
+    stats.update(
+        prompt_version=PROMPT_VERSION,
+        fast_path_extractions=usage["fast_path"],
+        llm_calls=calls,
+        llm_seconds=usage["seconds"],
+        estimated_seconds_saved=stats["hits"] * avg_seconds,
+        estimated_prompt_chars_saved=int(stats["hits"] * avg_prompt_chars),
+    )
+    return stats
+
+
+async def process_blob(blob_name, bucket_name, destination_bucket_name):
+    """OCRs one blob on the shared OCR event loop."""
+    logger.info(f"Processing file: {blob_name}")
     source_bucket = f"gs://{bucket_name}/{blob_name}"
     dest_bucket = f"gs://{destination_bucket_name}/{blob_name}-"
 
-    formatted_data = await asyncio.get_running_loop().run_in_executor(
-        executor, async_detect_document, source_bucket, dest_bucket
-    )
-    return formatted_data
+    return await detect_document(source_bucket, dest_bucket)
 
 
 async def process_specific_file(bucket_name, destination_bucket_name, filename):
     """Processes a specific file asynchronously."""
-    with ThreadPoolExecutor() as executor:
-        formatted_data = await process_blob(executor, filename, bucket_name, destination_bucket_name)
-        return formatted_data
+    return await process_blob(filename, bucket_name, destination_bucket_name)
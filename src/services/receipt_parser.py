@@ -0,0 +1,193 @@
+import json
+import re
+from datetime import datetime
+
+# (pattern, vendor_name, bill_type) for the vendors that make up most of our volume
+KNOWN_VENDORS = [
+    (re.compile(r"WALL?[\s-]*MART", re.I), "Walmart", "retail"),
+    (re.compile(r"\bTARGET\b", re.I), "Target", "retail"),
+    (re.compile(r"\bCOSTCO\b", re.I), "Costco", "retail"),
+    (re.compile(r"\bUBER\b", re.I), "Uber", "taxi"),
+    (re.compile(r"\bLYFT\b", re.I), "Lyft", "taxi"),
+    (re.compile(r"LA\s*QUINTA", re.I), "La Quinta Inn & Suites", "hotel"),
+    (re.compile(r"\bHILTON\b", re.I), "Hilton", "hotel"),
+    (re.compile(r"\bMARRIOTT\b", re.I), "Marriott", "hotel"),
+    (re.compile(r"\bHYATT\b", re.I), "Hyatt", "hotel"),
+    (re.compile(r"\bSTARBUCKS\b", re.I), "Starbucks", "cafe"),
+    (re.compile(r"\b(SHELL|CHEVRON|EXXON|MOBIL)\b", re.I), None, "gas"),
+]
+
+# Fallback bill_type when the vendor is not one we know
+BILL_TYPE_KEYWORDS = [
+    (re.compile(r"\b(FOLIO|ROOM CHARGE|ARRIVAL|DEPARTURE|ROOM NO)\b", re.I), "hotel"),
+    (re.compile(r"\b(TRIP FARE|RIDE|PICKUP|DROP-?OFF)\b", re.I), "taxi"),
+    (re.compile(r"\b(SERVER|TABLE|GUESTS|GRATUITY)\b", re.I), "restaurant"),
+    (re.compile(r"\b(GALLONS|PUMP|UNLEADED|DIESEL)\b", re.I), "gas"),
+]
+
+US_STATES = {
+    "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas", "CA": "California",
+    "CO": "Colorado", "CT": "Connecticut", "DE": "Delaware", "DC": "District of Columbia",
+    "FL": "Florida", "GA": "Georgia", "HI": "Hawaii", "ID": "Idaho", "IL": "Illinois",
+    "IN": "Indiana", "IA": "Iowa", "KS": "Kansas", "KY": "Kentucky", "LA": "Louisiana",
+    "ME": "Maine", "MD": "Maryland", "MA": "Massachusetts", "MI": "Michigan", "MN": "Minnesota",
+    "MS": "Mississippi", "MO": "Missouri", "MT": "Montana", "NE": "Nebraska", "NV": "Nevada",
+    "NH": "New Hampshire", "NJ": "New Jersey", "NM": "New Mexico", "NY": "New York",
+    "NC": "North Carolina", "ND": "North Dakota", "OH": "Ohio", "OK": "Oklahoma", "OR": "Oregon",
+    "PA": "Pennsylvania", "RI": "Rhode Island", "SC": "South Carolina", "SD": "South Dakota",
+    "TN": "Tennessee", "TX": "Texas", "UT": "Utah", "VT": "Vermont", "VA": "Virginia",
+    "WA": "Washington", "WV": "West Virginia", "WI": "Wisconsin", "WY": "Wyoming",
+}
+
+MONTHS = {name: index for index, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1
+)}
+
+AMOUNT = r"\$?\(?(\d{1,3}(?:,\d{3})*\.\d{2})\)?"
+AMOUNT_RE = re.compile(AMOUNT)
+LONE_AMOUNT_RE = re.compile(rf"^\s*{AMOUNT}\s*$")
+TOTAL_LINE_RE = re.compile(r"^\W*(GRAND\s+)?TOTAL\b(?!\s*(SAVINGS|DISCOUNT|ITEMS|TAX)\b)", re.I)
+NUMERIC_DATE_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4}|\d{2})\b")
+NAMED_DATE_RE = re.compile(r"\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+(\d{1,2}),?\s+(\d{4})\b", re.I)
+TIME_RE = re.compile(r"\b(\d{1,2}):(\d{2})(?::(\d{2}))?\s*([AP]M)?\b", re.I)
+CITY_STATE_ZIP_RE = re.compile(r"^\s*([A-Za-z][A-Za-z .'-]*?)\s*,?\s+([A-Z]{2})\s+\d{5}(?:-\d{4})?\b")
+
+# Share of the confidence score each field contributes
+FIELD_WEIGHTS = {
+    "total_amount": 0.4,
+    "date_time": 0.2,
+    "vendor_name": 0.2,
+    "bill_type": 0.1,
+    "location": 0.1,
+}
+
+
+def parse_receipt(text):
+    """Extracts receipt fields from OCR text with rules instead of the LLM.
+
+    Returns (data, confidence), where data has the same shape as the LLM
+    extraction ('nan' for anything not found) and confidence is between 0
+    and 1, weighted towards the total amount and date.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    scores = {}
+
+    vendor_name, bill_type = _find_vendor(text)
+    if vendor_name:
+        scores["vendor_name"] = 1
+    if bill_type:
+        scores["bill_type"] = 1
+
+    total_amount, total_score = _find_total(lines)
+    scores["total_amount"] = total_score
+
+    date_time = _find_date_time(lines)
+    if date_time:
+        scores["date_time"] = 1
+
+    city, state = _find_city_state(lines)
+    if city:
+        scores["location"] = 1
+
+    data = {
+        "bill_type": bill_type or "nan",
+        "vendor_name": vendor_name or (lines[0] if lines else "nan"),
+        "date_time": date_time.isoformat() if date_time else "nan",
+        "total_amount": total_amount if total_amount is not None else "nan",
+        "location": {
+            "city": city or "nan",
+            "state": state or "nan",
+            "country": "USA" if state else "nan",
+        },
+    }
+    confidence = sum(weight * scores.get(field, 0) for field, weight in FIELD_WEIGHTS.items())
+    return data, round(confidence, 3)
+
+
+# A receipt cannot be stored without these, whatever the confidence of the rest
+REQUIRED_FIELDS = ("date_time", "total_amount")
+
+
+def parse_receipt_json(text, threshold):
+    """Returns the fast-path extraction as a JSON string, or None when it is below threshold or lacks a required field."""
+    data, confidence = parse_receipt(text)
+    if confidence < threshold or any(data[field] == "nan" for field in REQUIRED_FIELDS):
+        return None
+    return json.dumps(data)
+
+
+def _find_vendor(text):
+    for pattern, vendor_name, bill_type in KNOWN_VENDORS:
+        match = pattern.search(text)
+        if match:
+            return vendor_name or match.group(0).title(), bill_type
+    for pattern, bill_type in BILL_TYPE_KEYWORDS:
+        if pattern.search(text):
+            return None, bill_type
+    return None, None
+
+
+def _find_total(lines):
+    """Returns (amount, score); amounts on the TOTAL line itself score higher than on the next line."""
+    for index, line in enumerate(lines):
+        if not TOTAL_LINE_RE.search(line):
+            continue
+        amounts = [_to_float(amount) for amount in AMOUNT_RE.findall(line)]
+        if amounts:
+            return max(amounts), 1
+        # Columnar receipts sometimes put the amount on the following line
+        for following in lines[index + 1:index + 3]:
+            match = LONE_AMOUNT_RE.match(following)
+            if match:
+                return _to_float(match.group(1)), 0.75
+    return None, 0
+
+
+def _find_date_time(lines):
+    for line in lines:
+        date = _parse_date(line)
+        if date is None:
+            continue
+        time_match = TIME_RE.search(line, date[1])
+        hour = minute = second = 0
+        if time_match:
+            hour, minute = int(time_match.group(1)), int(time_match.group(2))
+            second = int(time_match.group(3) or 0)
+            meridiem = (time_match.group(4) or "").upper()
+            if meridiem == "PM" and hour < 12:
+                hour += 12
+            elif meridiem == "AM" and hour == 12:
+                hour = 0
+        try:
+            return datetime(*date[0], hour, minute, second)
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_date(line):
+    """Returns ((year, month, day), end_offset) for the first date on the line, or None."""
+    match = NUMERIC_DATE_RE.search(line)
+    if match:
+        month, day, year = (int(group) for group in match.groups())
+        if year < 100:
+            year += 2000
+        if 1 <= month <= 12 and 1 <= day <= 31:
+            return (year, month, day), match.end()
+    match = NAMED_DATE_RE.search(line)
+    if match:
+        month = MONTHS[match.group(1).lower()[:3]]
+        return (int(match.group(3)), month, int(match.group(2))), match.end()
+    return None
+
+
+def _find_city_state(lines):
+    for line in lines:
+        match = CITY_STATE_ZIP_RE.match(line)
+        if match and match.group(2) in US_STATES:
+            return match.group(1).strip(" ,").title(), US_STATES[match.group(2)]
+    return None, None
+
+
+def _to_float(amount):
+    return float(amount.replace(",", ""))
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from config.settings import Config
+from services.result_cache import MemoryBackend, ResultCache
+
+_data_version = 0
+_data_version_lock = threading.Lock()
+
+
+def bump_data_version():
+    """Marks every cached response as stale; call after committing a change to receipts."""
+    global _data_version
+    with _data_version_lock:
+        _data_version += 1
+        return _data_version
+
+
+def get_data_version():
+    return _data_version
+
+
+def response_cache_key(name, params):
+    """Cache key for an endpoint and its query parameters: order and empty values do not matter."""
+    normalized = sorted((key, value.strip()) for key, value in params.items() if value and value.strip())
+    return f"{name}:{get_data_version()}:{json.dumps(normalized)}"
+
+
+class ResponseCache:
+    """Caches serialized JSON responses and coalesces concurrent identical misses.
+
+    Entries are keyed on the data version, so a write makes every earlier entry
+    unreachable and it ages out of the LRU. The version is per process: with
+    several workers a write in one only reaches the others when their
+    entries expire, after Config.RESPONSE_CACHE_TTL seconds.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self._cache = ResultCache([MemoryBackend(max_entries)], ttl)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._coalesced = 0
+
+    def get_or_compute(self, name, params, compute):
+        """Returns {"body", "etag"} for the endpoint, calling compute() at most once per key at a time.
+
+        Results that are a dict with an "error" key are returned but not cached.
+        """
+        key = response_cache_key(name, params)
+        with self._lock:
+            # Looked up under the lock so a miss cannot slip in after the leader stores its entry
+            entry = self._cache.get(key)
+            if entry is not None:
+                return entry
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self._coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+            body = json.dumps(value)
+            entry = {"body": body, "etag": hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]}
+            if not (isinstance(value, dict) and "error" in value):
+                self._cache.set(key, entry)
+            future.set_result(entry)
+            return entry
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stats(self):
+        stats = self._cache.stats()
+        with self._lock:
+            stats["coalesced"] = self._coalesced
+            stats["in_flight"] = len(self._in_flight)
+        stats["data_version"] = get_data_version()
+        return stats
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Returns the process-wide response cache, or None when it is disabled."""
+    global _response_cache
+    if Config.RESPONSE_CACHE_MAX_ENTRIES <= 0:
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(Config.RESPONSE_CACHE_MAX_ENTRIES, Config.RESPONSE_CACHE_TTL)
+    return _response_cache
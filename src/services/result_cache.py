@@ -0,0 +1,206 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+
+def hash_bytes(content):
+    """Content address for an uploaded file."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def hash_stream(stream, chunk_size=1024 * 1024):
+    """Content address for a file-like object, read in chunks and rewound afterwards."""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU store bounded by entry count."""
+
+    name = "memory"
+
+    def __init__(self, max_entries):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (value, expires_at) or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """On-disk store that survives restarts, evicting least recently used rows."""
+
+    name = "sqlite"
+
+    def __init__(self, path, max_entries):
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed_at ON cache_entries (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE key IN ("
+                "SELECT key FROM cache_entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self._max_entries,),
+            )
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+
+class ResultCache:
+    """Read-through cache over one or more backends, fastest tier first.
+
+    Entries expire ttl seconds after they are written (0 disables expiry).
+    A hit in a slower tier is copied into the faster ones.
+    """
+
+    def __init__(self, backends, ttl=0):
+        self._backends = backends
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "expired": 0, "writes": 0}
+        self._tier_hits = {backend.name: 0 for backend in backends}
+
+    def get(self, key):
+        now = time.time()
+        for index, backend in enumerate(self._backends):
+            entry = backend.get(key)
+            if entry is None:
+                continue
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= now:
+                backend.delete(key)
+                self._count("expired")
+                continue
+            for faster in self._backends[:index]:
+                faster.set(key, value, expires_at)
+            self._count("hits")
+            with self._lock:
+                self._tier_hits[backend.name] += 1
+            return value
+        self._count("misses")
+        return None
+
+    def set(self, key, value):
+        expires_at = time.time() + self._ttl if self._ttl else None
+        for backend in self._backends:
+            backend.set(key, value, expires_at)
+        self._count("writes")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["tier_hits"] = dict(self._tier_hits)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0
+        stats["entries"] = {backend.name: len(backend) for backend in self._backends}
+        return stats
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+
+def build_cache(backend, max_entries, ttl, path):
+    """Creates a ResultCache for the backend name "memory", "sqlite" or "tiered"."""
+    if backend == "memory":
+        backends = [MemoryBackend(max_entries)]
+    elif backend == "sqlite":
+        backends = [SQLiteBackend(path, max_entries)]
+    elif backend == "tiered":
+        backends = [MemoryBackend(max_entries), SQLiteBackend(path, max_entries * 10)]
+    else:
+        raise ValueError(f"Unknown cache backend '{backend}'.")
+    return ResultCache(backends, ttl)
+
+
+_ocr_cache = None
+_ocr_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """Returns the process-wide OCR result cache, or None when caching is disabled."""
+    global _ocr_cache
+    if Config.OCR_CACHE_BACKEND == "none":
+        return None
+    if _ocr_cache is None:
+        with _ocr_cache_lock:
+            if _ocr_cache is None:
+                _ocr_cache = build_cache(
+                    Config.OCR_CACHE_BACKEND,
+                    Config.OCR_CACHE_MAX_ENTRIES,
+                    Config.OCR_CACHE_TTL,
+                    Config.OCR_CACHE_PATH,
+                )
+    return _ocr_cache
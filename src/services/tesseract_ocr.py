@@ -0,0 +1,93 @@
+import io
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config.settings import Config
+from core.metrics import stage_timer
+
+
+def recognize_image(content, lang, psm):
+    """Runs Tesseract on encoded image bytes; returns (text, mean word confidence 0-100).
+
+    Runs in a pool process, so it takes plain arguments and imports its
+    libraries itself. Lines are rebuilt from Tesseract's word boxes so the
+    text reads like Vision's.
+    """
+    import pytesseract
+    from PIL import Image
+
+    with Image.open(io.BytesIO(content)) as image:
+        data = pytesseract.image_to_data(
+            image, lang=lang, config=f"--psm {psm}", output_type=pytesseract.Output.DICT
+        )
+
+    lines, confidences = {}, []
+    for index, word in enumerate(data["text"]):
+        confidence = float(data["conf"][index])
+        # Non-word boxes (pages, blocks, lines) have confidence -1
+        if confidence < 0 or not word.strip():
+            continue
+        key = (data["block_num"][index], data["par_num"][index], data["line_num"][index])
+        lines.setdefault(key, []).append(word)
+        confidences.append(confidence)
+
+    text = "\n".join(" ".join(words) for _, words in sorted(lines.items()))
+    return text, sum(confidences) / len(confidences) if confidences else 0.0
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_tesseract_executor():
+    """Returns the process-wide Tesseract pool, creating it on first use.
+
+    Processes rather than threads, so OCR scales with the machine's cores;
+    they are spawned, not forked, because the parent runs many threads.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=Config.TESSERACT_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _executor
+
+
+def _discard_executor(broken):
+    """Drops a broken pool so the next get_tesseract_executor() starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        # Another thread may already have replaced it
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _recognize_all(contents):
+    executor = get_tesseract_executor()
+    try:
+        futures = [
+            executor.submit(recognize_image, content, Config.TESSERACT_LANG, Config.TESSERACT_PSM)
+            for content in contents
+        ]
+        return [future.result(timeout=Config.TESSERACT_TIMEOUT) for future in futures]
+    except BrokenProcessPool:
+        _discard_executor(executor)
+        raise
+
+
+def tesseract_texts(contents):
+    """OCRs images (the receipts of one photo) on the Tesseract pool at once and waits for [(text, confidence)].
+
+    A pool process that dies (e.g. killed for memory) breaks the whole pool,
+    so the pool is replaced and the images are retried once.
+    """
+    with stage_timer("tesseract"):
+        try:
+            return _recognize_all(contents)
+        except BrokenProcessPool:
+            return _recognize_all(contents)
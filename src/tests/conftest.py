@@ -0,0 +1,35 @@
+import os
+import pytest
+from app import create_app
+from config.settings import Config
+from core.database import db
+
+# Set to a disposable PostgreSQL database to run the PostgreSQL-only checks; its tables are dropped afterwards
+POSTGRES_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def database_app(database_url):
+    """Yields an app on database_url with the tables created, inside an app context; drops them afterwards."""
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def app():
+    """Create the app against an in-memory SQLite database"""
+    yield from database_app("sqlite://")
+
+
+@pytest.fixture
+def postgres_app():
+    """Create the app against TEST_DATABASE_URL, skipping when it is not set"""
+    if not POSTGRES_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    yield from database_app(POSTGRES_URL)
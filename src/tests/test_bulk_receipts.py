@@ -0,0 +1,104 @@
+import json
+import pytest
+from core.database import db
+from domain.bulk_receipts import bulk_delete_receipts, bulk_insert_receipts, bulk_update_receipts
+from domain.receipts import get_analytics
+from domain.rollups import rebuild_rollups
+from schemas.receipt_schema import Receipt
+
+
+@pytest.fixture
+def app(app, mocker):
+    """The SQLite app with small batches and the rollups turned on"""
+    mocker.patch("domain.bulk_receipts.Config.BULK_BATCH_SIZE", 2)
+    mocker.patch("domain.bulk_receipts.Config.ANALYTICS_USE_ROLLUPS", True)
+    return app
+
+
+def extraction(vendor, amount, date_time="2024-03-20T10:00:00"):
+    return {
+        "vendor_name": vendor,
+        "bill_type": "retail",
+        "total_amount": amount,
+        "date_time": date_time,
+        "location": {"city": "Portland", "state": "Oregon", "country": "USA"},
+    }
+
+
+def rollup_totals():
+    """Vendor summary from the rollups, checked against a fresh rebuild"""
+    incremental = get_analytics()["vendor_summary"]
+    rebuild_rollups()
+    assert get_analytics()["vendor_summary"] == incremental
+    return incremental
+
+
+def test_bulk_insert_reports_per_item_results(app):
+    result = bulk_insert_receipts([
+        extraction("Walmart", 10.0),
+        {"vendor_name": "No date"},
+        extraction("Target", 5.0),
+        extraction("Walmart", 2.5),
+        "not json",
+    ])
+
+    assert (result["succeeded"], result["failed"]) == (3, 2)
+    ids = [item.get("receipt_id") for item in result["results"]]
+    assert ids[0] and ids[2] and ids[3] and ids[1] is None and ids[4] is None
+    assert db.session.get(Receipt, ids[2]).vendor_name == "Target"
+    assert rollup_totals() == {"Walmart": {"count": 2, "total": 12.5}, "Target": {"count": 1, "total": 5.0}}
+
+
+def test_bulk_update_and_delete(app):
+    ids = [item["receipt_id"] for item in bulk_insert_receipts(
+        [extraction("Walmart", 10.0), extraction("Target", 5.0), extraction("Uber", 7.0)]
+    )["results"]]
+
+    updated = bulk_update_receipts([
+        {"id": ids[0], "vendor_name": "Costco"},
+        {"id": ids[1], "total_amount": "6.5", "date_time": "2024-04-01T00:00:00"},
+        {"id": 999, "vendor_name": "Ghost"},
+        {"id": ids[2], "colour": "red"},
+        {"id": ids[0], "vendor_name": "Twice"},
+    ])
+    assert [("error" in item) for item in updated["results"]] == [False, False, True, True, True]
+    assert db.session.get(Receipt, ids[1]).total_amount == 6.5
+
+    deleted = bulk_delete_receipts([ids[2], 12345, "x"])
+    assert [("error" in item) for item in deleted["results"]] == [False, True, True]
+    assert db.session.get(Receipt, ids[2]) is None
+    assert rollup_totals() == {"Costco": {"count": 1, "total": 10.0}, "Target": {"count": 1, "total": 6.5}}
+
+
+def test_database_error_rolls_back_every_batch(app, mocker):
+    mocker.patch("domain.bulk_receipts.apply_rollup_deltas", side_effect=[None, RuntimeError("disk full")])
+
+    result = bulk_insert_receipts([extraction(f"Vendor {i}", 1.0) for i in range(4)])
+
+    assert "disk full" in result["error"]
+    assert Receipt.query.count() == 0
+
+
+def test_too_many_items(app, mocker):
+    mocker.patch("domain.bulk_receipts.Config.BULK_MAX_ITEMS", 1)
+    with pytest.raises(ValueError):
+        bulk_delete_receipts([1, 2])
+
+
+def test_bulk_endpoint_accepts_ndjson_and_arrays(app):
+    client = app.test_client()
+    body = "\n".join(json.dumps(extraction(vendor, 1.0)) for vendor in ("A", "B", "C")) + "\n"
+
+    inserted = client.post("/api/v1/receipts/bulk", data=body, content_type="application/x-ndjson")
+    assert inserted.status_code == 200
+    ids = [item["receipt_id"] for item in inserted.get_json()["results"]]
+
+    patched = client.patch("/api/v1/receipts/bulk", json=[{"id": ids[0], "city": "Salem"}])
+    assert patched.get_json()["succeeded"] == 1
+
+    deleted = client.delete("/api/v1/receipts/bulk", json={"ids": ids})
+    assert deleted.get_json()["succeeded"] == 3
+
+    bad = client.post("/api/v1/receipts/bulk", data="{}\nnope\n", content_type="application/x-ndjson")
+    assert bad.status_code == 400
+    assert "Line 2" in bad.get_json()["error"]
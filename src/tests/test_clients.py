@@ -0,0 +1,44 @@
+import threading
+from services.clients import ClientRegistry
+
+
+def test_client_is_created_once_across_threads(mocker):
+    factory = mocker.Mock(side_effect=lambda: object())
+    registry = ClientRegistry()
+    registry.register("storage", factory)
+
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(registry.get("storage"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert factory.call_count == 1
+    assert len({id(client) for client in clients}) == 1
+    stats = registry.stats()["storage"]
+    assert stats["created"] == 1
+    assert stats["lookups"] == 8
+
+
+def test_timed_calls_are_counted():
+    registry = ClientRegistry()
+    registry.register("vision", object)
+
+    with registry.timed("vision"):
+        pass
+
+    stats = registry.stats()["vision"]
+    assert stats["calls"] == 1
+    assert stats["initialized"] is False
+
+
+def test_set_replaces_client():
+    registry = ClientRegistry()
+    registry.register("llm", object)
+    fake = object()
+
+    registry.set("llm", fake)
+    assert registry.get("llm") is fake
+    registry.reset("llm")
+    assert registry.get("llm") is not fake
@@ -0,0 +1,67 @@
+import io
+import os
+import pytest
+from config.settings import Config
+from services import cloud_storage
+from services.cloud_storage import GCSStorage, LocalStorage, download_blob, get_storage, list_blobs, upload_bytes
+
+
+@pytest.fixture
+def local_storage(monkeypatch, tmp_path):
+    """Select the local backend, rooted in a temporary directory"""
+    monkeypatch.setattr(Config, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(Config, "LOCAL_STORAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(cloud_storage, "_storage", None)
+    return tmp_path
+
+
+def test_backend_is_chosen_by_config(local_storage, monkeypatch):
+    assert isinstance(get_storage(), LocalStorage)
+    monkeypatch.setattr(cloud_storage, "_storage", None)
+    monkeypatch.setattr(Config, "STORAGE_BACKEND", "gcs")
+    assert isinstance(get_storage(), GCSStorage)
+    monkeypatch.setattr(cloud_storage, "_storage", None)
+    monkeypatch.setattr(Config, "STORAGE_BACKEND", "s3")
+    with pytest.raises(ValueError):
+        get_storage()
+
+
+def test_local_round_trip_and_prefix_listing(local_storage):
+    upload_bytes("dst", "uploads/abc.pdf-output-1-to-1.json", b'{"responses": []}')
+    upload_bytes("dst", "uploads/abd.pdf-output-1-to-1.json", b"{}")
+    upload_bytes("other", "uploads/abc.pdf-output-1-to-1.json", b"{}")
+
+    blobs = list_blobs("dst", "uploads/abc.pdf-")
+
+    assert [blob.name for blob in blobs] == ["uploads/abc.pdf-output-1-to-1.json"]
+    assert download_blob(blobs[0]) == '{"responses": []}'
+    assert list_blobs("dst", "missing/") == []
+    assert (local_storage / "dst" / "uploads" / "abc.pdf-output-1-to-1.json").exists()
+
+
+def test_local_upload_reads_from_the_start_and_replaces(local_storage):
+    stream = io.BytesIO(b"%PDF-old")
+    stream.seek(4)
+    cloud_storage.upload_file("src", "uploads/a.pdf", stream)
+    cloud_storage.upload_file("src", "uploads/a.pdf", io.BytesIO(b"%PDF-new"))
+
+    assert cloud_storage.read_bytes("src", "uploads/a.pdf") == b"%PDF-new"
+    assert os.listdir(local_storage / "src" / "uploads") == ["a.pdf"]
+
+
+def test_failed_local_write_leaves_nothing_behind(local_storage):
+    class Broken(io.BytesIO):
+        def read(self, *args):
+            raise OSError("disk went away")
+
+    with pytest.raises(OSError):
+        cloud_storage.upload_file("src", "uploads/a.pdf", Broken())
+
+    assert os.listdir(local_storage / "src" / "uploads") == []
+
+
+def test_local_empty_object_and_paths_outside_root(local_storage):
+    upload_bytes("src", "empty", b"")
+    assert cloud_storage.read_bytes("src", "empty") == b""
+    with pytest.raises(ValueError):
+        upload_bytes("src", "../../escape", b"x")
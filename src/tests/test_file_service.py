@@ -0,0 +1,149 @@
+import io
+import pytest
+from werkzeug.datastructures import FileStorage
+from services.file_service import upload_image
+from services.result_cache import MemoryBackend, ResultCache, hash_stream
+
+
+@pytest.fixture
+def image_file():
+    """Fixture to create an in-memory uploaded image"""
+    return FileStorage(stream=io.BytesIO(b"fake image bytes"), filename="walmart-1.png")
+
+
+@pytest.fixture
+def ocr_cache(mocker):
+    """Fixture to give each test an empty in-memory OCR cache"""
+    cache = ResultCache([MemoryBackend(max_entries=8)])
+    mocker.patch("services.file_service.get_ocr_cache", return_value=cache)
+    return cache
+
+
+RECEIPT = {"ocr_text": "WALMART\nTOTAL 12.00", "formatted_data": '{"vendor_name": "Walmart"}'}
+OCR_RESULT = {"receipts": [RECEIPT]}
+
+
+def test_image_mode_skips_pdf_conversion(mocker, image_file, ocr_cache):
+    mocker.patch("services.file_service.Config.PREPROCESS_ENABLED", False)
+    detect_images = mocker.patch("services.file_service.detect_images", return_value=OCR_RESULT)
+    image_to_pdf = mocker.patch("services.file_service.image_to_pdf")
+
+    result = upload_image(image_file, ocr_mode="image")
+
+    detect_images.assert_called_once_with([b"fake image bytes"])
+    assert not image_to_pdf.called
+    assert result["formatted_data"] == '{"vendor_name": "Walmart"}'
+    assert result["ocr_text"] == "WALMART\nTOTAL 12.00"
+
+
+def test_image_mode_sends_preprocessed_bytes(mocker, image_file, ocr_cache):
+    mocker.patch("services.file_service.Config.PREPROCESS_ENABLED", True)
+    render_jpegs = mocker.patch("services.file_service.render_jpegs", return_value=[b"small jpeg"])
+    detect_images = mocker.patch("services.file_service.detect_images", return_value=OCR_RESULT)
+
+    upload_image(image_file, ocr_mode="image")
+
+    render_jpegs.assert_called_once_with(image_file.stream)
+    detect_images.assert_called_once_with([b"small jpeg"])
+
+
+def test_duplicate_upload_is_served_from_cache(mocker, ocr_cache):
+    mocker.patch("services.file_service.Config.PREPROCESS_ENABLED", False)
+    detect_images = mocker.patch("services.file_service.detect_images", return_value=OCR_RESULT)
+
+    for _ in range(2):
+        image = FileStorage(stream=io.BytesIO(b"same bytes"), filename="walmart-1.png")
+        result = upload_image(image, ocr_mode="image")
+
+    assert detect_images.call_count == 1
+    assert result["formatted_data"] == RECEIPT["formatted_data"]
+    assert ocr_cache.stats()["hits"] == 1
+
+
+def test_ocr_errors_are_not_cached(mocker, image_file, ocr_cache):
+    mocker.patch("services.file_service.Config.PREPROCESS_ENABLED", False)
+    mocker.patch("services.file_service.detect_images", return_value={"error": "No text found"})
+
+    result, status = upload_image(image_file, ocr_mode="image")
+
+    assert status == 422
+    assert ocr_cache.stats()["writes"] == 0
+
+
+def test_invalid_ocr_mode(image_file):
+    result, status = upload_image(image_file, ocr_mode="fax")
+    assert status == 400
+    assert "Invalid OCR mode" in result["error"]
+
+
+def test_invalid_file_type():
+    image = FileStorage(stream=io.BytesIO(b"GIF89a"), filename="receipt.gif")
+    result, status = upload_image(image)
+    assert status == 400
+
+
+def test_every_receipt_is_returned(mocker, image_file, ocr_cache):
+    mocker.patch("services.file_service.Config.PREPROCESS_ENABLED", True)
+    mocker.patch("services.file_service.render_jpegs", return_value=[b"left", b"right"])
+    second = {"ocr_text": "TARGET\nTOTAL 5.00", "formatted_data": '{"vendor_name": "Target"}'}
+    detect_images = mocker.patch("services.file_service.detect_images", return_value={"receipts": [RECEIPT, second]})
+
+    result = upload_image(image_file, ocr_mode="image")
+
+    detect_images.assert_called_once_with([b"left", b"right"])
+    assert result["receipts"] == [RECEIPT, second]
+    assert result["ocr_text"] == RECEIPT["ocr_text"]
+
+
+def test_pdf_upload_is_ocrd_as_is_in_any_mode(mocker, ocr_cache):
+    ocr_pdf_files = mocker.patch("services.file_service.ocr_pdf_files", return_value=OCR_RESULT)
+    image_to_pdf = mocker.patch("services.file_service.image_to_pdf")
+    pdf = FileStorage(stream=io.BytesIO(b"%PDF-1.4 two pages"), filename="statement.pdf")
+
+    result = upload_image(pdf, ocr_mode="image", ocr_engine="tesseract")
+
+    streams, _, _, object_names = ocr_pdf_files.call_args.args
+    assert streams == [pdf.stream]
+    assert object_names[0].startswith("uploads/") and object_names[0].endswith(".pdf")
+    assert not image_to_pdf.called
+    assert result["receipts"] == [RECEIPT]
+
+
+def test_pdf_upload_over_the_page_limit_is_rejected(mocker, ocr_cache):
+    mocker.patch("services.file_service.Config.RECEIPT_MAX_PAGES", 2)
+    ocr_pdf_files = mocker.patch("services.file_service.ocr_pdf_files")
+    content = b"%PDF-1.4\n" + b"<< /Type /Page >>\n" * 3 + b"<< /Type /Pages /Count 3 >>\n"
+
+    result, status = upload_image(FileStorage(stream=io.BytesIO(content), filename="statement.pdf"))
+
+    assert status == 400
+    assert "more than 2 pages" in result["error"]
+    assert not ocr_pdf_files.called
+
+
+def test_pdf_upload_must_be_a_pdf(ocr_cache):
+    result, status = upload_image(FileStorage(stream=io.BytesIO(b"not a pdf"), filename="receipt.pdf"))
+    assert status == 400
+    assert "not a readable PDF" in result["error"]
+
+
+def test_results_cached_before_multi_receipt_uploads_still_load(mocker, image_file, ocr_cache):
+    mocker.patch("services.file_service.Config.PREPROCESS_ENABLED", False)
+    detect_images = mocker.patch("services.file_service.detect_images")
+    ocr_cache.set(hash_stream(image_file.stream), RECEIPT)
+
+    result = upload_image(image_file, ocr_mode="image")
+
+    assert not detect_images.called
+    assert result["receipts"] == [RECEIPT]
+
+
+def test_pdf_mode_uses_unique_object_names(mocker, ocr_cache):
+    image_to_pdf = mocker.patch("services.file_service.image_to_pdf", return_value=OCR_RESULT)
+
+    for content in (b"first", b"second"):
+        upload_image(FileStorage(stream=io.BytesIO(content), filename="walmart-1.png"), ocr_mode="pdf")
+
+    object_names = [call.args[3] for call in image_to_pdf.call_args_list]
+    assert len(set(object_names)) == 2
+    assert all(name.startswith("uploads/") and name.endswith(".pdf") for name in object_names)
@@ -0,0 +1,187 @@
+import io
+import os
+import re
+import pytest
+from PIL import Image, ImageDraw
+from services.image_processing import (
+    _autocrop,
+    _estimate_skew,
+    find_receipt_regions,
+    image_to_pdf,
+    preprocess_image,
+    render_pdfs,
+)
+
+
+@pytest.fixture
+def png_stream():
+    """Fixture to create a small in-memory PNG"""
+    buffer = io.BytesIO()
+    Image.new("L", (60, 120), color=255).save(buffer, "PNG", dpi=(144, 144))
+    buffer.seek(0)
+    return buffer
+
+
+def receipt_image(size=(800, 1200), mode="RGB"):
+    """A white page with dark text-like bars in the middle"""
+    img = Image.new(mode, size, color="white")
+    draw = ImageDraw.Draw(img)
+    for top in range(300, 900, 40):
+        draw.rectangle((200, top, 600, top + 12), fill="black")
+    return img
+
+
+def encode(img, fmt="JPEG", **params):
+    buffer = io.BytesIO()
+    img.save(buffer, fmt, **params)
+    buffer.seek(0)
+    return buffer
+
+
+def receipts_on_table(count, size=(1600, 1200), background=(90, 70, 50)):
+    """Several receipt-like pages side by side on a (dark) background"""
+    img = Image.new("RGB", size, color=background)
+    draw = ImageDraw.Draw(img)
+    width = size[0] // count
+    for index in range(count):
+        left = index * width + width // 8
+        draw.rectangle((left, 100, left + width * 3 // 4, size[1] - 100), fill=(235, 235, 230))
+        for top in range(200, size[1] - 200, 40):
+            draw.rectangle((left + 30, top, left + width * 3 // 4 - 30, top + 12), fill="black")
+    return img
+
+
+def test_render_pdf_in_memory(png_stream):
+    pdf = render_pdfs(png_stream)[0].getvalue()
+    assert pdf.startswith(b"%PDF")
+    # 60x120 px at 144 dpi is a 30x60 pt page
+    width, height = re.search(rb"/MediaBox \[ 0 0 ([\d.]+) ([\d.]+) \]", pdf).groups()
+    assert round(float(width)) == 30
+    assert round(float(height)) == 60
+
+
+def test_image_to_pdf_streams_upload_without_temp_files(mocker, monkeypatch, tmp_path, png_stream):
+    client = mocker.patch("services.cloud_storage.get_storage_client").return_value
+    process = mocker.patch(
+        "services.image_processing.process_specific_file",
+        new=mocker.AsyncMock(return_value={"receipts": [{"ocr_text": "x", "formatted_data": "{}"}]}),
+    )
+    monkeypatch.chdir(tmp_path)
+
+    result = image_to_pdf(png_stream, "src-bucket", "dst-bucket", "uploads/abc.pdf")
+
+    client.bucket.assert_called_once_with("src-bucket")
+    client.bucket.return_value.blob.assert_called_once_with("uploads/abc.pdf")
+    upload = client.bucket.return_value.blob.return_value.upload_from_file
+    assert upload.call_args.kwargs["content_type"] == "application/pdf"
+    process.assert_awaited_once_with("src-bucket", "dst-bucket", "uploads/abc.pdf")
+    assert result == {"receipts": [{"ocr_text": "x", "formatted_data": "{}"}]}
+    assert os.listdir(tmp_path) == []
+
+
+def test_photo_of_several_receipts_becomes_one_pdf_each(mocker):
+    client = mocker.patch("services.cloud_storage.get_storage_client").return_value
+    process = mocker.patch(
+        "services.image_processing.process_specific_file",
+        new=mocker.AsyncMock(side_effect=lambda bucket, dest, name: {
+            "receipts": [{"ocr_text": name, "formatted_data": "{}"}],
+        }),
+    )
+
+    result = image_to_pdf(encode(receipts_on_table(3)), "src-bucket", "dst-bucket", "uploads/abc.pdf")
+
+    names = ["uploads/abc-1.pdf", "uploads/abc-2.pdf", "uploads/abc-3.pdf"]
+    assert sorted(call.args[0] for call in client.bucket.return_value.blob.call_args_list) == names
+    assert process.await_count == 3
+    assert [receipt["ocr_text"] for receipt in result["receipts"]] == names
+
+
+def test_find_receipt_regions_splits_receipts_left_to_right():
+    regions = find_receipt_regions(encode(receipts_on_table(2)))
+
+    assert len(regions) == 2
+    (left_1, _, right_1, _), (left_2, _, right_2, _) = regions
+    assert right_1 < 0.5 < left_2
+    # Each box holds its whole receipt (x 100-700 and 900-1500 of 1600)
+    assert left_1 <= 100 / 1600 and right_1 >= 700 / 1600
+    assert left_2 <= 900 / 1600 and right_2 >= 1500 / 1600
+
+
+def banded_receipt():
+    """One receipt on a dark table with a black header bar across its full width"""
+    img = receipts_on_table(1, size=(1200, 1400))
+    ImageDraw.Draw(img).rectangle((150, 400, 1050, 440), fill="black")
+    return img
+
+
+@pytest.mark.parametrize("img", [
+    receipt_image(),
+    receipts_on_table(1),
+    banded_receipt(),
+    # Bright background around the receipts: nothing to tell them apart by
+    receipts_on_table(2, background=(250, 250, 250)),
+])
+def test_find_receipt_regions_keeps_single_receipts_whole(img):
+    assert find_receipt_regions(encode(img)) == [None]
+
+
+def test_preprocess_crops_to_region():
+    buffer, _ = preprocess_image(encode(receipts_on_table(2)), "JPEG", region=(0.5, 0, 1, 1))
+
+    with Image.open(buffer) as out:
+        assert out.size[0] <= 800
+
+
+def test_preprocess_shrinks_large_photo(mocker):
+    mocker.patch("services.image_processing.Config.PREPROCESS_MAX_SIDE", 600)
+    photo = encode(receipt_image((2400, 3600)).resize((2400, 3600)), quality=95)
+
+    buffer, report = preprocess_image(photo, "JPEG")
+
+    with Image.open(buffer) as out:
+        assert out.mode == "L"
+        assert max(out.size) <= 600
+    assert report["size_in"] == [2400, 3600]
+    assert report["bytes_out"] < report["bytes_in"]
+    assert set(report["stages"]) == {"decode", "grayscale", "autocrop", "deskew", "resize", "encode"}
+
+
+def test_preprocess_disabled_keeps_pixels(mocker, png_stream):
+    mocker.patch("services.image_processing.Config.PREPROCESS_ENABLED", False)
+
+    buffer, report = preprocess_image(png_stream, "JPEG")
+
+    assert report["size_out"] == [60, 120]
+    assert set(report["stages"]) == {"decode", "encode"}
+
+
+def test_preprocess_rejects_decompression_bombs(mocker):
+    mocker.patch("services.image_processing.Config.PREPROCESS_MAX_PIXELS", 1000)
+
+    with pytest.raises(ValueError, match="too large"):
+        preprocess_image(encode(Image.new("L", (100, 100)), "PNG"))
+
+
+def test_preprocess_rejects_unreadable_files():
+    with pytest.raises(ValueError, match="not a readable image"):
+        preprocess_image(io.BytesIO(b"fake image bytes"))
+
+
+@pytest.mark.parametrize("process", [find_receipt_regions, preprocess_image])
+def test_opened_images_are_closed(mocker, process):
+    opened = mocker.spy(Image, "open")
+    process(encode(receipts_on_table(2)))
+
+    with pytest.raises(ValueError, match="closed image"):
+        opened.spy_return.im
+
+
+def test_autocrop_trims_blank_margins():
+    cropped = _autocrop(receipt_image(mode="L"))
+    assert cropped.size[0] < 500
+    assert cropped.size[1] < 700
+
+
+def test_estimate_skew_recovers_rotation():
+    skewed = receipt_image(mode="L").rotate(3, expand=True, fillcolor=255)
+    assert _estimate_skew(skewed, 5) == pytest.approx(-3, abs=0.5)
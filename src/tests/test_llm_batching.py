@@ -0,0 +1,59 @@
+import json
+import re
+import pytest
+from services import ocr_service
+from services.ocr_service import process_texts
+from services.result_cache import MemoryBackend, ResultCache
+
+
+@pytest.fixture
+def mock_llm(mocker):
+    """Fixture to mock the LLM with the fast path off and an empty memo"""
+    mocker.patch("services.ocr_service.Config.FAST_PARSER_ENABLED", False)
+    mocker.patch("services.ocr_service.Config.LLM_BATCH_MAX_ITEMS", 3)
+    mocker.patch("services.ocr_service.Config.LLM_BATCH_MAX_TOKENS", 10000)
+    mocker.patch(
+        "services.ocr_service.get_extraction_cache",
+        return_value=ResultCache([MemoryBackend(max_entries=16)]),
+    )
+    return mocker.patch("services.ocr_service.get_llm").return_value
+
+
+def test_receipts_share_one_request(mock_llm):
+    mock_llm.invoke.return_value = '```json\n[{"total_amount": 1.0}, {"total_amount": 2.0}]\n```'
+
+    results = process_texts(["RECEIPT A", "RECEIPT B"])
+
+    assert mock_llm.invoke.call_count == 1
+    prompt = mock_llm.invoke.call_args[0][0]
+    assert "\n### RECEIPT 1 ###\nRECEIPT A" in prompt
+    assert "### RECEIPT 2 ###\nRECEIPT B" in prompt
+    assert [json.loads(result)["total_amount"] for result in results] == [1.0, 2.0]
+
+
+def test_batches_respect_max_items(mock_llm):
+    mock_llm.invoke.side_effect = lambda prompt: json.dumps([{}] * len(re.findall(r"### RECEIPT \d+ ###", prompt)))
+
+    process_texts([f"RECEIPT {i}" for i in range(5)])
+
+    assert mock_llm.invoke.call_count == 2
+
+
+def test_unparseable_batch_falls_back_per_item(mock_llm):
+    mock_llm.invoke.side_effect = ["not json", '{"total_amount": 1.0}', '{"total_amount": 2.0}']
+
+    results = process_texts(["RECEIPT A", "RECEIPT B"])
+
+    assert mock_llm.invoke.call_count == 3
+    assert results == ['{"total_amount": 1.0}', '{"total_amount": 2.0}']
+
+
+def test_memoized_items_are_not_sent(mock_llm):
+    mock_llm.invoke.return_value = '{"total_amount": 1.0}'
+    ocr_service.process_text("RECEIPT A")
+
+    mock_llm.invoke.return_value = '{"total_amount": 2.0}'
+    results = process_texts(["RECEIPT A", "RECEIPT B"])
+
+    assert mock_llm.invoke.call_count == 2
+    assert results == ['{"total_amount": 1.0}', '{"total_amount": 2.0}']
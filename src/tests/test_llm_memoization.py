@@ -0,0 +1,39 @@
+import pytest
+from services import ocr_service
+from services.ocr_service import extraction_cache_key, normalize_ocr_text, process_text
+from services.result_cache import MemoryBackend, ResultCache
+
+
+@pytest.fixture
+def mock_llm(mocker):
+    """Fixture to mock the LLM and start from an empty memo"""
+    cache = ResultCache([MemoryBackend(max_entries=8)])
+    mocker.patch("services.ocr_service.Config.FAST_PARSER_ENABLED", False)
+    mocker.patch("services.ocr_service.get_extraction_cache", return_value=cache)
+    llm = mocker.patch("services.ocr_service.get_llm").return_value
+    llm.invoke.return_value = '```json\n{"total_amount": 12.0}\n```'
+    return llm
+
+
+def test_rescan_with_different_whitespace_and_order_hits_memo(mock_llm):
+    first = process_text("WALMART\nTOTAL   12.00\n")
+    second = process_text("\n  TOTAL 12.00\nWALMART  ")
+
+    assert first == second == '{"total_amount": 12.0}'
+    assert mock_llm.invoke.call_count == 1
+
+
+def test_different_text_misses_memo(mock_llm):
+    process_text("WALMART\nTOTAL 12.00")
+    process_text("TARGET\nTOTAL 12.00")
+    assert mock_llm.invoke.call_count == 2
+
+
+def test_prompt_edit_changes_key(mocker):
+    key = extraction_cache_key("TOTAL 12.00")
+    mocker.patch.object(ocr_service, "PROMPT_VERSION", "edited")
+    assert extraction_cache_key("TOTAL 12.00") != key
+
+
+def test_normalize_ocr_text():
+    assert normalize_ocr_text("b  line\n\n a line ") == "a line\nb line"
@@ -0,0 +1,57 @@
+import pytest
+from prometheus_client import REGISTRY
+from core.database import db
+from core.metrics import stage_timer, statement_type
+from services.job_service import process_receipt_upload
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_stage_timer_counts_calls_and_failures():
+    calls = sample("receipt_pipeline_stage_seconds_count", stage="test_stage")
+    failures = sample("receipt_pipeline_stage_failures_total", stage="test_stage")
+
+    with stage_timer("test_stage"):
+        pass
+    with pytest.raises(RuntimeError):
+        with stage_timer("test_stage"):
+            raise RuntimeError("boom")
+
+    assert sample("receipt_pipeline_stage_seconds_count", stage="test_stage") == calls + 2
+    assert sample("receipt_pipeline_stage_failures_total", stage="test_stage") == failures + 1
+
+
+@pytest.mark.parametrize("statement, expected", [
+    ("SELECT 1", "SELECT"),
+    ("\n  insert into receipts", "INSERT"),
+    ("WITH page AS (SELECT 1) SELECT 1", "OTHER"),
+])
+def test_statement_type(statement, expected):
+    assert statement_type(statement) == expected
+
+
+def test_upload_pipeline_records_stages(app, mocker):
+    receipt = {
+        "formatted_data": '{"vendor_name": "Walmart", "total_amount": 5, "date_time": "2024-01-01T10:00:00"}', "ocr_text": "WALMART",
+    }
+    mocker.patch("services.job_service.upload_image", return_value={**receipt, "receipts": [receipt]})
+    before = {stage: sample("receipt_pipeline_stage_seconds_count", stage=stage) for stage in ("upload_image", "db_insert")}
+
+    assert "receipt_id" in process_receipt_upload(app, image=None)
+
+    for stage, count in before.items():
+        assert sample("receipt_pipeline_stage_seconds_count", stage=stage) == count + 1
+
+
+def test_metrics_endpoint_exposes_stages_and_queries(app):
+    db.session.execute(db.text("SELECT 1"))
+
+    response = app.test_client().get("/metrics")
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    body = response.get_data(as_text=True)
+    assert "receipt_pipeline_stage_seconds_bucket" in body
+    assert 'db_query_seconds_count{statement="SELECT"}' in body
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from services import ocr_service
+from services.async_runtime import run_coroutine, wait_for_operation
+from services.ocr_service import VisionBatcher
+
+
+@pytest.fixture
+def mock_annotate(mocker):
+    """Fixture to mock the Vision operation and its output"""
+    annotate = mocker.patch("services.ocr_service.annotate_files", new=mocker.AsyncMock())
+    mocker.patch(
+        "services.ocr_service.read_ocr_pages",
+        new=mocker.AsyncMock(side_effect=lambda destination: [f"text for {destination}"]),
+    )
+    return annotate
+
+
+def detect_all(batcher, count):
+    async def detect():
+        return await asyncio.gather(
+            *(batcher.detect(f"gs://src/{i}.pdf", f"gs://dst/{i}.pdf-") for i in range(count)),
+            return_exceptions=True,
+        )
+
+    return run_coroutine(detect(), timeout=5)
+
+
+def test_files_within_window_share_one_operation(mock_annotate):
+    batcher = VisionBatcher(window=0.2, max_files=16, concurrency=1)
+
+    results = detect_all(batcher, 3)
+
+    assert mock_annotate.await_count == 1
+    assert len(mock_annotate.await_args[0][0]) == 3
+    assert results == [[f"text for gs://dst/{i}.pdf-"] for i in range(3)]
+
+
+def test_batches_are_capped_at_max_files(mock_annotate):
+    batcher = VisionBatcher(window=0.2, max_files=2, concurrency=1)
+
+    detect_all(batcher, 5)
+
+    assert [len(call[0][0]) for call in mock_annotate.await_args_list] == [2, 2, 1]
+
+
+def test_operation_failure_reaches_every_caller(mock_annotate):
+    mock_annotate.side_effect = Exception("Operation timed out")
+    batcher = VisionBatcher(window=0.1, max_files=16, concurrency=1)
+
+    results = detect_all(batcher, 2)
+
+    assert [str(result) for result in results] == ["Operation timed out"] * 2
+
+
+class SlowOperation:
+    """Finishes `after` seconds after it is created."""
+
+    def __init__(self, after):
+        self._done_at = time.monotonic() + after
+        self.checks = 0
+
+    def done(self):
+        self.checks += 1
+        return time.monotonic() >= self._done_at
+
+    def result(self, timeout=None):
+        return "finished"
+
+
+def test_wait_for_operation_polls_with_backoff(mocker):
+    mocker.patch("services.async_runtime.Config.OCR_POLL_INTERVAL", 0.01)
+    mocker.patch("services.async_runtime.Config.OCR_POLL_MAX_INTERVAL", 0.04)
+    operation = SlowOperation(after=0.2)
+
+    assert run_coroutine(wait_for_operation(operation, timeout=5)) == "finished"
+    # Backing off to 40 ms keeps the checks well under one per 10 ms
+    assert 2 < operation.checks < 15
+
+
+def test_wait_for_operation_times_out(mocker):
+    mocker.patch("services.async_runtime.Config.OCR_POLL_INTERVAL", 0.01)
+
+    with pytest.raises(TimeoutError):
+        run_coroutine(wait_for_operation(SlowOperation(after=60), timeout=0.1))
+
+
+def test_in_flight_documents_are_capped(mocker):
+    mocker.patch("services.ocr_service.Config.OCR_MAX_IN_FLIGHT", 2)
+    mocker.patch.object(ocr_service, "_ocr_slots", None)
+    active = {"now": 0, "peak": 0}
+
+    class Batcher:
+        async def detect(self, source, destination):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.05)
+            active["now"] -= 1
+            return ["text"]
+
+    mocker.patch("services.ocr_service.get_vision_batcher", return_value=Batcher())
+    mocker.patch("services.ocr_service.process_texts", side_effect=lambda texts: ["{}"] * len(texts))
+
+    async def detect():
+        return await asyncio.gather(
+            *(ocr_service.detect_document(f"gs://src/{i}.pdf", f"gs://dst/{i}.pdf-") for i in range(6))
+        )
+
+    results = run_coroutine(detect(), timeout=5)
+
+    assert results == [{"receipts": [{"ocr_text": "text", "formatted_data": "{}"}]}] * 6
+    assert active["peak"] == 2
+
+
+def test_read_ocr_pages_reads_every_shard_in_page_order(mocker):
+    shards = {
+        # Listed by name, so page 11 sorts before page 3
+        "out/doc.pdf-output-1-to-2.json": [(1, "page one"), (2, None)],
+        "out/doc.pdf-output-11-to-11.json": [(11, "page eleven")],
+        "out/doc.pdf-output-3-to-4.json": [(3, "page three"), (4, "page four")],
+    }
+    blobs = [SimpleNamespace(name=name) for name in sorted(shards)]
+    mocker.patch("services.ocr_service.list_blobs", return_value=blobs)
+    mocker.patch("services.ocr_service.download_blob", side_effect=lambda blob: json.dumps({"responses": [
+        {"fullTextAnnotation": {"text": text}, "context": {"pageNumber": page}} if text
+        else {"context": {"pageNumber": page}}
+        for page, text in shards[blob.name]
+    ]}))
+
+    pages = run_coroutine(ocr_service.read_ocr_pages("gs://out/doc.pdf-"))
+
+    assert pages == ["page one", None, "page three", "page four", "page eleven"]
+
+
+def test_pages_share_llm_batches(mocker):
+    mocker.patch("services.ocr_service.Config.LLM_BATCH_MAX_ITEMS", 2)
+    extract = mocker.patch("services.ocr_service.process_texts", side_effect=lambda texts: [t.upper() for t in texts])
+
+    result = run_coroutine(ocr_service.extract_receipts(["one", None, "two", "three", ""]))
+
+    assert sorted(call.args[0] for call in extract.call_args_list) == [["one", "two"], ["three"]]
+    assert result == {"receipts": [
+        {"ocr_text": "one", "formatted_data": "ONE"},
+        {"ocr_text": "two", "formatted_data": "TWO"},
+        {"ocr_text": "three", "formatted_data": "THREE"},
+    ]}
+
+
+def test_pages_are_extracted_concurrently(mocker):
+    mocker.patch("services.ocr_service.Config.LLM_BATCH_MAX_ITEMS", 1)
+
+    def extract(texts):
+        time.sleep(0.2)
+        return ["{}"] * len(texts)
+
+    mocker.patch("services.ocr_service.process_texts", side_effect=extract)
+
+    started = time.perf_counter()
+    result = run_coroutine(ocr_service.extract_receipts(["one", "two", "three"]))
+
+    assert [receipt["ocr_text"] for receipt in result["receipts"]] == ["one", "two", "three"]
+    assert time.perf_counter() - started < 0.5
+
+
+def test_extractions_per_document_are_capped(mocker):
+    mocker.patch("services.ocr_service.Config.RECEIPT_EXTRACT_CONCURRENCY", 2)
+    mocker.patch("services.ocr_service.Config.LLM_BATCH_MAX_ITEMS", 1)
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def extract(texts):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        return ["{}"] * len(texts)
+
+    mocker.patch("services.ocr_service.process_texts", side_effect=extract)
+
+    result = run_coroutine(ocr_service.extract_receipts([f"page {i}" for i in range(6)]))
+
+    assert len(result["receipts"]) == 6
+    assert active["peak"] == 2
+
+
+def test_documents_over_the_page_limit_are_not_extracted(mocker):
+    mocker.patch("services.ocr_service.Config.RECEIPT_MAX_PAGES", 3)
+    mocker.patch.object(ocr_service, "_ocr_slots", None)
+    batcher = mocker.Mock(detect=mocker.AsyncMock(return_value=["a", "b", "c", "d"]))
+    mocker.patch("services.ocr_service.get_vision_batcher", return_value=batcher)
+    extract = mocker.patch("services.ocr_service.process_texts")
+
+    result = run_coroutine(ocr_service.detect_document("gs://src/doc.pdf", "gs://dst/doc.pdf-"))
+
+    assert result == {"error": "Document has more than 3 pages."}
+    assert not extract.called
+
+
+def test_pages_without_text_are_an_error():
+    assert run_coroutine(ocr_service.extract_receipts([None, ""])) == {"error": "No text found"}
@@ -0,0 +1,115 @@
+import io
+import re
+import pytest
+from PIL import Image, ImageDraw
+from werkzeug.datastructures import FileStorage
+from benchmarks.fakes import install_fakes
+from benchmarks.bench_pipeline import load_images
+from config.settings import Config
+from core.database import db
+from schemas.receipt_schema import Receipt
+from services import cloud_storage
+from services.clients import registry
+from services.job_service import process_receipt_upload
+
+
+@pytest.fixture
+def app(app, monkeypatch):
+    """The SQLite app with every cache off; tests install fake Google clients, which are reset afterwards"""
+    monkeypatch.setattr(Config, "OCR_CACHE_BACKEND", "none")
+    monkeypatch.setattr(Config, "LLM_CACHE_MAX_ENTRIES", 0)
+    monkeypatch.setattr(Config, "FAST_PARSER_ENABLED", False)
+    yield app
+    registry.reset()
+
+
+@pytest.mark.parametrize("ocr_mode, storage", [("image", "gcs"), ("pdf", "gcs"), ("pdf", "local")])
+def test_upload_pipeline_runs_offline(app, monkeypatch, tmp_path, ocr_mode, storage):
+    monkeypatch.setattr(Config, "STORAGE_BACKEND", storage)
+    monkeypatch.setattr(Config, "LOCAL_STORAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(cloud_storage, "_storage", None)
+    fakes = install_fakes()
+    name, content = load_images()[0]
+
+    result = process_receipt_upload(app, FileStorage(stream=io.BytesIO(content), filename=name), ocr_mode)
+
+    assert "receipt_id" in result, result
+    assert fakes.llm.calls == 1
+    receipt = db.session.get(Receipt, result["receipt_id"])
+    assert receipt.vendor_name == "Fake Store"
+    if ocr_mode == "pdf":
+        # Only one of the two stores is used: the fake GCS bucket or the local directory
+        stored = [name for _, name in fakes.storage.objects] or [path.name for path in tmp_path.rglob("*")]
+        assert any(name.endswith(".pdf") for name in stored)
+        assert bool(fakes.storage.objects) == (storage == "gcs")
+
+
+def multi_page_pdf(pages):
+    images = [Image.new("L", (200, 300), 255) for _ in range(pages)]
+    buffer = io.BytesIO()
+    images[0].save(buffer, "PDF", save_all=True, append_images=images[1:])
+    return buffer.getvalue()
+
+
+def receipts_photo(count):
+    img = Image.new("RGB", (600 * count, 1200), color=(90, 70, 50))
+    draw = ImageDraw.Draw(img)
+    for index in range(count):
+        left = index * 600 + 75
+        draw.rectangle((left, 100, left + 450, 1100), fill=(235, 235, 230))
+        for top in range(200, 1000, 40):
+            draw.rectangle((left + 30, top, left + 420, top + 12), fill="black")
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("storage", ["gcs", "local"])
+def test_every_pdf_page_becomes_a_receipt(app, monkeypatch, tmp_path, storage):
+    monkeypatch.setattr(Config, "STORAGE_BACKEND", storage)
+    monkeypatch.setattr(Config, "LOCAL_STORAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(cloud_storage, "_storage", None)
+    fakes = install_fakes()
+
+    # 7 pages: several output shards with GCS, two inline requests with local storage
+    pdf = FileStorage(stream=io.BytesIO(multi_page_pdf(7)), filename="statement.pdf")
+    result = process_receipt_upload(app, pdf)
+
+    assert len(result["receipt_ids"]) == 7, result
+    assert result["receipt_id"] == result["receipt_ids"][0]
+    # The pages share one batched LLM request
+    assert fakes.llm.calls == 1
+    assert db.session.query(Receipt).count() == 7
+
+
+@pytest.mark.parametrize("storage", ["gcs", "local"])
+def test_pdf_over_the_page_limit_stores_nothing(app, monkeypatch, tmp_path, storage):
+    monkeypatch.setattr(Config, "STORAGE_BACKEND", storage)
+    monkeypatch.setattr(Config, "LOCAL_STORAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(Config, "RECEIPT_MAX_PAGES", 6)
+    monkeypatch.setattr(cloud_storage, "_storage", None)
+    # As if the pages were hidden in object streams, so only the OCR'd page count can catch it
+    monkeypatch.setattr("services.file_service.PDF_PAGE", re.compile(rb"(?!)"))
+    fakes = install_fakes()
+
+    pdf = FileStorage(stream=io.BytesIO(multi_page_pdf(12)), filename="statement.pdf")
+    result = process_receipt_upload(app, pdf)
+
+    assert result == {"error": "Document has more than 6 pages."}
+    assert fakes.llm.calls == 0
+    assert db.session.query(Receipt).count() == 0
+
+
+@pytest.mark.parametrize("ocr_mode", ["image", "pdf"])
+def test_every_receipt_in_a_photo_is_stored(app, monkeypatch, ocr_mode):
+    monkeypatch.setattr(Config, "STORAGE_BACKEND", "gcs")
+    monkeypatch.setattr(cloud_storage, "_storage", None)
+    fakes = install_fakes()
+
+    photo = FileStorage(stream=io.BytesIO(receipts_photo(3)), filename="lunch.jpg")
+    result = process_receipt_upload(app, photo, ocr_mode)
+
+    assert len(result["receipt_ids"]) == 3, result
+    # In-memory OCR extracts the receipts together; in pdf mode each is its own document
+    assert fakes.llm.calls == (1 if ocr_mode == "image" else 3)
+    assert db.session.query(Receipt).count() == 3
@@ -0,0 +1,60 @@
+from datetime import datetime
+import pytest
+from core.database import db
+from domain.receipts import get_analytics
+from schemas.receipt_schema import Receipt
+
+
+@pytest.fixture
+def receipts(app):
+    """Fixture to insert receipts across two vendors, bill types and months"""
+    rows = [
+        Receipt(vendor_name="Walmart", bill_type="retail", total_amount=10.0, date_time=datetime(2024, 3, 2)),
+        Receipt(vendor_name="Walmart", bill_type="retail", total_amount=30.0, date_time=datetime(2024, 3, 20)),
+        Receipt(vendor_name="Uber", bill_type="taxi", total_amount=20.0, date_time=datetime(2024, 4, 1)),
+        Receipt(vendor_name="Uber", bill_type="taxi", total_amount=None, date_time=datetime(2023, 4, 1)),
+    ]
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+def test_totals_and_vendor_summary(receipts):
+    result = get_analytics()
+
+    assert result["receipt_count"] == 4
+    assert result["total_spent"] == 60.0
+    assert result["average_amount"] == 15.0
+    assert result["vendor_summary"] == {
+        "Walmart": {"count": 2, "total": 40.0},
+        "Uber": {"count": 2, "total": 20.0},
+    }
+    assert "bill_type_summary" not in result
+
+
+def test_filters_apply_to_every_aggregate(receipts):
+    result = get_analytics(year=2024, breakdown="month")
+
+    assert result["receipt_count"] == 3
+    assert result["vendor_summary"]["Uber"] == {"count": 1, "total": 20.0}
+    assert result["monthly_summary"] == {
+        "2024-03": {"count": 2, "total": 40.0},
+        "2024-04": {"count": 1, "total": 20.0},
+    }
+
+
+def test_bill_type_breakdown(receipts):
+    result = get_analytics(breakdown="bill_type")
+    assert result["bill_type_summary"] == {
+        "retail": {"count": 2, "total": 40.0},
+        "taxi": {"count": 2, "total": 20.0},
+    }
+
+
+def test_empty_result(app):
+    result = get_analytics(vendor_name="Nobody")
+    assert result == {"total_spent": 0, "receipt_count": 0, "average_amount": 0, "vendor_summary": {}}
+
+
+def test_unknown_breakdown(receipts):
+    assert "error" in get_analytics(breakdown="weekday")
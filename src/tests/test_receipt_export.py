@@ -0,0 +1,89 @@
+import csv
+import io
+from datetime import datetime, timedelta
+import pytest
+from core.database import db
+from domain.exports import EXPORT_COLUMNS, export_receipts
+from schemas.receipt_schema import Receipt
+
+
+@pytest.fixture
+def receipts(app):
+    """Fixture to insert 5 receipts, three from Walmart"""
+    start = datetime(2024, 1, 1, 12, 0)
+    rows = [
+        Receipt(vendor_name="Walmart" if i % 2 == 0 else "Target", total_amount=10.0 * (i + 1),
+                date_time=start + timedelta(days=i), city="Portland", state="Oregon", country="USA")
+        for i in range(5)
+    ]
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+def read_csv(chunks):
+    return list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+
+
+def test_csv_export_streams_one_chunk_per_batch(receipts):
+    chunks = list(export_receipts("csv", batch_size=2))
+
+    assert len(chunks) == 3
+    rows = read_csv(chunks)
+    assert [int(row["id"]) for row in rows] == [5, 4, 3, 2, 1]
+    assert list(rows[0]) == EXPORT_COLUMNS
+    assert rows[0]["date_time"] == "2024-01-05T12:00:00"
+
+
+def test_export_applies_search_filters(receipts):
+    rows = read_csv(export_receipts("csv", vendor="walmart", min_amount="20"))
+    assert [int(row["id"]) for row in rows] == [5, 3]
+
+
+def test_parquet_export_writes_one_row_group_per_batch(receipts):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    data = b"".join(export_receipts("parquet", batch_size=2))
+
+    parquet_file = pq.ParquetFile(io.BytesIO(data))
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert table.column_names == EXPORT_COLUMNS
+    assert table.column("id").to_pylist() == [5, 4, 3, 2, 1]
+    assert table.column("date_time")[0].as_py() == datetime(2024, 1, 5, 12, 0)
+
+
+def test_export_rejects_bad_arguments(receipts):
+    with pytest.raises(ValueError):
+        export_receipts("xlsx")
+    with pytest.raises(TypeError):
+        export_receipts("csv", colour="red")
+
+
+def test_export_endpoint(app, receipts):
+    client = app.test_client()
+    response = client.get("/api/v1/receipts/export?format=csv&vendor=Target")
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "text/csv"
+    assert "receipts.csv" in response.headers["Content-Disposition"]
+    assert [int(row["id"]) for row in read_csv([response.get_data()])] == [4, 2]
+    assert client.get("/api/v1/receipts/export?format=xlsx").status_code == 400
+    assert client.get("/api/v1/receipts/export?colour=red").status_code == 400
+
+
+@pytest.mark.parametrize("batch_size", ["2", "abc"])
+def test_export_endpoint_does_not_take_a_batch_size(app, receipts, batch_size):
+    response = app.test_client().get(f"/api/v1/receipts/export?batch_size={batch_size}")
+
+    assert response.status_code == 400
+    assert "batch_size" in response.get_json()["error"]
+
+
+def test_export_command(app, receipts, tmp_path):
+    output = tmp_path / "receipts.csv"
+    result = app.test_cli_runner().invoke(args=["export-receipts", str(output), "--vendor", "Walmart"])
+
+    assert result.exit_code == 0, result.output
+    assert [int(row["id"]) for row in read_csv([output.read_bytes()])] == [5, 3, 1]
@@ -0,0 +1,116 @@
+import json
+import pytest
+from core.database import db
+from domain.receipts import fulltext_search, insert_receipt
+from schemas.receipt_schema import Receipt
+
+OCR_TEXTS = [
+    "BEST BUY\nHDMI CABLE 6FT 19.99\nUSB CHARGER 24.99\nTOTAL 44.98",
+    "WALMART\nBANANAS 1.20\nMILK 3.49\nTOTAL 4.69",
+    "TARGET\nHDMI ADAPTER 12.99\nTOTAL 12.99",
+    "BEST BUY\nHDMI CABLE 3FT 9.99\nHDMI CABLE 6FT 19.99\nTOTAL 29.98",
+]
+
+
+def add_receipt(ocr_text):
+    formatted_data = {"vendor_name": ocr_text.splitlines()[0].title(), "date_time": "2024-03-20T10:00:00", "location": {}}
+    return insert_receipt({"ocr_text": ocr_text, "formatted_data": json.dumps(formatted_data)})["receipt_id"]
+
+
+@pytest.fixture
+def app(app):
+    """The SQLite app with a few OCR'd receipts"""
+    for ocr_text in OCR_TEXTS:
+        add_receipt(ocr_text)
+    return app
+
+
+@pytest.fixture
+def postgres_app(postgres_app):
+    """Same receipts in TEST_DATABASE_URL"""
+    for ocr_text in OCR_TEXTS:
+        add_receipt(ocr_text)
+    return postgres_app
+
+
+def test_insert_receipt_stores_ocr_text(app):
+    assert db.session.get(Receipt, 2).ocr_text == OCR_TEXTS[1]
+    assert "ocr_text" not in db.session.get(Receipt, 2).to_dict()
+
+
+def test_every_word_must_match(app):
+    result = fulltext_search("hdmi cable")
+    assert [receipt["id"] for receipt in result["receipts"]] == [4, 1]
+    assert "<mark>HDMI</mark> <mark>CABLE</mark>" in result["receipts"][0]["highlight"]
+
+
+def test_highlight_escapes_ocr_text(app):
+    add_receipt("WALMART <script>alert(1)</script> total")
+
+    [receipt] = fulltext_search("walmart <script>")["receipts"]
+
+    assert receipt["highlight"] == (
+        "<mark>WALMART</mark> <mark>&lt;script&gt;</mark>alert(1)&lt;/script&gt; total"
+    )
+
+
+@pytest.mark.parametrize("q", ["%", "_", "HDMI_CABLE"])
+def test_like_wildcards_match_literally(app, q):
+    assert fulltext_search(q)["receipts"] == []
+
+
+def test_pages_follow_the_cursor(app):
+    first = fulltext_search("hdmi", limit=2)
+    second = fulltext_search("hdmi", limit=2, cursor=first["next_cursor"])
+
+    assert [receipt["id"] for receipt in first["receipts"]] == [4, 3]
+    assert [receipt["id"] for receipt in second["receipts"]] == [1]
+    assert second["next_cursor"] is None
+
+
+@pytest.mark.parametrize("q, limit, cursor", [("", None, None), ("hdmi", 0, None), ("hdmi", 5, "nope")])
+def test_invalid_arguments(app, q, limit, cursor):
+    with pytest.raises(ValueError):
+        fulltext_search(q, limit, cursor)
+
+
+def test_fulltext_endpoint(app):
+    client = app.test_client()
+
+    response = client.get("/api/v1/receipts/fulltext?q=bananas")
+    assert response.status_code == 200
+    assert [receipt["vendor_name"] for receipt in response.get_json()["receipts"]] == ["Walmart"]
+    assert client.get("/api/v1/receipts/fulltext").status_code == 400
+
+
+def test_postgres_ranks_by_relevance(postgres_app):
+    first = fulltext_search('"hdmi cable"', limit=1)
+    second = fulltext_search('"hdmi cable"', limit=1, cursor=first["next_cursor"])
+
+    # Two matching lines rank above one
+    assert [first["receipts"][0]["id"], second["receipts"][0]["id"]] == [4, 1]
+    assert first["receipts"][0]["rank"] > second["receipts"][0]["rank"]
+    assert "<mark>" in first["receipts"][0]["highlight"]
+    assert second["next_cursor"] is None
+
+
+def test_postgres_highlight_escapes_ocr_text(postgres_app):
+    add_receipt("WALMART <script>alert(1)</script> total")
+
+    [receipt] = fulltext_search("alert")["receipts"]
+
+    assert "<mark>alert</mark>" in receipt["highlight"]
+    assert "<script" not in receipt["highlight"]
+
+
+def test_postgres_pages_keep_rank_ties(postgres_app):
+    ids, cursor = [], None
+    while True:
+        page = fulltext_search("hdmi", limit=1, cursor=cursor)
+        ids += [receipt["id"] for receipt in page["receipts"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # Receipts 3 and 1 mention HDMI once and tie on rank; ties go by id
+    assert ids == [4, 3, 1]
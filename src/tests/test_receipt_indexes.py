@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text
+from core.database import db
+from domain.receipts import apply_receipt_filters, search_receipts
+from schemas.receipt_schema import Receipt
+
+
+def explain(query, prefix="EXPLAIN QUERY PLAN "):
+    sql = query.statement.compile(db.engine, compile_kwargs={"literal_binds": True})
+    return "\n".join(str(row) for row in db.session.execute(text(f"{prefix}{sql}")))
+
+
+def filtered(**filters):
+    return apply_receipt_filters(Receipt.query, Receipt, Receipt.date_time, **filters)
+
+
+@pytest.mark.parametrize("filters", [{"date": "2024-03-20"}, {"year": 2024}, {"year": 2024, "month": 12}])
+def test_date_filters_use_the_date_time_index(app, filters):
+    plan = explain(filtered(**filters))
+    assert "USING INDEX ix_receipts_date_time" in plan
+
+
+def test_date_filter_is_a_whole_day_range(app):
+    start = datetime(2024, 3, 20)
+    db.session.add_all([
+        Receipt(vendor_name="before", date_time=start - timedelta(seconds=1)),
+        Receipt(vendor_name="morning", date_time=start),
+        Receipt(vendor_name="night", date_time=start + timedelta(hours=23, minutes=59)),
+        Receipt(vendor_name="after", date_time=start + timedelta(days=1)),
+    ])
+    db.session.commit()
+
+    result = search_receipts(date="2024-03-20")
+    assert sorted(receipt["vendor_name"] for receipt in result) == ["morning", "night"]
+
+
+def test_december_range_rolls_over_the_year(app):
+    db.session.add_all([
+        Receipt(vendor_name="december", date_time=datetime(2024, 12, 31, 23, 0)),
+        Receipt(vendor_name="january", date_time=datetime(2025, 1, 1, 0, 0)),
+    ])
+    db.session.commit()
+
+    assert [receipt.vendor_name for receipt in filtered(year=2024, month=12).all()] == ["december"]
+
+
+@pytest.mark.parametrize("filters, index", [
+    ({"vendor_name": "mart"}, "ix_receipts_vendor_name_trgm"),
+    ({"city": "port"}, "ix_receipts_city_trgm"),
+    ({"date": "2024-03-20"}, "ix_receipts_date_time"),
+])
+def test_postgres_plans_use_indexes(postgres_app, filters, index):
+    # An empty table is always cheapest to scan, so rule that out to see whether the index is usable
+    db.session.execute(text("SET enable_seqscan = off"))
+    plan = explain(filtered(**filters), prefix="EXPLAIN ")
+    assert index in plan
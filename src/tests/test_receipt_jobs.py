@@ -0,0 +1,61 @@
+import threading
+import pytest
+from services.job_service import JobQueue, QueueFullError
+
+
+@pytest.fixture
+def job_queue():
+    """Fixture to create a small job queue"""
+    queue = JobQueue(max_workers=1, max_pending=1, retention=10)
+    yield queue
+    queue.shutdown()
+
+
+def wait_for(queue, job_id):
+    """Polls until the job has finished"""
+    for _ in range(200):
+        job = queue.get(job_id)
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError("Job did not finish")
+
+
+def test_job_succeeds(job_queue):
+    job_id = job_queue.submit(lambda: {"receipt_id": 1})
+
+    job = wait_for(job_queue, job_id)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"receipt_id": 1}
+    assert job["finished_at"] is not None
+
+
+def test_job_error_result_marks_failed(job_queue):
+    job_id = job_queue.submit(lambda: {"error": "No text found"})
+
+    job = wait_for(job_queue, job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "No text found"
+
+
+def test_job_exception_marks_failed(job_queue):
+    def boom():
+        raise RuntimeError("Vision timeout")
+
+    job = wait_for(job_queue, job_queue.submit(boom))
+    assert job["status"] == "failed"
+    assert "Vision timeout" in job["error"]
+
+
+def test_queue_full(job_queue):
+    release = threading.Event()
+    job_queue.submit(release.wait)
+    job_queue.submit(release.wait)
+
+    with pytest.raises(QueueFullError):
+        job_queue.submit(release.wait)
+    release.set()
+
+
+def test_unknown_job(job_queue):
+    assert job_queue.get("missing") is None
@@ -0,0 +1,77 @@
+import json
+from datetime import datetime, timedelta
+import pytest
+from core.database import db
+from domain.receipts import decode_cursor, list_receipts, stream_receipts
+from schemas.receipt_schema import Receipt
+
+
+@pytest.fixture
+def receipts(app):
+    """Fixture to insert 7 receipts, two sharing a timestamp and one without a date"""
+    start = datetime(2024, 1, 1, 12, 0)
+    rows = [Receipt(vendor_name=f"Vendor {i}", total_amount=i, date_time=start + timedelta(days=i)) for i in range(5)]
+    rows.append(Receipt(vendor_name="Same time", total_amount=9, date_time=start + timedelta(days=4)))
+    rows.append(Receipt(vendor_name="No date", total_amount=1, date_time=None))
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+def walk_pages(limit):
+    pages, cursor = [], None
+    while True:
+        page = list_receipts(limit, cursor)
+        pages.append([receipt["id"] for receipt in page["receipts"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_every_receipt_once_newest_first(receipts):
+    pages = walk_pages(limit=2)
+
+    ids = [receipt_id for page in pages for receipt_id in page]
+    assert ids == [6, 5, 4, 3, 2, 1, 7]
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+
+
+def test_last_page_has_no_cursor(receipts):
+    page = list_receipts(limit=10)
+    assert len(page["receipts"]) == 7
+    assert page["next_cursor"] is None
+
+
+def test_cursor_round_trip(receipts):
+    cursor = list_receipts(limit=1)["next_cursor"]
+    assert decode_cursor(cursor) == (datetime(2024, 1, 5, 12, 0), 6)
+
+
+@pytest.mark.parametrize("limit, cursor", [(0, None), (10_000, None), (5, "not-a-cursor")])
+def test_invalid_page_arguments(receipts, limit, cursor):
+    with pytest.raises(ValueError):
+        list_receipts(limit, cursor)
+
+
+def test_stream_matches_pages(receipts):
+    streamed = [receipt["id"] for receipt in stream_receipts(batch_size=2)]
+    assert streamed == [receipt_id for page in walk_pages(limit=3) for receipt_id in page]
+
+
+def test_receipts_endpoint_streams_json_array(app, receipts):
+    response = app.test_client().get("/api/v1/receipts")
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    body = json.loads(response.get_data(as_text=True))
+    assert [receipt["id"] for receipt in body] == [6, 5, 4, 3, 2, 1, 7]
+
+
+def test_receipts_endpoint_paginates(app, receipts):
+    client = app.test_client()
+    first = client.get("/api/v1/receipts?limit=4").get_json()
+    second = client.get(f"/api/v1/receipts?limit=4&cursor={first['next_cursor']}").get_json()
+
+    assert [receipt["id"] for receipt in first["receipts"] + second["receipts"]] == [6, 5, 4, 3, 2, 1, 7]
+    assert second["next_cursor"] is None
+    assert client.get("/api/v1/receipts?cursor=garbage").status_code == 400
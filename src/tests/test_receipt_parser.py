@@ -0,0 +1,64 @@
+import json
+from services import ocr_service
+from services.receipt_parser import parse_receipt, parse_receipt_json
+
+WALMART_TEXT = """Walmart
+904-417-9688 Mgr:BOBBI JO SMITH
+845 DURBIN PAVILION DR
+ST JOHNS, FL 32259
+SUBTOTAL 3.27
+TAX 1 6.500 % 0.22
+TOTAL 3.51
+DEBIT TEND 3.51
+11/21/18 09:20:25"""
+
+
+def test_parses_known_vendor_receipt():
+    data, confidence = parse_receipt(WALMART_TEXT)
+
+    assert confidence == 1.0
+    assert data["vendor_name"] == "Walmart"
+    assert data["bill_type"] == "retail"
+    assert data["total_amount"] == 3.51
+    assert data["date_time"] == "2018-11-21T09:20:25"
+    assert data["location"] == {"city": "St Johns", "state": "Florida", "country": "USA"}
+
+
+def test_total_on_following_line_and_pm_time():
+    data, _ = parse_receipt("TARGET\nTOTAL\n$82.23\n12/12/2018 08:57 PM")
+    assert data["total_amount"] == 82.23
+    assert data["date_time"] == "2018-12-12T20:57:00"
+
+
+def test_unknown_receipt_has_low_confidence():
+    data, confidence = parse_receipt("Thanks for visiting\nSee you soon")
+    assert confidence < 0.5
+    assert data["total_amount"] == "nan"
+    assert parse_receipt_json("Thanks for visiting", threshold=0.8) is None
+
+
+def test_receipt_without_a_date_goes_to_the_llm(mocker):
+    text = "\n".join(line for line in WALMART_TEXT.splitlines() if not line.startswith("11/21/18"))
+    data, confidence = parse_receipt(text)
+
+    # Every other field is found, which alone reaches the default threshold
+    assert data["date_time"] == "nan"
+    assert confidence == 0.8
+    assert parse_receipt_json(text, threshold=0.8) is None
+
+    mocker.patch("services.ocr_service.Config.FAST_PARSER_ENABLED", True)
+    mocker.patch("services.ocr_service.Config.LLM_CACHE_MAX_ENTRIES", 0)
+    llm = mocker.patch("services.ocr_service.get_llm").return_value
+    llm.invoke.return_value = '{"date_time": "2018-11-21T09:20:25"}'
+    ocr_service.process_text(text)
+    assert llm.invoke.called
+
+
+def test_confident_parse_skips_llm(mocker):
+    mocker.patch("services.ocr_service.Config.FAST_PARSER_ENABLED", True)
+    llm = mocker.patch("services.ocr_service.get_llm").return_value
+
+    result = ocr_service.process_text(WALMART_TEXT)
+
+    assert json.loads(result)["total_amount"] == 3.51
+    assert not llm.invoke.called
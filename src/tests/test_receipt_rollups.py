@@ -0,0 +1,86 @@
+import json
+import pytest
+from core.database import db
+from domain.receipts import delete_receipt, get_analytics, insert_receipt, update_receipt
+from domain.rollups import rebuild_rollups
+from schemas.receipt_rollup_schema import ReceiptRollup
+
+
+def receipt(vendor, amount, date_time, bill_type="retail", city="Portland"):
+    return json.dumps({
+        "vendor_name": vendor,
+        "bill_type": bill_type,
+        "total_amount": amount,
+        "date_time": date_time,
+        "location": {"city": city, "state": "Oregon", "country": "USA"},
+    })
+
+
+@pytest.fixture
+def receipt_ids(app, mocker):
+    """Fixture to insert receipts through insert_receipt with the rollups turned on, so they are maintained"""
+    mocker.patch("domain.rollups.Config.ANALYTICS_USE_ROLLUPS", True)
+    rows = [
+        receipt("Walmart", 10.0, "2024-03-02T10:00:00"),
+        receipt("Walmart", 30.0, "2024-03-02T18:00:00"),
+        receipt("Uber", 20.0, "2024-04-01T08:00:00", bill_type="taxi", city="Seattle"),
+        receipt("Uber", None, "2023-04-01T08:00:00", bill_type="taxi"),
+    ]
+    return [insert_receipt(row)["receipt_id"] for row in rows]
+
+
+def analytics_from(use_rollups, mocker, **filters):
+    mocker.patch("domain.receipts.Config.ANALYTICS_USE_ROLLUPS", use_rollups)
+    return get_analytics(breakdown="bill_type,month", **filters)
+
+
+@pytest.mark.parametrize("filters", [{}, {"year": 2024}, {"year": 2024, "month": 3}, {"city": "seat"}])
+def test_rollups_match_raw_aggregates(mocker, receipt_ids, filters):
+    assert analytics_from(True, mocker, **filters) == analytics_from(False, mocker, **filters)
+
+
+def test_same_day_receipts_share_a_rollup_row(receipt_ids):
+    walmart = ReceiptRollup.query.filter_by(vendor_name="Walmart").all()
+    assert [(row.receipt_count, row.total_amount) for row in walmart] == [(2, 40.0)]
+
+
+def test_update_and_delete_keep_rollups_in_step(mocker, receipt_ids):
+    update_receipt(receipt_ids[0], {"vendor_name": "Target", "total_amount": 15.0})
+    update_receipt(receipt_ids[1], {"total_amount": 35.0})
+    delete_receipt(receipt_ids[2])
+
+    result = analytics_from(True, mocker)
+    assert result == analytics_from(False, mocker)
+    assert result["vendor_summary"] == {
+        "Walmart": {"count": 1, "total": 35.0},
+        "Target": {"count": 1, "total": 15.0},
+        "Uber": {"count": 1, "total": 0.0},
+    }
+
+
+def test_writes_skip_rollups_while_they_are_off(app):
+    receipt_id = insert_receipt(receipt("Walmart", 10.0, "2024-03-02T10:00:00"))["receipt_id"]
+    update_receipt(receipt_id, {"total_amount": 12.0})
+    assert ReceiptRollup.query.count() == 0
+
+    delete_receipt(receipt_id)
+    assert ReceiptRollup.query.count() == 0
+
+
+def test_rebuild_compacts_rollups(mocker, receipt_ids):
+    delete_receipt(receipt_ids[2])
+    before = analytics_from(True, mocker)
+
+    rows = rebuild_rollups()
+
+    assert rows == ReceiptRollup.query.count() == 2
+    assert analytics_from(True, mocker) == before
+
+
+def test_rebuild_command(app, receipt_ids):
+    db.session.execute(ReceiptRollup.__table__.delete())
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["rebuild-rollups"])
+
+    assert "3 rows" in result.output
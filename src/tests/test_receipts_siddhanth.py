@@ -90,7 +90,11 @@ def test_search_receipts_no_results(app_context, mocker):
 def test_get_analytics_success(app_context, mocker, sample_receipt):
     mock_query = mocker.patch('schemas.receipt_schema.Receipt.query')
     mock_query.filter.return_value = mock_query
-    mock_query.all.return_value = [sample_receipt]
+    mock_query.with_entities.return_value = mock_query
+    mock_query.group_by.return_value = mock_query
+    # Aggregates are computed in SQL: (count, sum, avg) and then one row per vendor
+    mock_query.one.return_value = (1, sample_receipt.total_amount, sample_receipt.total_amount)
+    mock_query.all.return_value = [(sample_receipt.vendor_name, 1, sample_receipt.total_amount)]
     
     result = get_analytics(
         year=2024,
@@ -106,10 +110,14 @@ def test_get_analytics_success(app_context, mocker, sample_receipt):
     assert "receipt_count" in result
     assert "average_amount" in result
     assert "vendor_summary" in result
+    assert result["vendor_summary"] == {"regal": {"count": 1, "total": 50.00}}
 
 def test_get_analytics_no_data(app_context, mocker):
     mock_query = mocker.patch('schemas.receipt_schema.Receipt.query')
     mock_query.filter.return_value = mock_query
+    mock_query.with_entities.return_value = mock_query
+    mock_query.group_by.return_value = mock_query
+    mock_query.one.return_value = (0, 0, None)
     mock_query.all.return_value = []
     
     result = get_analytics(year=2024)
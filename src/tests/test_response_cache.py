@@ -0,0 +1,104 @@
+import threading
+import time
+from datetime import datetime
+import pytest
+from core.database import db
+from domain.receipts import insert_receipt
+from schemas.receipt_schema import Receipt
+from services import response_cache
+from services.response_cache import ResponseCache, bump_data_version, response_cache_key
+
+
+@pytest.fixture
+def app(app, monkeypatch):
+    """The SQLite app with one receipt and a fresh response cache"""
+    monkeypatch.setattr(response_cache, "_response_cache", None)
+    db.session.add(Receipt(vendor_name="Walmart", total_amount=10, date_time=datetime(2024, 1, 1)))
+    db.session.commit()
+    return app
+
+
+def test_key_ignores_parameter_order_and_blank_values():
+    assert response_cache_key("search", {"vendor": "Walmart", "city": ""}) == response_cache_key(
+        "search", {"vendor": " Walmart "}
+    )
+    assert response_cache_key("search", {"vendor": "Walmart"}) != response_cache_key("search", {"vendor": "Target"})
+
+
+def test_hits_until_the_data_version_changes():
+    cache = ResponseCache(max_entries=10, ttl=0)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return [len(calls)]
+
+    first = cache.get_or_compute("search", {"vendor": "Walmart"}, compute)
+    assert cache.get_or_compute("search", {"vendor": "Walmart"}, compute) == first
+    bump_data_version()
+    assert cache.get_or_compute("search", {"vendor": "Walmart"}, compute)["body"] == "[2]"
+    assert len(calls) == 2
+
+
+def test_errors_are_not_cached():
+    cache = ResponseCache(max_entries=10, ttl=0)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"error": "database down"}
+
+    cache.get_or_compute("analytics", {}, compute)
+    cache.get_or_compute("analytics", {}, compute)
+    assert len(calls) == 2
+
+
+def test_concurrent_misses_run_the_query_once():
+    cache = ResponseCache(max_entries=10, ttl=0)
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {"total_spent": 1}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("analytics", {"year": "2024"}, compute)))
+        for _ in range(8)
+    ]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len({result["etag"] for result in results}) == 1
+    assert cache.stats()["coalesced"] == 7
+
+
+def test_endpoint_returns_304_for_matching_etag(app):
+    client = app.test_client()
+    first = client.get("/api/v1/receipts/search?vendor=Walmart")
+    etag = first.headers["ETag"]
+
+    assert first.status_code == 200
+    assert first.get_json()[0]["vendor_name"] == "Walmart"
+    assert "no-cache" in first.headers["Cache-Control"]
+    assert client.get("/api/v1/receipts/search?vendor=Walmart", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_writes_invalidate_cached_responses(app):
+    client = app.test_client()
+    before = client.get("/api/v1/receipts/analytics")
+    assert before.get_json()["receipt_count"] == 1
+
+    insert_receipt({"vendor_name": "Target", "total_amount": 5, "date_time": "2024-02-01T00:00:00"})
+
+    after = client.get("/api/v1/receipts/analytics", headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    assert after.get_json()["receipt_count"] == 2
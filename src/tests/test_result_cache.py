@@ -0,0 +1,65 @@
+import pytest
+from services.result_cache import MemoryBackend, ResultCache, SQLiteBackend, hash_bytes
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    """Fixture for a throwaway SQLite cache file"""
+    return str(tmp_path / "ocr_cache.sqlite3")
+
+
+def test_hash_is_content_addressed():
+    assert hash_bytes(b"receipt") == hash_bytes(b"receipt")
+    assert hash_bytes(b"receipt") != hash_bytes(b"receipt2")
+
+
+def test_memory_backend_evicts_least_recently_used():
+    cache = ResultCache([MemoryBackend(max_entries=2)])
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    cache.get("a")
+    cache.set("c", {"v": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.get("c") == {"v": 3}
+
+
+def test_entries_expire_after_ttl(mocker):
+    clock = mocker.patch("services.result_cache.time.time", return_value=1000)
+    cache = ResultCache([MemoryBackend(max_entries=2)], ttl=60)
+    cache.set("a", {"v": 1})
+
+    clock.return_value = 1061
+    assert cache.get("a") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_sqlite_backend_survives_restart(sqlite_path):
+    ResultCache([SQLiteBackend(sqlite_path, max_entries=10)]).set("a", {"v": 1})
+
+    reopened = ResultCache([SQLiteBackend(sqlite_path, max_entries=10)])
+    assert reopened.get("a") == {"v": 1}
+
+
+def test_sqlite_backend_is_bounded(sqlite_path):
+    backend = SQLiteBackend(sqlite_path, max_entries=3)
+    cache = ResultCache([backend])
+    for i in range(5):
+        cache.set(str(i), {"v": i})
+
+    assert len(backend) == 3
+
+
+def test_tiered_hit_is_promoted_to_memory(sqlite_path):
+    memory = MemoryBackend(max_entries=10)
+    disk = SQLiteBackend(sqlite_path, max_entries=10)
+    ResultCache([disk]).set("a", {"v": 1})
+
+    cache = ResultCache([memory, disk])
+    assert cache.get("a") == {"v": 1}
+    assert memory.get("a") is not None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["tier_hits"] == {"memory": 0, "sqlite": 1}
@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed once a receipt is uploaded; create_app() must not import them
+DEFERRED_MODULES = [
+    "google.cloud.vision",
+    "google.cloud.storage",
+    "langchain_google_genai",
+    "PIL",
+    "grpc",
+]
+
+# Generous ceiling for a fresh interpreter; the heavy SDKs alone take well over this
+IMPORT_BUDGET_SECONDS = 3.0
+
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+create_app()
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def run_startup():
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_create_app_defers_ocr_dependencies():
+    modules = set(run_startup()["modules"])
+    assert [module for module in DEFERRED_MODULES if module in modules] == []
+
+
+def test_create_app_within_import_budget():
+    assert run_startup()["seconds"] < IMPORT_BUDGET_SECONDS
@@ -0,0 +1,172 @@
+import io
+import sys
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+from config.settings import Config
+import services.tesseract_ocr as tesseract_ocr
+from services.file_service import upload_image
+from services.result_cache import MemoryBackend, ResultCache
+from services.tesseract_ocr import recognize_image, tesseract_texts
+
+VISION_RESULT = {"receipts": [{"ocr_text": "WALMART\nTOTAL 12.00", "formatted_data": '{"vendor_name": "Walmart"}'}]}
+
+
+@pytest.fixture
+def image_file():
+    """Fixture to create an in-memory uploaded image"""
+    return FileStorage(stream=io.BytesIO(b"fake image bytes"), filename="walmart-1.png")
+
+
+@pytest.fixture
+def pipeline(mocker):
+    """Fixture to stub the OCR engines and the LLM extraction behind upload_image"""
+    mocker.patch("services.file_service.get_ocr_cache", return_value=ResultCache([MemoryBackend(max_entries=8)]))
+    mocker.patch("services.file_service.Config.PREPROCESS_ENABLED", False)
+    mocker.patch("services.file_service.Config.OCR_FALLBACK_ENGINE", "vision")
+    mocker.patch("services.file_service.Config.TESSERACT_MIN_CONFIDENCE", 60)
+    return SimpleNamespace(
+        tesseract=mocker.patch("services.file_service.tesseract_texts", return_value=[("TARGET\nTOTAL 5.00", 91.0)]),
+        vision=mocker.patch("services.file_service.detect_images", return_value=VISION_RESULT),
+        extract=mocker.patch("services.file_service.build_ocr_results", side_effect=lambda texts: {
+            "receipts": [{"ocr_text": text, "formatted_data": "{}"} for text in texts],
+        }),
+    )
+
+
+def test_confident_tesseract_result_skips_vision(pipeline, image_file):
+    result = upload_image(image_file, ocr_mode="image", ocr_engine="tesseract")
+
+    pipeline.tesseract.assert_called_once_with([b"fake image bytes"])
+    assert not pipeline.vision.called
+    assert result["ocr_text"] == "TARGET\nTOTAL 5.00"
+
+
+@pytest.mark.parametrize("outcome", [("blurry", 31.0), ("", 0.0), RuntimeError("tesseract is not installed")])
+def test_falls_back_to_vision(pipeline, image_file, outcome):
+    if isinstance(outcome, Exception):
+        pipeline.tesseract.side_effect = outcome
+    else:
+        pipeline.tesseract.return_value = [outcome]
+
+    result = upload_image(image_file, ocr_mode="image", ocr_engine="tesseract")
+
+    pipeline.vision.assert_called_once_with([b"fake image bytes"])
+    assert result["ocr_text"] == VISION_RESULT["receipts"][0]["ocr_text"]
+
+
+def test_one_unsure_receipt_sends_the_whole_photo_to_vision(mocker, pipeline, image_file):
+    mocker.patch("services.file_service.Config.PREPROCESS_ENABLED", True)
+    mocker.patch("services.file_service.render_jpegs", return_value=[b"left", b"right"])
+    pipeline.tesseract.return_value = [("TARGET\nTOTAL 5.00", 91.0), ("blurry", 31.0)]
+
+    upload_image(image_file, ocr_mode="image", ocr_engine="tesseract")
+
+    pipeline.tesseract.assert_called_once_with([b"left", b"right"])
+    pipeline.vision.assert_called_once_with([b"left", b"right"])
+
+
+def test_fallback_can_be_disabled(mocker, pipeline, image_file):
+    mocker.patch("services.file_service.Config.OCR_FALLBACK_ENGINE", "none")
+    pipeline.tesseract.return_value = [("blurry", 31.0)]
+
+    result = upload_image(image_file, ocr_mode="image", ocr_engine="tesseract")
+
+    assert not pipeline.vision.called
+    assert result["ocr_text"] == "blurry"
+
+
+def test_engine_comes_from_config_and_is_validated(mocker, pipeline, image_file):
+    mocker.patch("services.file_service.Config.OCR_ENGINE", "tesseract")
+    upload_image(image_file, ocr_mode="image")
+    assert pipeline.tesseract.called
+
+    result, status = upload_image(image_file, ocr_mode="image", ocr_engine="abbyy")
+    assert status == 400
+    assert "Invalid OCR engine" in result["error"]
+
+
+def test_recognize_image_rebuilds_lines_and_averages_word_confidence(monkeypatch):
+    data = {
+        "text": ["", "WALMART", "", "TOTAL", "12.00", " "],
+        "conf": ["-1", "96", "-1", "90", "84", "-1"],
+        "block_num": [1, 1, 1, 1, 1, 1],
+        "par_num": [1, 1, 1, 1, 1, 1],
+        "line_num": [0, 1, 2, 2, 2, 2],
+    }
+    fake = SimpleNamespace(Output=SimpleNamespace(DICT="dict"), image_to_data=lambda image, **kwargs: data)
+    monkeypatch.setitem(sys.modules, "pytesseract", fake)
+    png = io.BytesIO()
+    Image.new("L", (10, 10), 255).save(png, "PNG")
+
+    text, confidence = recognize_image(png.getvalue(), "eng", 6)
+
+    assert text == "WALMART\nTOTAL 12.00"
+    assert confidence == pytest.approx(90.0)
+
+
+def test_tesseract_pool_reads_a_rendered_receipt():
+    pytest.importorskip("pytesseract")
+    import shutil
+    from PIL import ImageDraw
+
+    if shutil.which("tesseract") is None:
+        pytest.skip("tesseract binary not installed")
+    image = Image.new("L", (600, 120), 255)
+    ImageDraw.Draw(image).text((20, 40), "TOTAL 12.00", fill=0, font_size=40)
+    png = io.BytesIO()
+    image.save(png, "PNG")
+
+    [(text, confidence)] = tesseract_texts([png.getvalue()])
+
+    assert "12.00" in text
+    assert confidence > 0
+
+
+class FakePool:
+    """Stands in for the process pool; a broken one fails every submit"""
+
+    def __init__(self, broken=False):
+        self.broken, self.shut_down = broken, False
+
+    def submit(self, fn, content, *args):
+        if self.broken:
+            raise BrokenProcessPool("a child process terminated abruptly")
+        future = Future()
+        future.set_result((content.decode(), 90.0))
+        return future
+
+    def shutdown(self, **kwargs):
+        self.shut_down = True
+
+
+def test_broken_pool_is_replaced_and_retried_once(monkeypatch):
+    broken, fresh = FakePool(broken=True), FakePool()
+    monkeypatch.setattr(tesseract_ocr, "_executor", broken)
+    monkeypatch.setattr(tesseract_ocr, "ProcessPoolExecutor", lambda **kwargs: fresh)
+
+    assert tesseract_texts([b"left", b"right"]) == [("left", 90.0), ("right", 90.0)]
+    assert broken.shut_down
+    assert tesseract_ocr._executor is fresh
+
+
+def test_pool_that_breaks_again_raises(monkeypatch):
+    monkeypatch.setattr(tesseract_ocr, "_executor", FakePool(broken=True))
+    monkeypatch.setattr(tesseract_ocr, "ProcessPoolExecutor", lambda **kwargs: FakePool(broken=True))
+
+    with pytest.raises(BrokenProcessPool):
+        tesseract_texts([b"left"])
+
+
+@pytest.mark.parametrize("engine, valid", [("vision", True), ("none", True), ("tesseract", False)])
+def test_fallback_engine_is_validated(mocker, engine, valid):
+    mocker.patch.multiple(Config, DB_USER="user", DB_PASSWORD="secret", DB_NAME="receipts",
+                          GOOGLE_APPLICATION_CREDENTIALS="key.json", OCR_FALLBACK_ENGINE=engine)
+    if valid:
+        Config.validate()
+    else:
+        with pytest.raises(ValueError, match="OCR_FALLBACK_ENGINE"):
+            Config.validate()
@@ -8,6 +8,8 @@ export const uploadReceipt = async (file: File) => {
   return axios.post(`${API_BASE_URL}/receipt`, formData);
 };
 
+export const fetchUploadJob = async (jobId: string) => axios.get(`${API_BASE_URL}/receipt/jobs/${jobId}`);
+
 export const fetchReceipts = async () => axios.get(`${API_BASE_URL}/receipts`);
 export const fetchAnalytics = async () => axios.get(`${API_BASE_URL}/receipts/analytics`);
 export const updateReceipt = async (id: number, data: any) => {
@@ -15,6 +17,8 @@ export const updateReceipt = async (id: number, data: any) => {
 };
 export const deleteReceipt = async (id: number) => axios.delete(`${API_BASE_URL}/receipts/${id}`);
 export const searchReceipts = async (query: string) => axios.get(`${API_BASE_URL}/receipts/search?${query}`);
+export const searchReceiptText = async (q: string, cursor?: string) =>
+  axios.get(`${API_BASE_URL}/receipts/fulltext`, { params: { q, cursor } });
 
 // Authentication APIs
 export const getGoogleLoginUrl = async () => {